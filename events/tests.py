@@ -1093,6 +1093,34 @@ class EventCalendarIcsViewTestCase(TestCase):
         response = self.client.get(self.ics_url)
         self.assertEqual(response.status_code, 404)
 
+    def test_ics_view_cache_headers(self):
+        response = self.client.get(self.ics_url)
+        self.assertTrue(response.has_header("ETag"))
+        self.assertTrue(response.has_header("Last-Modified"))
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("max-age=", response["Cache-Control"])
+
+    def test_ics_view_not_modified(self):
+        response = self.client.get(self.ics_url)
+
+        response_etag = self.client.get(
+            self.ics_url, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        response_date = self.client.get(
+            self.ics_url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(response_etag.status_code, 304)
+        self.assertEqual(response_date.status_code, 304)
+
+    def test_ics_view_modified_after_save(self):
+        etag = self.client.get(self.ics_url)["ETag"]
+        self.event.title = "Evento ICS actualizado"
+        self.event.save()
+
+        response = self.client.get(self.ics_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "SUMMARY:Evento ICS actualizado")
+
 
 class CalendarButtonsTemplateTestCase(TestCase):
     def setUp(self):
@@ -21,6 +21,8 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.throttling import AnonRateThrottle
 
+from utils.conditional import conditional_get, get_etag
+
 from .models import Event, Lead
 from .serializers import LeadSubmitSerializer
 
@@ -241,7 +243,28 @@ class EventAccessView(TemplateView):
         return super().get(request, event=event, *args, **kwargs)
 
 
+def _get_event_updated_at(request, slug):
+    return (
+        Event.objects.filter(slug=slug, is_active=True)
+        .values_list("updated_at", flat=True)
+        .first()
+    )
+
+
+def _get_event_etag(request, slug):
+    updated_at = _get_event_updated_at(request, slug)
+    if updated_at is None:
+        return None
+    return get_etag(slug, updated_at.isoformat())
+
+
 class EventCalendarIcsView(View):
+    @conditional_get(
+        etag_func=_get_event_etag,
+        last_modified_func=_get_event_updated_at,
+        public=True,
+        max_age=settings.EVENTS_ICS_CACHE_SECONDS,
+    )
     def get(self, request, slug):
         event = get_object_or_404(Event, slug=slug, is_active=True)
         if not event.event_datetime:
@@ -0,0 +1,50 @@
+from django.contrib import admin, messages
+from django.utils import timezone
+
+from jobs import models
+
+
+@admin.register(models.Job)
+class JobAdmin(admin.ModelAdmin):
+    actions = ("retry_jobs",)
+    list_display = (
+        "id",
+        "job_type",
+        "status",
+        "priority",
+        "group_key",
+        "attempts",
+        "worker_id",
+        "scheduled_at",
+        "created_at",
+    )
+    list_filter = ("job_type", "status", "created_at")
+    search_fields = ("payload", "group_key")
+    readonly_fields = (
+        "attempts",
+        "worker_id",
+        "lease_expires_at",
+        "started_at",
+        "finished_at",
+        "last_error",
+        "created_at",
+        "updated_at",
+    )
+    ordering = ("-created_at",)
+    list_per_page = 30
+
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status="processing").update(
+            status="pending",
+            attempts=0,
+            worker_id="",
+            lease_expires_at=None,
+            scheduled_at=timezone.now(),
+        )
+        self.message_user(
+            request,
+            f"{updated} tareas enviadas a la cola nuevamente.",
+            messages.SUCCESS,
+        )
+
+    retry_jobs.short_description = "Reintentar tareas"
@@ -0,0 +1,186 @@
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, connection, models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Concat
+from django.utils import timezone
+
+from jobs.models import LeasedModel
+from jobs.signals import status_updated
+
+logger = logging.getLogger(__name__)
+
+# Candidate rows checked when other workers claim the first ones
+CLAIM_CANDIDATES = 10
+
+
+def get_worker_id() -> str:
+    """Id of the current worker process (host and pid)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim(
+    queryset: models.QuerySet, lease_seconds: int | None = None
+) -> LeasedModel | None:
+    """Mark as processing the first row of the queryset that no other worker
+    claimed, with a lease that expires if it is not renewed
+
+    Rows are locked with select_for_update(skip_locked) where the database
+    supports it, and claimed with a conditional update on the status, so two
+    workers never claim the same row
+
+    Args:
+        queryset (models.QuerySet): rows ready to process, in claim order
+        lease_seconds (int | None): lease duration (default JOBS_LEASE_SECONDS)
+
+    Returns:
+        LeasedModel | None: claimed row, None if there are no rows to claim
+    """
+    model = queryset.model
+    lease_seconds = lease_seconds or settings.JOBS_LEASE_SECONDS
+
+    with transaction.atomic():
+        candidates = list(
+            queryset.select_for_update(skip_locked=True).values_list(
+                "id", "status"
+            )[:CLAIM_CANDIDATES]
+        )
+        for row_id, row_status in candidates:
+            claimed = model.objects.filter(id=row_id, status=row_status).update(
+                status="processing",
+                worker_id=get_worker_id(),
+                lease_expires_at=timezone.now() + timedelta(seconds=lease_seconds),
+                attempts=F("attempts") + 1,
+            )
+            if claimed:
+                obj = model.objects.get(id=row_id)
+                break
+        else:
+            return None
+
+    status_updated.send(sender=model, ids=[obj.id])
+    return obj
+
+
+def heartbeat(obj: LeasedModel, lease_seconds: int | None = None) -> bool:
+    """Extend the lease of a claimed row
+
+    Args:
+        obj (LeasedModel): row claimed by this worker
+        lease_seconds (int | None): lease duration (default JOBS_LEASE_SECONDS)
+
+    Returns:
+        bool: False if the lease was lost (expired and reaped)
+    """
+    lease_seconds = lease_seconds or settings.JOBS_LEASE_SECONDS
+    lease_expires_at = timezone.now() + timedelta(seconds=lease_seconds)
+    extended = type(obj).objects.filter(
+        id=obj.id, status="processing", worker_id=obj.worker_id
+    ).update(lease_expires_at=lease_expires_at)
+    if extended:
+        obj.lease_expires_at = lease_expires_at
+    return bool(extended)
+
+
+def release(obj: LeasedModel):
+    """Clear the lease of a row (saved with the final status)"""
+    obj.worker_id = ""
+    obj.lease_expires_at = None
+
+
+class LeaseHeartbeat:
+    """Renew the lease of a row in a background thread while it is processed
+    (for long steps without progress points, like pdf rendering)"""
+
+    def __init__(self, obj: LeasedModel, lease_seconds: int | None = None):
+        self.obj = obj
+        self.lease_seconds = lease_seconds or settings.JOBS_LEASE_SECONDS
+        self.lost = False
+        self.__stop_event = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+
+    def __run(self):
+        try:
+            while not self.__stop_event.wait(self.lease_seconds / 3):
+                close_old_connections()
+                if not heartbeat(self.obj, self.lease_seconds):
+                    self.lost = True
+                    logger.warning("Lease lost for %s", self.obj)
+                    break
+        finally:
+            connection.close()
+
+    def start(self) -> "LeaseHeartbeat":
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__stop_event.set()
+        self.__thread.join()
+
+    def __enter__(self) -> "LeaseHeartbeat":
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def reap_expired_leases(model: type[LeasedModel]) -> tuple[int, int]:
+    """Return to pending the rows whose worker stopped renewing the lease,
+    or mark them with error when they have no attempts left
+
+    Args:
+        model (type[LeasedModel]): model to reap
+
+    Returns:
+        tuple[int, int]: rows returned to pending and rows marked with error
+    """
+    expired = model.objects.filter(
+        status="processing", lease_expires_at__lt=timezone.now()
+    )
+
+    # Jobs have their own max attempts
+    max_attempts = settings.JOBS_MAX_ATTEMPTS
+    if any(field.name == "max_attempts" for field in model._meta.fields):
+        max_attempts = F("max_attempts")
+
+    fields = {"worker_id": "", "lease_expires_at": None}
+    message = "Lease expired (worker stopped)"
+    if any(field.name == "logs" for field in model._meta.fields):
+        fields["logs"] = Concat(
+            Coalesce("logs", Value("")), Value(f"\n{message}\n")
+        )
+
+    # Ids first: the updated rows are notified (no post_save)
+    failed_ids = list(
+        expired.filter(attempts__gte=max_attempts).values_list("id", flat=True)
+    )
+    requeued_ids = list(
+        expired.filter(attempts__lt=max_attempts).values_list("id", flat=True)
+    )
+    failed = expired.filter(id__in=failed_ids).update(status="error", **fields)
+    requeued = expired.filter(id__in=requeued_ids).update(status="pending", **fields)
+
+    for ids in (failed_ids, requeued_ids):
+        if ids:
+            status_updated.send(sender=model, ids=ids)
+    return requeued, failed
+
+
+def reap_all_expired_leases() -> dict[str, tuple[int, int]]:
+    """Reap the expired leases of every leased model
+
+    Returns:
+        dict[str, tuple[int, int]]: model label -> (requeued, failed)
+    """
+    results = {}
+    for model in apps.get_models():
+        if issubclass(model, LeasedModel):
+            results[model._meta.label] = reap_expired_leases(model)
+    return results
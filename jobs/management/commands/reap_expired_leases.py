@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from jobs.leases import reap_all_expired_leases
+
+
+class Command(BaseCommand):
+    help = "Return to pending the jobs, reports, downloads and group reports "
+    help += "whose worker stopped renewing the lease (error if no attempts left)"
+
+    def handle(self, *args, **options):
+        for label, (requeued, failed) in reap_all_expired_leases().items():
+            self.stdout.write(
+                f"{label}: {requeued} requeued, {failed} marked with error"
+            )
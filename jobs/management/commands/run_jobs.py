@@ -0,0 +1,82 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.leases import reap_all_expired_leases
+from jobs.models import JOB_TYPE_CHOICES
+from jobs.queue import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = "Run queued jobs (report pdfs, reports downloads and group reports), "
+    help += "waiting for new jobs until stopped or --once is used"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when there are no jobs ready to run",
+        )
+        parser.add_argument(
+            "--max-jobs",
+            type=int,
+            default=0,
+            help="Exit after running this number of jobs (0: no limit)",
+        )
+        parser.add_argument(
+            "--types",
+            type=str,
+            nargs="+",
+            choices=[job_type for job_type, _ in JOB_TYPE_CHOICES],
+            default=None,
+            help="Only run these job types",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=settings.JOBS_POLL_SECONDS,
+            help="Seconds to wait for new jobs when the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        jobs_done = 0
+        try:
+            self.__reap_expired_leases()
+            while not options["max_jobs"] or jobs_done < options["max_jobs"]:
+                job = claim_next_job(job_types=options["types"])
+                if not job:
+                    if options["once"]:
+                        break
+                    time.sleep(options["sleep"])
+                    self.__reap_expired_leases()
+                    continue
+
+                self.stdout.write(f"Running {job} (attempt {job.attempts})")
+                job = run_job(job)
+                jobs_done += 1
+
+                message = f"{job} finished"
+                if job.status == "completed":
+                    self.stdout.write(self.style.SUCCESS(message))
+                elif job.status == "pending":
+                    self.stdout.write(
+                        self.style.WARNING(f"{message}, retry at {job.scheduled_at}")
+                    )
+                else:
+                    self.stdout.write(self.style.ERROR(message))
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped")
+
+        self.stdout.write(self.style.SUCCESS(f"{jobs_done} jobs run"))
+
+    def __reap_expired_leases(self):
+        """Return to pending the rows of workers that stopped"""
+        for label, (requeued, failed) in reap_all_expired_leases().items():
+            if requeued or failed:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"{label}: {requeued} expired leases requeued, "
+                        f"{failed} marked with error"
+                    )
+                )
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:19
+
+from django.db import migrations, models
+import django.utils.timezone
+import jobs.models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('job_type', models.CharField(choices=[('report', 'Reporte PDF'), ('reports_download', 'Descarga de reportes (ZIP)'), ('group_report', 'Reporte grupal PDF')], help_text='Tipo de tarea a ejecutar', max_length=50, verbose_name='Tipo')),
+                ('payload', models.JSONField(blank=True, default=dict, help_text='Datos de la tarea (ids de los objetos a procesar)', verbose_name='Datos')),
+                ('priority', models.IntegerField(default=0, help_text='Las tareas con mayor prioridad se ejecutan primero', verbose_name='Prioridad')),
+                ('status', models.CharField(choices=[('pending', '⏳ Pendiente'), ('processing', '⚡ Procesando'), ('completed', '✔ Completado'), ('error', '✖ Error')], default='pending', help_text='Estado de la tarea', max_length=255, verbose_name='Estado')),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Número de veces que se ha ejecutado la tarea', verbose_name='Intentos')),
+                ('max_attempts', models.PositiveIntegerField(default=jobs.models.get_default_max_attempts, help_text='Intentos antes de marcar la tarea con error', verbose_name='Máximo de intentos')),
+                ('scheduled_at', models.DateTimeField(default=django.utils.timezone.now, help_text='La tarea no se ejecuta antes de esta fecha', verbose_name='Programada para')),
+                ('started_at', models.DateTimeField(blank=True, help_text='Inicio de la última ejecución', null=True, verbose_name='Inicio')),
+                ('finished_at', models.DateTimeField(blank=True, help_text='Fin de la última ejecución', null=True, verbose_name='Fin')),
+                ('last_error', models.TextField(blank=True, default='', help_text='Error de la última ejecución fallida', verbose_name='Último error')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Tarea',
+                'verbose_name_plural': 'Tareas',
+                'indexes': [models.Index(fields=['status', 'scheduled_at'], name='jobs_job_status_sched_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Si el worker no renueva la reserva antes de esta fecha, el registro vuelve a pendiente', null=True, verbose_name='Fin de la reserva'),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='worker_id',
+            field=models.CharField(blank=True, default='', help_text='Worker que está procesando el registro', max_length=255, verbose_name='Worker'),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, help_text='Número de veces que se ha procesado', verbose_name='Intentos'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_job_lease_expires_at_job_worker_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='group_key',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='Las tareas pendientes se reparten por turnos entre grupos (ejemplo: company:12), con un límite de tareas en paralelo por grupo', max_length=100, verbose_name='Grupo'),
+        ),
+    ]
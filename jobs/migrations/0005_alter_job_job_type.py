@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0004_alter_job_job_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='job_type',
+            field=models.CharField(choices=[('report', 'Reporte PDF'), ('reports_download', 'Descarga de reportes (ZIP)'), ('group_report', 'Reporte grupal PDF'), ('notifications', 'Notificaciones salientes'), ('form_progress', 'Guardado de progreso de formularios')], help_text='Tipo de tarea a ejecutar', max_length=50, verbose_name='Tipo'),
+        ),
+    ]
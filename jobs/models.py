@@ -0,0 +1,161 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from core.choices import STATUS_CHOICES
+
+
+JOB_TYPE_CHOICES = [
+    ("report", "Reporte PDF"),
+    ("reports_download", "Descarga de reportes (ZIP)"),
+    ("group_report", "Reporte grupal PDF"),
+    ("notifications", "Notificaciones salientes"),
+    ("form_progress", "Guardado de progreso de formularios"),
+]
+
+
+def get_default_max_attempts():
+    return settings.JOBS_MAX_ATTEMPTS
+
+
+class LeasedModel(models.Model):
+    """Fields to claim a row for processing with an expiring lease
+    (see jobs.leases)"""
+
+    worker_id = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        verbose_name="Worker",
+        help_text="Worker que está procesando el registro",
+    )
+    lease_expires_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        db_index=True,
+        verbose_name="Fin de la reserva",
+        help_text="Si el worker no renueva la reserva antes de esta fecha, "
+        "el registro vuelve a pendiente",
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Intentos",
+        help_text="Número de veces que se ha procesado",
+    )
+
+    class Meta:
+        abstract = True
+
+
+class ProgressModel(models.Model):
+    """Fields to publish the progress of long running rows
+    (see jobs.progress)"""
+
+    progress_phase = models.CharField(
+        max_length=100,
+        blank=True,
+        default="",
+        verbose_name="Fase",
+        help_text="Fase actual del procesamiento",
+    )
+    progress_done = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Elementos procesados",
+    )
+    progress_total = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Elementos totales",
+    )
+    progress_started_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Inicio del progreso",
+        help_text="Inicio del conteo de elementos (para calcular la velocidad)",
+    )
+    progress_updated_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Última actualización del progreso",
+    )
+
+    class Meta:
+        abstract = True
+
+
+class Job(LeasedModel):
+    id = models.AutoField(primary_key=True)
+    job_type = models.CharField(
+        max_length=50,
+        choices=JOB_TYPE_CHOICES,
+        verbose_name="Tipo",
+        help_text="Tipo de tarea a ejecutar",
+    )
+    payload = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Datos",
+        help_text="Datos de la tarea (ids de los objetos a procesar)",
+    )
+    priority = models.IntegerField(
+        default=0,
+        verbose_name="Prioridad",
+        help_text="Las tareas con mayor prioridad se ejecutan primero",
+    )
+    group_key = models.CharField(
+        max_length=100,
+        blank=True,
+        default="",
+        db_index=True,
+        verbose_name="Grupo",
+        help_text="Las tareas pendientes se reparten por turnos entre grupos "
+        "(ejemplo: company:12), con un límite de tareas en paralelo por grupo",
+    )
+    status = models.CharField(
+        max_length=255,
+        choices=STATUS_CHOICES,
+        default="pending",
+        verbose_name="Estado",
+        help_text="Estado de la tarea",
+    )
+    max_attempts = models.PositiveIntegerField(
+        default=get_default_max_attempts,
+        verbose_name="Máximo de intentos",
+        help_text="Intentos antes de marcar la tarea con error",
+    )
+    scheduled_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Programada para",
+        help_text="La tarea no se ejecuta antes de esta fecha",
+    )
+    started_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Inicio",
+        help_text="Inicio de la última ejecución",
+    )
+    finished_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Fin",
+        help_text="Fin de la última ejecución",
+    )
+    last_error = models.TextField(
+        blank=True,
+        default="",
+        verbose_name="Último error",
+        help_text="Error de la última ejecución fallida",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Job {self.id} {self.job_type} ({self.status})"
+
+    class Meta:
+        verbose_name = "Tarea"
+        verbose_name_plural = "Tareas"
+        indexes = [
+            models.Index(
+                fields=["status", "scheduled_at"], name="jobs_job_status_sched_idx"
+            ),
+        ]
@@ -0,0 +1,115 @@
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from jobs.models import ProgressModel
+
+
+class ProgressTracker:
+    """Publish the progress of a row (items done/total and current phase),
+    saved with a single update at most every JOBS_PROGRESS_SECONDS"""
+
+    def __init__(self, obj: ProgressModel, interval: float | None = None):
+        self.obj = obj
+        self.interval = (
+            settings.JOBS_PROGRESS_SECONDS if interval is None else interval
+        )
+        self.__last_save = 0.0
+
+    def set_phase(self, phase: str, total: int | None = None):
+        """Start a phase (saved right away)
+
+        Args:
+            phase (str): phase name
+            total (int | None): items of the phase, restarting the count
+                (None: keep counting the items of the previous phase)
+        """
+        self.obj.progress_phase = phase
+        if total is not None:
+            self.obj.progress_total = total
+            self.obj.progress_done = 0
+            self.obj.progress_started_at = timezone.now()
+        self.save()
+
+    def add_total(self, count: int):
+        """Add items found while processing to the total (saved with the
+        next phase or advance)
+
+        Args:
+            count (int): items to add
+        """
+        self.obj.progress_total += count
+
+    def advance(self, count: int = 1) -> bool:
+        """Count processed items, saving them if the interval passed
+        or all items are done
+
+        Args:
+            count (int): items processed
+
+        Returns:
+            bool: True if the progress was saved
+        """
+        self.obj.progress_done += count
+        if (
+            self.obj.progress_done < self.obj.progress_total
+            and time.monotonic() - self.__last_save < self.interval
+        ):
+            return False
+        self.save()
+        return True
+
+    def save(self):
+        """Save the progress fields (without the rest of the row)"""
+        self.obj.progress_updated_at = timezone.now()
+        type(self.obj).objects.filter(id=self.obj.id).update(
+            progress_phase=self.obj.progress_phase,
+            progress_done=self.obj.progress_done,
+            progress_total=self.obj.progress_total,
+            progress_started_at=self.obj.progress_started_at,
+            progress_updated_at=self.obj.progress_updated_at,
+        )
+        self.__last_save = time.monotonic()
+
+
+def get_progress(obj: ProgressModel) -> dict[str, str | int | float | datetime | None]:
+    """Percent complete and estimated end of a row, based on the items
+    processed per second since the count started
+
+    Args:
+        obj (ProgressModel): row with progress fields (and status)
+
+    Returns:
+        dict[str, str | int | float | datetime | None]: status, phase,
+            done, total, percent (None if unknown) and eta (None if unknown)
+    """
+    done = obj.progress_done
+    total = obj.progress_total
+
+    percent = None
+    if obj.status == "completed":
+        percent = 100.0
+    elif total:
+        percent = round(min(done, total) * 100 / total, 1)
+
+    eta = None
+    if (
+        obj.status == "processing"
+        and 0 < done < total
+        and obj.progress_started_at
+        and obj.progress_updated_at
+    ):
+        elapsed = (obj.progress_updated_at - obj.progress_started_at).total_seconds()
+        seconds_left = elapsed / done * (total - done)
+        eta = obj.progress_updated_at + timedelta(seconds=seconds_left)
+
+    return {
+        "status": obj.status,
+        "phase": obj.progress_phase,
+        "done": done,
+        "total": total,
+        "percent": percent,
+        "eta": eta,
+    }
@@ -0,0 +1,172 @@
+import logging
+import traceback
+from datetime import timedelta
+from collections.abc import Callable
+
+from django.conf import settings
+from django.db.models import Case, IntegerField, Value, When
+from django.utils import timezone
+
+from jobs.leases import CLAIM_CANDIDATES, LeaseHeartbeat, claim, release
+from jobs.models import Job
+from jobs.scheduling import get_next_job_ids
+from jobs.signals import status_updated
+
+logger = logging.getLogger(__name__)
+
+# Job type -> function called with the job payload
+HANDLERS: dict[str, Callable[[dict], None]] = {}
+
+
+class JobError(Exception):
+    """Error raised by handlers when the job work failed (retried)"""
+
+
+def register(job_type: str) -> Callable:
+    """Decorator to register the handler of a job type
+
+    Args:
+        job_type (str): job type (JOB_TYPE_CHOICES)
+
+    Returns:
+        Callable: decorator
+    """
+
+    def decorator(handler: Callable[[dict], None]) -> Callable[[dict], None]:
+        HANDLERS[job_type] = handler
+        return handler
+
+    return decorator
+
+
+def enqueue(
+    job_type: str,
+    payload: dict | None = None,
+    priority: int = 0,
+    delay_seconds: int = 0,
+    group_key: str = "",
+    max_attempts: int | None = None,
+) -> Job:
+    """Add a job to the queue (saved in the database, no network calls)
+
+    Args:
+        job_type (str): job type (JOB_TYPE_CHOICES)
+        payload (dict | None): data passed to the handler
+        priority (int): higher priority jobs run first
+        delay_seconds (int): seconds to wait before running the job
+        group_key (str): fair-share group (e.g. "company:12")
+        max_attempts (int | None): attempts before the job fails
+            (default JOBS_MAX_ATTEMPTS)
+
+    Returns:
+        Job: created job
+    """
+    return Job.objects.create(
+        job_type=job_type,
+        payload=payload or {},
+        priority=priority,
+        group_key=group_key,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        scheduled_at=timezone.now() + timedelta(seconds=delay_seconds),
+    )
+
+
+def claim_next_job(job_types: list[str] | None = None) -> Job | None:
+    """Claim the next pending job ready to run (with a lease): higher
+    priority first, then round-robin between groups under their
+    concurrency limit (see jobs.scheduling)
+
+    Args:
+        job_types (list[str] | None): only claim these job types
+
+    Returns:
+        Job | None: claimed job, None if there are no jobs ready
+    """
+    jobs = Job.objects.filter(status="pending", scheduled_at__lte=timezone.now())
+    if job_types:
+        jobs = jobs.filter(job_type__in=job_types)
+
+    # Window functions can't be locked, claim the candidates by id
+    job_ids = get_next_job_ids(jobs, CLAIM_CANDIDATES)
+    if not job_ids:
+        return None
+    order = Case(
+        *[When(id=job_id, then=Value(index)) for index, job_id in enumerate(job_ids)],
+        output_field=IntegerField(),
+    )
+    job = claim(Job.objects.filter(id__in=job_ids, status="pending").order_by(order))
+    if job:
+        job.started_at = timezone.now()
+        job.finished_at = None
+        job.save(update_fields=["started_at", "finished_at"])
+    return job
+
+
+def run_job(job: Job) -> Job:
+    """Run a claimed job with its handler, retrying later with backoff
+    if it fails and has attempts left
+
+    Args:
+        job (Job): claimed job
+
+    Returns:
+        Job: job with the final status
+    """
+    try:
+        handler = HANDLERS.get(job.job_type)
+        if not handler:
+            raise JobError(f"No handler registered for {job.job_type}")
+        with LeaseHeartbeat(job):
+            handler(job.payload)
+    except Exception as e:
+        return finish_job(job, f"{str(e)}\n{traceback.format_exc()}")
+    return finish_job(job)
+
+
+def finish_job(job: Job, error: str = "") -> Job:
+    """Save the result of a claimed job: completed, or retried later with
+    backoff if it failed and has attempts left
+
+    The result is only saved while the job keeps its lease: a job whose
+    lease expired was reaped and may already run in another worker
+
+    Args:
+        job (Job): claimed job
+        error (str): error of the failed job (empty if it succeeded)
+
+    Returns:
+        Job: job with the final status
+    """
+    job.last_error = error
+    if not error:
+        job.status = "completed"
+    elif job.attempts < job.max_attempts:
+        # Exponential backoff: retry, 2 * retry, 4 * retry seconds...
+        delay = settings.JOBS_RETRY_SECONDS * 2 ** (job.attempts - 1)
+        job.status = "pending"
+        job.scheduled_at = timezone.now() + timedelta(seconds=delay)
+    else:
+        job.status = "error"
+
+    worker_id = job.worker_id
+    release(job)
+    job.finished_at = job.updated_at = timezone.now()
+    fields = [
+        "status",
+        "last_error",
+        "scheduled_at",
+        "worker_id",
+        "lease_expires_at",
+        "finished_at",
+        "updated_at",
+    ]
+    saved = Job.objects.filter(
+        id=job.id, status="processing", worker_id=worker_id
+    ).update(**{field: getattr(job, field) for field in fields})
+    if not saved:
+        logger.warning("Lease lost for %s, result discarded", job)
+        job.refresh_from_db()
+        return job
+
+    status_updated.send(sender=Job, ids=[job.id])
+    return job
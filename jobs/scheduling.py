@@ -0,0 +1,206 @@
+from datetime import datetime, timedelta
+from collections.abc import Callable
+
+from django.conf import settings
+from django.db.models import Case, Count, F, IntegerField, QuerySet, Value, When
+from django.db.models.functions import RowNumber
+from django.db.models.expressions import Window
+from django.utils import timezone
+
+from jobs.models import Job
+
+# Group prefix (before ":" in Job.group_key) -> function returning the max
+# concurrent jobs of a group (None: JOBS_MAX_CONCURRENT_PER_GROUP)
+GROUP_LIMITS: dict[str, Callable[[str], int | None]] = {}
+
+# Estimated duration of job types without finished jobs
+DEFAULT_JOB_SECONDS = 60
+
+# Finished jobs used to estimate the duration of each job type
+DURATION_SAMPLE_SIZE = 20
+
+
+def register_group_limit(prefix: str) -> Callable:
+    """Decorator to register the concurrency limit of a group prefix
+
+    Args:
+        prefix (str): group key prefix (e.g. "company" for "company:12")
+
+    Returns:
+        Callable: decorator
+    """
+
+    def decorator(
+        get_limit: Callable[[str], int | None],
+    ) -> Callable[[str], int | None]:
+        GROUP_LIMITS[prefix] = get_limit
+        return get_limit
+
+    return decorator
+
+
+def get_group_limit(group_key: str) -> int:
+    """Max concurrent processing jobs of a group (0: no limit)
+
+    Args:
+        group_key (str): job group key ("prefix:value")
+
+    Returns:
+        int: concurrency limit
+    """
+    if not group_key:
+        return 0
+
+    prefix, _, value = group_key.partition(":")
+    get_limit = GROUP_LIMITS.get(prefix)
+    limit = get_limit(value) if get_limit else None
+    if limit is None:
+        limit = settings.JOBS_MAX_CONCURRENT_PER_GROUP
+    return limit
+
+
+def get_processing_groups() -> dict[str, int]:
+    """Processing jobs of each group
+
+    Returns:
+        dict[str, int]: group key -> processing jobs
+    """
+    return dict(
+        Job.objects.filter(status="processing")
+        .exclude(group_key="")
+        .values("group_key")
+        .annotate(total=Count("id"))
+        .values_list("group_key", "total")
+    )
+
+
+def get_fair_share_queryset(
+    jobs: QuerySet[Job], processing_groups: dict[str, int] | None = None
+) -> QuerySet[Job]:
+    """Order pending jobs by priority, then round-robin between groups:
+    each job gets a turn (its position in its group and priority, after
+    the jobs of the group already processing), so the first job of every
+    group runs before the second job of any group
+
+    Args:
+        jobs (QuerySet[Job]): pending jobs
+        processing_groups (dict[str, int] | None): processing jobs of each
+            group (queried if not provided)
+
+    Returns:
+        QuerySet[Job]: jobs annotated with turn, in run order
+    """
+    if processing_groups is None:
+        processing_groups = get_processing_groups()
+
+    processing = Value(0)
+    if processing_groups:
+        processing = Case(
+            *[
+                When(group_key=group_key, then=Value(total))
+                for group_key, total in processing_groups.items()
+            ],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+
+    return jobs.annotate(
+        turn=Window(
+            RowNumber(),
+            partition_by=[F("group_key"), F("priority")],
+            order_by=[F("scheduled_at").asc(), F("id").asc()],
+        )
+        + processing
+    ).order_by("-priority", "turn", "scheduled_at", "id")
+
+
+def get_next_job_ids(jobs: QuerySet[Job], limit: int) -> list[int]:
+    """Ids of the next jobs to claim in fair-share order, skipping the
+    groups at their concurrency limit
+
+    Args:
+        jobs (QuerySet[Job]): pending jobs ready to run
+        limit (int): max ids to return
+
+    Returns:
+        list[int]: job ids in run order
+    """
+    processing_groups = get_processing_groups()
+    full_groups = [
+        group_key
+        for group_key, total in processing_groups.items()
+        if 0 < get_group_limit(group_key) <= total
+    ]
+    if full_groups:
+        jobs = jobs.exclude(group_key__in=full_groups)
+
+    return list(
+        get_fair_share_queryset(jobs, processing_groups).values_list(
+            "id", flat=True
+        )[:limit]
+    )
+
+
+def get_job_durations() -> dict[str, float]:
+    """Average seconds of the last finished jobs of each job type
+
+    Returns:
+        dict[str, float]: job type -> average seconds
+    """
+    durations = {}
+    for job_type in Job.objects.values_list("job_type", flat=True).distinct():
+        finished = (
+            Job.objects.filter(
+                job_type=job_type,
+                status="completed",
+                started_at__isnull=False,
+                finished_at__isnull=False,
+            )
+            .order_by("-finished_at")
+            .values_list("started_at", "finished_at")[:DURATION_SAMPLE_SIZE]
+        )
+        seconds = [
+            (finished_at - started_at).total_seconds()
+            for started_at, finished_at in finished
+        ]
+        if seconds:
+            durations[job_type] = sum(seconds) / len(seconds)
+    return durations
+
+
+def get_queue_estimates(
+    job_type: str, payload_key: str
+) -> dict[int, dict[str, int | datetime]]:
+    """Queue position and estimated start of the pending jobs of a type.
+    Positions count the pending jobs of every type (workers are shared),
+    and the start is estimated with the average duration of each job type
+    split between the workers currently processing jobs
+
+    Args:
+        job_type (str): job type to estimate (JOB_TYPE_CHOICES)
+        payload_key (str): payload key of the objects ids (e.g. "report_id")
+
+    Returns:
+        dict[int, dict[str, int | datetime]]: object id ->
+            {"position": int, "estimated_start": datetime}
+    """
+    now = timezone.now()
+    durations = get_job_durations()
+    workers = max(1, Job.objects.filter(status="processing").count())
+
+    pending = get_fair_share_queryset(Job.objects.filter(status="pending"))
+
+    estimates = {}
+    seconds_ahead = 0
+    for position, (pending_type, payload, scheduled_at) in enumerate(
+        pending.values_list("job_type", "payload", "scheduled_at"), start=1
+    ):
+        if pending_type == job_type and payload.get(payload_key) not in estimates:
+            estimated_start = now + timedelta(seconds=seconds_ahead / workers)
+            estimates[payload.get(payload_key)] = {
+                "position": position,
+                "estimated_start": max(estimated_start, scheduled_at),
+            }
+        seconds_ahead += durations.get(pending_type, DEFAULT_JOB_SECONDS)
+
+    return estimates
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent after the status of rows changes with a queryset update (claims,
+# reaped leases, admin actions), which sends no post_save. Arguments:
+# sender (model) and ids (ids of the updated rows)
+status_updated = Signal()
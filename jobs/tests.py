@@ -0,0 +1,429 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.tests_base.test_models import TestSurveyModelBase
+from jobs.leases import claim, get_worker_id, heartbeat, reap_expired_leases
+from jobs.models import Job
+from jobs.progress import ProgressTracker, get_progress
+from jobs.queue import HANDLERS, JobError, claim_next_job, enqueue, run_job
+from jobs.scheduling import get_queue_estimates
+from survey import models as survey_models
+
+
+class QueueTestCase(TestCase):
+    """Test enqueue, claim and run of jobs"""
+
+    def test_enqueue(self):
+        """Test jobs are saved pending and ready to run"""
+        job = enqueue("report", {"report_id": 1}, priority=2)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "pending")
+        self.assertEqual(job.payload, {"report_id": 1})
+        self.assertEqual(job.priority, 2)
+        self.assertEqual(job.attempts, 0)
+        self.assertLessEqual(job.scheduled_at, timezone.now())
+
+    def test_claim_order(self):
+        """Test higher priority first, then oldest, skipping future jobs"""
+        low = enqueue("report", {"report_id": 1})
+        high = enqueue("report", {"report_id": 2}, priority=5)
+        enqueue("report", {"report_id": 3}, priority=10, delay_seconds=60)
+
+        job = claim_next_job()
+        self.assertEqual(job.id, high.id)
+        self.assertEqual(job.status, "processing")
+        self.assertEqual(job.attempts, 1)
+
+        self.assertEqual(claim_next_job().id, low.id)
+        self.assertIsNone(claim_next_job())
+
+    def test_claim_job_types(self):
+        """Test only the requested job types are claimed"""
+        enqueue("report", {"report_id": 1})
+        group_report_job = enqueue("group_report", {"group_report_id": 1})
+
+        job = claim_next_job(job_types=["group_report"])
+        self.assertEqual(job.id, group_report_job.id)
+        self.assertIsNone(claim_next_job(job_types=["group_report"]))
+
+    def test_run_job_completed(self):
+        """Test the handler is called with the payload"""
+        handler = MagicMock()
+        enqueue("report", {"report_id": 1})
+
+        with patch.dict(HANDLERS, {"report": handler}):
+            job = run_job(claim_next_job())
+
+        handler.assert_called_once_with({"report_id": 1})
+        self.assertEqual(job.status, "completed")
+        self.assertIsNotNone(job.finished_at)
+
+    @override_settings(JOBS_RETRY_SECONDS=10)
+    def test_run_job_retry_and_error(self):
+        """Test failed jobs are retried with backoff until max attempts"""
+        handler = MagicMock(side_effect=JobError("Boom!"))
+        job = enqueue("report", {"report_id": 1})
+        job.max_attempts = 2
+        job.save()
+
+        with patch.dict(HANDLERS, {"report": handler}):
+            # First attempt: retried later
+            job = run_job(claim_next_job())
+            self.assertEqual(job.status, "pending")
+            self.assertIn("Boom!", job.last_error)
+            self.assertGreater(job.scheduled_at, timezone.now() + timedelta(seconds=5))
+            self.assertIsNone(claim_next_job())
+
+            # Second attempt: no attempts left
+            Job.objects.filter(id=job.id).update(scheduled_at=timezone.now())
+            job = run_job(claim_next_job())
+            self.assertEqual(job.status, "error")
+            self.assertEqual(job.attempts, 2)
+
+    def test_run_job_lease_lost(self):
+        """Test the result of a job reaped while it ran is not saved"""
+        enqueue("report", {"report_id": 1})
+
+        def reaped(payload):
+            Job.objects.update(status="pending", worker_id="", lease_expires_at=None)
+
+        with patch.dict(HANDLERS, {"report": reaped}):
+            job = run_job(claim_next_job())
+
+        self.assertEqual(job.status, "pending")
+        self.assertIsNone(job.finished_at)
+        self.assertEqual(Job.objects.get(id=job.id).status, "pending")
+
+    def test_run_job_no_handler(self):
+        """Test jobs without a registered handler fail"""
+        job = enqueue("report", {"report_id": 1})
+        job.max_attempts = 1
+        job.save()
+
+        with patch.dict(HANDLERS, {}, clear=True):
+            job = run_job(claim_next_job())
+
+        self.assertEqual(job.status, "error")
+        self.assertIn("No handler registered", job.last_error)
+
+
+class SchedulingTestCase(TestSurveyModelBase):
+    """Test fair-share order between groups and concurrency limits"""
+
+    def setUp(self):
+        super().setUp()
+        self.big_company = self.create_company()
+        self.small_company = self.create_company()
+
+    def __enqueue(self, company: survey_models.Company, report_id: int, **kwargs):
+        return enqueue(
+            "report",
+            {"report_id": report_id},
+            group_key=f"company:{company.id}",
+            **kwargs,
+        )
+
+    def __claim_report_ids(self) -> list[int]:
+        report_ids = []
+        while job := claim_next_job():
+            report_ids.append(job.payload.get("report_id"))
+        return report_ids
+
+    @override_settings(JOBS_MAX_CONCURRENT_PER_GROUP=0)
+    def test_round_robin(self):
+        """Test companies take turns instead of first in, first out"""
+        for report_id in range(1, 4):
+            self.__enqueue(self.big_company, report_id)
+        self.__enqueue(self.small_company, 10)
+        enqueue("group_report", {"group_report_id": 1})
+
+        self.assertEqual(self.__claim_report_ids(), [1, 10, None, 2, 3])
+
+    @override_settings(JOBS_MAX_CONCURRENT_PER_GROUP=0)
+    def test_priority_before_turn(self):
+        """Test higher priority jobs run first, then companies take turns"""
+        self.__enqueue(self.big_company, 1)
+        self.__enqueue(self.big_company, 2)
+        self.__enqueue(self.small_company, 10)
+        self.__enqueue(self.big_company, 3, priority=5)
+
+        # The processing priority job counts as the big company turn
+        self.assertEqual(self.__claim_report_ids(), [3, 10, 1, 2])
+
+    @override_settings(JOBS_MAX_CONCURRENT_PER_GROUP=1)
+    def test_concurrency_limit(self):
+        """Test companies with processing jobs at the limit are skipped"""
+        for report_id in range(1, 4):
+            self.__enqueue(self.big_company, report_id)
+        self.__enqueue(self.small_company, 10)
+
+        self.assertEqual(self.__claim_report_ids(), [1, 10])
+
+        # Finished jobs free the company slot
+        Job.objects.filter(payload__report_id=1).update(status="completed")
+        self.assertEqual(self.__claim_report_ids(), [2])
+
+    @override_settings(JOBS_MAX_CONCURRENT_PER_GROUP=1)
+    def test_company_concurrency_limit(self):
+        """Test the company limit replaces the default limit"""
+        self.big_company.max_concurrent_reports = 2
+        self.big_company.save()
+        for report_id in range(1, 4):
+            self.__enqueue(self.big_company, report_id)
+
+        self.assertEqual(self.__claim_report_ids(), [1, 2])
+
+    @override_settings(JOBS_MAX_CONCURRENT_PER_GROUP=0)
+    def test_queue_estimates(self):
+        """Test queue position and estimated start of pending reports"""
+        for report_id in range(1, 3):
+            self.__enqueue(self.big_company, report_id)
+        self.__enqueue(self.small_company, 10)
+
+        # Finished report job of 2 minutes
+        finished = self.__enqueue(self.small_company, 20)
+        Job.objects.filter(id=finished.id).update(
+            status="completed",
+            started_at=timezone.now() - timedelta(minutes=3),
+            finished_at=timezone.now() - timedelta(minutes=1),
+        )
+
+        estimates = get_queue_estimates("report", "report_id")
+
+        self.assertEqual(
+            {report_id: estimate["position"] for report_id, estimate in estimates.items()},
+            {1: 1, 10: 2, 2: 3},
+        )
+        self.assertLessEqual(estimates[1]["estimated_start"], timezone.now())
+        self.assertAlmostEqual(
+            (estimates[2]["estimated_start"] - estimates[1]["estimated_start"])
+            .total_seconds(),
+            240,
+            delta=5,
+        )
+
+
+class ProgressTestCase(TestSurveyModelBase):
+    """Test progress saves and eta"""
+
+    def setUp(self):
+        super().setUp()
+        self.reports_download = self.create_reports_download()
+
+    def test_progress_saved_at_intervals(self):
+        """Test progress is saved on phase changes, intervals and the end"""
+        progress = ProgressTracker(self.reports_download, interval=60)
+        progress.set_phase("download", total=3)
+        saved = survey_models.ReportsDownload.objects.filter(
+            id=self.reports_download.id
+        )
+
+        # Saved with the phase, not again before the interval
+        self.assertFalse(progress.advance())
+        self.assertFalse(progress.advance())
+        self.assertEqual(
+            list(saved.values_list("progress_phase", "progress_done", "progress_total")),
+            [("download", 0, 3)],
+        )
+
+        # Last item always saved
+        self.assertTrue(progress.advance())
+        self.assertEqual(saved.get().progress_done, 3)
+
+    def test_get_progress(self):
+        """Test percent and eta based on the items per second"""
+        now = timezone.now()
+        self.reports_download.status = "processing"
+        self.reports_download.progress_done = 10
+        self.reports_download.progress_total = 40
+        self.reports_download.progress_started_at = now - timedelta(seconds=20)
+        self.reports_download.progress_updated_at = now
+
+        progress = get_progress(self.reports_download)
+
+        self.assertEqual(progress["percent"], 25.0)
+        self.assertEqual(progress["eta"], now + timedelta(seconds=60))
+
+        # Completed rows without eta
+        self.reports_download.status = "completed"
+        progress = get_progress(self.reports_download)
+        self.assertEqual(progress["percent"], 100.0)
+        self.assertIsNone(progress["eta"])
+
+    def test_reports_download_progress(self):
+        """Test the zip command publishes the downloaded pdf files"""
+        report = survey_models.Report.objects.create(
+            participant=self.create_participant(),
+            survey=self.create_survey(),
+            status="completed",
+            pdf_file=SimpleUploadedFile("test_report.pdf", b"%PDF-1.4 dummy"),
+        )
+        self.reports_download.reports.set([report])
+
+        call_command("create_reports_download_file", stdout=StringIO())
+
+        self.reports_download.refresh_from_db()
+        self.assertEqual(self.reports_download.status, "completed")
+        self.assertEqual(self.reports_download.progress_phase, "download")
+        self.assertEqual(self.reports_download.progress_done, 1)
+        self.assertEqual(self.reports_download.progress_total, 1)
+        self.assertIsNotNone(self.reports_download.progress_updated_at)
+
+
+class RunJobsCommandTestCase(TestSurveyModelBase):
+    """Test run_jobs command with the survey handlers"""
+
+    def test_run_reports_download_job(self):
+        """Test a queued reports download is zipped by the worker"""
+        report = survey_models.Report.objects.create(
+            participant=self.create_participant(),
+            survey=self.create_survey(),
+            status="completed",
+            pdf_file=SimpleUploadedFile("test_report.pdf", b"%PDF-1.4 dummy"),
+        )
+        reports_download = self.create_reports_download(reports=[report])
+        reports_download.enqueue_job()
+
+        out = StringIO()
+        call_command("run_jobs", once=True, stdout=out)
+
+        reports_download.refresh_from_db()
+        self.assertEqual(reports_download.status, "completed", reports_download.logs)
+        self.assertTrue(reports_download.zip_file)
+        self.assertEqual(Job.objects.get().status, "completed")
+        self.assertIn("1 jobs run", out.getvalue())
+
+    def test_run_jobs_failed_object_retried(self):
+        """Test jobs of objects ending with error are retried"""
+        group_report = self.create_group_report()
+        group_report.enqueue_job()
+
+        call_command("run_jobs", once=True, stdout=StringIO())
+
+        # Group report without reports ends with error
+        group_report.refresh_from_db()
+        self.assertEqual(group_report.status, "error")
+        job = Job.objects.get()
+        self.assertEqual(job.status, "pending")
+        self.assertEqual(job.attempts, 1)
+        self.assertIn("GroupReport has no reports linked", job.last_error)
+
+    def test_run_jobs_max_jobs(self):
+        """Test the worker stops after max jobs"""
+        handler = MagicMock()
+        for report_id in range(3):
+            enqueue("report", {"report_id": report_id})
+
+        with patch.dict(HANDLERS, {"report": handler}):
+            call_command("run_jobs", max_jobs=2, stdout=StringIO())
+
+        self.assertEqual(handler.call_count, 2)
+        self.assertEqual(Job.objects.filter(status="pending").count(), 1)
+
+
+class LeasesTestCase(TestSurveyModelBase):
+    """Test claiming rows with leases, heartbeats and reaping"""
+
+    def setUp(self):
+        super().setUp()
+        self.group_reports = [self.create_group_report() for _ in range(2)]
+        self.pending = survey_models.GroupReport.objects.filter(
+            status="pending"
+        ).order_by("id")
+
+    def test_claim(self):
+        """Test rows are claimed once, in order, with a lease"""
+        group_report = claim(self.pending, lease_seconds=60)
+
+        self.assertEqual(group_report.id, self.group_reports[0].id)
+        self.assertEqual(group_report.status, "processing")
+        self.assertEqual(group_report.worker_id, get_worker_id())
+        self.assertEqual(group_report.attempts, 1)
+        self.assertGreater(
+            group_report.lease_expires_at, timezone.now() + timedelta(seconds=50)
+        )
+
+        self.assertEqual(claim(self.pending).id, self.group_reports[1].id)
+        self.assertIsNone(claim(self.pending))
+
+    def test_heartbeat(self):
+        """Test heartbeats extend the lease until it is reaped"""
+        group_report = claim(self.pending, lease_seconds=1)
+        lease_expires_at = group_report.lease_expires_at
+
+        self.assertTrue(heartbeat(group_report, lease_seconds=60))
+        self.assertGreater(group_report.lease_expires_at, lease_expires_at)
+
+        # Lease lost after being reaped
+        survey_models.GroupReport.objects.filter(id=group_report.id).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        reap_expired_leases(survey_models.GroupReport)
+        self.assertFalse(heartbeat(group_report))
+
+    def test_reap_expired_leases(self):
+        """Test expired leases return to pending, or error without attempts left"""
+        first = claim(self.pending)
+        second = claim(self.pending)
+        survey_models.GroupReport.objects.filter(id=second.id).update(
+            attempts=settings.JOBS_MAX_ATTEMPTS
+        )
+        survey_models.GroupReport.objects.update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        requeued, failed = reap_expired_leases(survey_models.GroupReport)
+
+        self.assertEqual((requeued, failed), (1, 1))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, "pending")
+        self.assertEqual(first.worker_id, "")
+        self.assertIsNone(first.lease_expires_at)
+        self.assertIn("Lease expired", first.logs)
+        self.assertEqual(second.status, "error")
+
+        # Requeued row can be claimed again
+        self.assertEqual(claim(self.pending).attempts, 2)
+
+    def test_reap_jobs_max_attempts(self):
+        """Test jobs use their own max attempts"""
+        job = enqueue("report", {"report_id": 1})
+        Job.objects.filter(id=job.id).update(max_attempts=1)
+        claim_next_job()
+        Job.objects.update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(reap_expired_leases(Job), (0, 1))
+
+    def test_reap_command(self):
+        """Test reap command and run_jobs requeue stopped workers rows"""
+        group_report = claim(self.pending)
+        survey_models.GroupReport.objects.filter(id=group_report.id).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        out = StringIO()
+        call_command("reap_expired_leases", stdout=out)
+
+        self.assertIn("survey.GroupReport: 1 requeued", out.getvalue())
+        group_report.refresh_from_db()
+        self.assertEqual(group_report.status, "pending")
+
+    def test_command_releases_lease(self):
+        """Test commands clear the lease with the final status"""
+        group_report = self.group_reports[0]
+        call_command("create_group_report", id=group_report.id, stdout=StringIO())
+
+        group_report.refresh_from_db()
+        self.assertEqual(group_report.status, "error")
+        self.assertEqual(group_report.worker_id, "")
+        self.assertIsNone(group_report.lease_expires_at)
+        self.assertEqual(group_report.attempts, 1)
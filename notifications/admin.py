@@ -0,0 +1,53 @@
+from django.contrib import admin, messages
+
+from notifications import models
+from notifications.events import schedule_delivery
+
+
+@admin.register(models.Endpoint)
+class EndpointAdmin(admin.ModelAdmin):
+    list_display = ("name", "url", "event_types", "is_active", "created_at")
+    list_filter = ("is_active", "created_at")
+    search_fields = ("name", "url")
+    readonly_fields = ("created_at", "updated_at")
+
+
+@admin.register(models.Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    actions = ("resend_notifications",)
+    list_display = (
+        "id",
+        "event_type",
+        "endpoint",
+        "status",
+        "attempts",
+        "delivered_at",
+        "created_at",
+    )
+    list_filter = ("status", "event_type", "endpoint", "created_at")
+    search_fields = ("event_type", "event_id")
+    readonly_fields = (
+        "event_id",
+        "attempts",
+        "last_error",
+        "delivered_at",
+        "created_at",
+        "updated_at",
+    )
+    ordering = ("-created_at",)
+    list_per_page = 30
+
+    def resend_notifications(self, request, queryset):
+        updated = queryset.update(status="pending")
+        for endpoint in models.Endpoint.objects.filter(
+            notifications__in=queryset, is_active=True
+        ).distinct():
+            schedule_delivery(endpoint, delay_seconds=0)
+
+        self.message_user(
+            request,
+            f"{updated} notificaciones enviadas a la cola nuevamente.",
+            messages.SUCCESS,
+        )
+
+    resend_notifications.short_description = "Reenviar notificaciones"
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class NotificationsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "notifications"
+    verbose_name = "Notificaciones"
+
+    def ready(self):
+        # Register job handlers
+        from notifications import jobs  # noqa: F401
@@ -0,0 +1,141 @@
+import hmac
+import json
+import time
+import hashlib
+
+import requests
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.utils import timezone
+
+from jobs.queue import JobError
+from notifications.events import schedule_delivery
+from notifications.models import Endpoint, Notification
+
+SIGNATURE_HEADER = "X-Signature"
+
+# Max age of a signature accepted by verify_signature
+SIGNATURE_TOLERANCE_SECONDS = 300
+
+
+def sign(secret: str, timestamp: int, body: bytes) -> str:
+    """HMAC SHA256 hex digest of the timestamp and the request body
+
+    Args:
+        secret (str): endpoint secret
+        timestamp (int): unix timestamp of the request
+        body (bytes): request body
+
+    Returns:
+        str: signature
+    """
+    message = f"{timestamp}.".encode() + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def get_signature_header(secret: str, body: bytes, timestamp: int | None = None) -> str:
+    """Signature header value: "t=<timestamp>,v1=<signature>"
+
+    Args:
+        secret (str): endpoint secret
+        body (bytes): request body
+        timestamp (int | None): unix timestamp (default now)
+
+    Returns:
+        str: header value
+    """
+    if timestamp is None:
+        timestamp = int(time.time())
+    return f"t={timestamp},v1={sign(secret, timestamp, body)}"
+
+
+def verify_signature(
+    secret: str,
+    body: bytes,
+    header: str,
+    tolerance: int = SIGNATURE_TOLERANCE_SECONDS,
+) -> bool:
+    """Check the signature header of a received request (for receivers)
+
+    Args:
+        secret (str): endpoint secret
+        body (bytes): request body
+        header (str): signature header value
+        tolerance (int): max age of the signature in seconds
+
+    Returns:
+        bool: True if the body was signed with the secret recently
+    """
+    try:
+        parts = dict(part.split("=", 1) for part in header.split(","))
+        timestamp = int(parts["t"])
+        signature = parts["v1"]
+    except (KeyError, ValueError):
+        return False
+
+    if abs(time.time() - timestamp) > tolerance:
+        return False
+    return hmac.compare_digest(sign(secret, timestamp, body), signature)
+
+
+def deliver(endpoint: Endpoint) -> int:
+    """Send the pending notifications of an endpoint in one signed request
+    ({"events": [...]}), queuing the next batch if there are more
+
+    Args:
+        endpoint (Endpoint): notifications destination
+
+    Raises:
+        JobError: the endpoint did not accept the events (retried later)
+
+    Returns:
+        int: notifications delivered
+    """
+    notifications = list(
+        endpoint.notifications.filter(status="pending").order_by("id")[
+            : settings.NOTIFICATIONS_BATCH_SIZE
+        ]
+    )
+    if not notifications:
+        return 0
+
+    body = json.dumps(
+        {"events": [notification.get_event() for notification in notifications]},
+        cls=DjangoJSONEncoder,
+    ).encode()
+    headers = {
+        "Content-Type": "application/json",
+        SIGNATURE_HEADER: get_signature_header(endpoint.secret, body),
+    }
+
+    error = ""
+    try:
+        res = requests.post(
+            endpoint.url,
+            data=body,
+            headers=headers,
+            timeout=settings.NOTIFICATIONS_TIMEOUT,
+        )
+        if not 200 <= res.status_code < 300:
+            error = f"Endpoint responded {res.status_code}: {res.text[:200]}"
+    except requests.RequestException as e:
+        error = f"Failed to send notifications: {str(e)}"
+
+    sent = Notification.objects.filter(id__in=[n.id for n in notifications])
+    if error:
+        sent.update(attempts=F("attempts") + 1, last_error=error)
+        raise JobError(error)
+
+    sent.update(
+        status="completed",
+        attempts=F("attempts") + 1,
+        last_error="",
+        delivered_at=timezone.now(),
+    )
+
+    # Events over the batch size
+    if endpoint.notifications.filter(status="pending").exists():
+        schedule_delivery(endpoint, delay_seconds=0)
+
+    return len(notifications)
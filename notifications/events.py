@@ -0,0 +1,106 @@
+from collections.abc import Callable
+
+from django.conf import settings
+from django.db import models
+from django.db.models.signals import post_init, post_save
+
+from jobs.models import Job
+from jobs.queue import enqueue
+from jobs.signals import status_updated
+from notifications.models import Endpoint, Notification
+
+
+def schedule_delivery(endpoint: Endpoint, delay_seconds: int | None = None):
+    """Queue the delivery of the pending notifications of an endpoint,
+    unless a delivery is already waiting (events in a burst are sent
+    together in one request)
+
+    Args:
+        endpoint (Endpoint): notifications destination
+        delay_seconds (int | None): seconds to wait for more events
+            (default NOTIFICATIONS_BATCH_SECONDS)
+    """
+    waiting = Job.objects.filter(
+        job_type="notifications",
+        status="pending",
+        payload__endpoint_id=endpoint.id,
+    ).exists()
+    if waiting:
+        return
+
+    if delay_seconds is None:
+        delay_seconds = settings.NOTIFICATIONS_BATCH_SECONDS
+    enqueue(
+        "notifications",
+        {"endpoint_id": endpoint.id},
+        delay_seconds=delay_seconds,
+        max_attempts=settings.NOTIFICATIONS_MAX_ATTEMPTS,
+    )
+
+
+def notify(event_type: str, data: dict) -> list[Notification]:
+    """Save an event for the active endpoints subscribed to it and queue
+    its delivery (no network calls)
+
+    Args:
+        event_type (str): object type and status (e.g. "report.completed")
+        data (dict): event data (json serializable)
+
+    Returns:
+        list[Notification]: notifications created
+    """
+    notifications = []
+    for endpoint in Endpoint.objects.filter(is_active=True):
+        if not endpoint.accepts(event_type):
+            continue
+        notifications.append(
+            Notification.objects.create(
+                endpoint=endpoint, event_type=event_type, data=data
+            )
+        )
+        schedule_delivery(endpoint)
+    return notifications
+
+
+def get_default_data(obj: models.Model) -> dict:
+    """Event data of an object: id, status and last update"""
+    return {"id": obj.id, "status": obj.status, "updated_at": obj.updated_at}
+
+
+def notify_status_changes(
+    model: type[models.Model],
+    object_type: str,
+    get_data: Callable[[models.Model], dict] = get_default_data,
+    select_related: tuple[str] = (),
+):
+    """Send a "<object_type>.<status>" event when a model instance is
+    created or saved with a new status. Queryset updates are notified when
+    they send jobs.signals.status_updated with the updated ids
+
+    Args:
+        model (type[models.Model]): model with a status field
+        object_type (str): event object type (e.g. "report")
+        get_data (Callable[[models.Model], dict]): event data of an instance
+        select_related (tuple[str]): relations used by get_data (loaded
+            with the updated rows)
+    """
+
+    def track_status(sender, instance, **kwargs):
+        instance._notified_status = instance.status
+
+    def notify_status(sender, instance, created, raw=False, **kwargs):
+        if raw:
+            return
+        if not created and instance.status == instance._notified_status:
+            return
+        instance._notified_status = instance.status
+        notify(f"{object_type}.{instance.status}", get_data(instance))
+
+    def notify_updated_status(sender, ids, **kwargs):
+        updated = model.objects.filter(id__in=ids).select_related(*select_related)
+        for instance in updated.order_by("id"):
+            notify(f"{object_type}.{instance.status}", get_data(instance))
+
+    post_init.connect(track_status, sender=model, weak=False)
+    post_save.connect(notify_status, sender=model, weak=False)
+    status_updated.connect(notify_updated_status, sender=model, weak=False)
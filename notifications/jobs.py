@@ -0,0 +1,11 @@
+from jobs.queue import register
+from notifications.delivery import deliver
+from notifications.models import Endpoint
+
+
+@register("notifications")
+def deliver_notifications(payload: dict):
+    """Send the pending notifications of an endpoint"""
+    endpoint = Endpoint.objects.filter(id=payload["endpoint_id"], is_active=True).first()
+    if endpoint:
+        deliver(endpoint)
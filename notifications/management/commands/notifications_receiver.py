@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from notifications.receiver import NotificationsReceiver
+
+
+class Command(BaseCommand):
+    help = "Run a local notifications endpoint that verifies the signatures "
+    help += "and prints the received events (development stand-in)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--secret",
+            type=str,
+            required=True,
+            help="Endpoint secret (same as the notifications endpoint in the admin)",
+        )
+        parser.add_argument(
+            "--host",
+            type=str,
+            default="127.0.0.1",
+            help="Host to listen on",
+        )
+        parser.add_argument(
+            "--port",
+            type=int,
+            default=8765,
+            help="Port to listen on",
+        )
+
+    def handle(self, *args, **options):
+        def print_events(events):
+            for event in events:
+                self.stdout.write(json.dumps(event))
+
+        receiver = NotificationsReceiver(
+            options["secret"],
+            host=options["host"],
+            port=options["port"],
+            on_events=print_events,
+        )
+        self.stdout.write(f"Listening notifications in {receiver.url}")
+        try:
+            receiver.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped")
+        finally:
+            receiver.server_close()
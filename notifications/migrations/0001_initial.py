@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:36
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+import notifications.models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Endpoint',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, verbose_name='Nombre')),
+                ('url', models.URLField(help_text='URL que recibe los eventos (POST con JSON firmado)', max_length=500, verbose_name='URL')),
+                ('secret', models.CharField(default=notifications.models.get_secret, help_text='Clave para firmar los eventos (HMAC SHA256, encabezado X-Signature)', max_length=255, verbose_name='Secreto')),
+                ('event_types', models.JSONField(blank=True, default=list, help_text='Eventos a enviar, ejemplo: ["report.completed", "reports_download.error"]. Vacío: todos los eventos', verbose_name='Tipos de evento')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Activo')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Destino de notificaciones',
+                'verbose_name_plural': 'Destinos de notificaciones',
+            },
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('event_id', models.UUIDField(default=uuid.uuid4, editable=False, help_text='Id único del evento (para ignorar entregas repetidas)', verbose_name='Id del evento')),
+                ('event_type', models.CharField(help_text='Objeto y nuevo estado, ejemplo: report.completed', max_length=100, verbose_name='Tipo de evento')),
+                ('data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Datos')),
+                ('status', models.CharField(choices=[('pending', '⏳ Pendiente'), ('processing', '⚡ Procesando'), ('completed', '✔ Completado'), ('error', '✖ Error')], default='pending', help_text='Estado de la entrega', max_length=255, verbose_name='Estado')),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Número de envíos al destino', verbose_name='Intentos')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Último error')),
+                ('delivered_at', models.DateTimeField(blank=True, null=True, verbose_name='Entregado')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('endpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='notifications.endpoint', verbose_name='Destino')),
+            ],
+            options={
+                'verbose_name': 'Notificación',
+                'verbose_name_plural': 'Notificaciones',
+                'indexes': [models.Index(fields=['endpoint', 'status'], name='notif_endpoint_status_idx')],
+            },
+        ),
+    ]
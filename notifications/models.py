@@ -0,0 +1,121 @@
+import uuid
+import secrets
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+from core.choices import STATUS_CHOICES
+
+
+def get_secret() -> str:
+    return secrets.token_hex(32)
+
+
+class Endpoint(models.Model):
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=255, verbose_name="Nombre")
+    url = models.URLField(
+        max_length=500,
+        verbose_name="URL",
+        help_text="URL que recibe los eventos (POST con JSON firmado)",
+    )
+    secret = models.CharField(
+        max_length=255,
+        default=get_secret,
+        verbose_name="Secreto",
+        help_text="Clave para firmar los eventos (HMAC SHA256, "
+        "encabezado X-Signature)",
+    )
+    event_types = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name="Tipos de evento",
+        help_text='Eventos a enviar, ejemplo: ["report.completed", '
+        '"reports_download.error"]. Vacío: todos los eventos',
+    )
+    is_active = models.BooleanField(default=True, verbose_name="Activo")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def accepts(self, event_type: str) -> bool:
+        """Check if the endpoint is subscribed to an event type"""
+        return not self.event_types or event_type in self.event_types
+
+    def __str__(self):
+        return f"{self.name} - {self.url}"
+
+    class Meta:
+        verbose_name = "Destino de notificaciones"
+        verbose_name_plural = "Destinos de notificaciones"
+
+
+class Notification(models.Model):
+    id = models.AutoField(primary_key=True)
+    endpoint = models.ForeignKey(
+        Endpoint,
+        on_delete=models.CASCADE,
+        related_name="notifications",
+        verbose_name="Destino",
+    )
+    event_id = models.UUIDField(
+        default=uuid.uuid4,
+        editable=False,
+        verbose_name="Id del evento",
+        help_text="Id único del evento (para ignorar entregas repetidas)",
+    )
+    event_type = models.CharField(
+        max_length=100,
+        verbose_name="Tipo de evento",
+        help_text="Objeto y nuevo estado, ejemplo: report.completed",
+    )
+    data = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        verbose_name="Datos",
+    )
+    status = models.CharField(
+        max_length=255,
+        choices=STATUS_CHOICES,
+        default="pending",
+        verbose_name="Estado",
+        help_text="Estado de la entrega",
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Intentos",
+        help_text="Número de envíos al destino",
+    )
+    last_error = models.TextField(
+        blank=True,
+        default="",
+        verbose_name="Último error",
+    )
+    delivered_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Entregado",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def get_event(self) -> dict:
+        """Event data sent to the endpoint"""
+        return {
+            "id": str(self.event_id),
+            "type": self.event_type,
+            "created_at": self.created_at,
+            "data": self.data,
+        }
+
+    def __str__(self):
+        return f"{self.event_type} - {self.endpoint.name} ({self.status})"
+
+    class Meta:
+        verbose_name = "Notificación"
+        verbose_name_plural = "Notificaciones"
+        indexes = [
+            models.Index(
+                fields=["endpoint", "status"],
+                name="notif_endpoint_status_idx",
+            ),
+        ]
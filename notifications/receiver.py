@@ -0,0 +1,78 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from notifications.delivery import SIGNATURE_HEADER, verify_signature
+
+
+class NotificationsRequestHandler(BaseHTTPRequestHandler):
+    """Accept signed notification batches, rejecting invalid signatures"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        signature = self.headers.get(SIGNATURE_HEADER, "")
+        if not verify_signature(self.server.secret, body, signature):
+            self.send_response(401)
+            self.end_headers()
+            return
+
+        events = json.loads(body)["events"]
+        self.server.received.append(events)
+        if self.server.on_events:
+            self.server.on_events(events)
+
+        self.send_response(self.server.response_status)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class NotificationsReceiver(ThreadingHTTPServer):
+    """Local stand-in of a notifications endpoint (for development and tests)
+
+    Args:
+        secret (str): endpoint secret to verify the signatures
+        host (str): host to listen on
+        port (int): port to listen on (0: random free port)
+        on_events (callable | None): called with the events of each request
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        secret: str,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        on_events=None,
+    ):
+        super().__init__((host, port), NotificationsRequestHandler)
+        self.secret = secret
+        self.on_events = on_events
+        self.received = []
+        self.response_status = 200
+        self.__thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "NotificationsReceiver":
+        """Serve requests in a background thread"""
+        self.__thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self.__thread:
+            self.__thread.join()
+
+    def __enter__(self) -> "NotificationsReceiver":
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
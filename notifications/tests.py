@@ -0,0 +1,213 @@
+import time
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.tests_base.test_models import TestSurveyModelBase
+from jobs.leases import claim, reap_expired_leases
+from jobs.models import Job
+from notifications.delivery import get_signature_header, sign, verify_signature
+from notifications.events import notify
+from notifications.models import Endpoint, Notification
+from notifications.receiver import NotificationsReceiver
+from survey import models as survey_models
+
+
+class SignatureTestCase(TestCase):
+    """Test HMAC signatures of the notifications"""
+
+    def test_verify_signature(self):
+        """Test signed bodies are accepted, changes and old ones rejected"""
+        body = b'{"events": []}'
+        header = get_signature_header("secret", body)
+
+        self.assertTrue(verify_signature("secret", body, header))
+        self.assertFalse(verify_signature("other secret", body, header))
+        self.assertFalse(verify_signature("secret", b'{"events": [1]}', header))
+        self.assertFalse(verify_signature("secret", body, "invalid"))
+
+        # Replayed requests
+        timestamp = int(time.time()) - 600
+        old_header = f"t={timestamp},v1={sign('secret', timestamp, body)}"
+        self.assertFalse(verify_signature("secret", body, old_header))
+
+
+@override_settings(NOTIFICATIONS_BATCH_SECONDS=0)
+class NotificationsTestCase(TestSurveyModelBase):
+    """Test status events saved, batched and delivered to a local endpoint"""
+
+    def setUp(self):
+        super().setUp()
+        self.receiver = NotificationsReceiver("test secret").start()
+        self.endpoint = Endpoint.objects.create(
+            name="Test", url=self.receiver.url, secret="test secret"
+        )
+
+    def tearDown(self):
+        self.receiver.stop()
+        super().tearDown()
+
+    def __run_jobs(self):
+        call_command("run_jobs", once=True, stdout=StringIO())
+
+    def test_status_change_events(self):
+        """Test events on creation and status changes, for subscribed endpoints"""
+        Endpoint.objects.create(
+            name="Errors", url=self.receiver.url, event_types=["group_report.error"]
+        )
+        group_report = self.create_group_report()
+        group_report.save()
+        group_report.status = "completed"
+        group_report.save()
+
+        self.assertEqual(
+            list(
+                Notification.objects.order_by("id").values_list(
+                    "endpoint__name", "event_type"
+                )
+            ),
+            [("Test", "group_report.pending"), ("Test", "group_report.completed")],
+        )
+        data = Notification.objects.last().data
+        self.assertEqual(data["id"], group_report.id)
+        self.assertEqual(data["status"], "completed")
+
+        # Burst batched in one delivery
+        self.assertEqual(Job.objects.filter(job_type="notifications").count(), 1)
+
+    def test_queryset_update_events(self):
+        """Test status changes by lease claims and reaped leases are notified"""
+        group_report = self.create_group_report()
+        Notification.objects.all().delete()
+
+        claim(survey_models.GroupReport.objects.filter(id=group_report.id))
+        survey_models.GroupReport.objects.filter(id=group_report.id).update(
+            lease_expires_at=timezone.now()
+        )
+        reap_expired_leases(survey_models.GroupReport)
+
+        self.assertEqual(
+            list(
+                Notification.objects.order_by("id").values_list(
+                    "event_type", flat=True
+                )
+            ),
+            ["group_report.processing", "group_report.pending"],
+        )
+
+    def test_report_company_from_cached_participant(self):
+        """Test report events use the loaded participant for the company id"""
+        participant = self.create_participant()
+        report = survey_models.Report.objects.create(
+            participant=participant, survey=self.create_survey()
+        )
+        report = survey_models.Report.objects.select_related("participant").get(
+            id=report.id
+        )
+        report.status = "completed"
+
+        with CaptureQueriesContext(connection) as context:
+            report.save()
+
+        queries = [query["sql"] for query in context.captured_queries]
+        self.assertFalse(
+            [query for query in queries if 'FROM "survey_participant"' in query]
+        )
+        data = Notification.objects.get(event_type="report.completed").data
+        self.assertEqual(data["company_id"], participant.company_id)
+
+    def test_deliver_batch(self):
+        """Test the events are sent together with a valid signature"""
+        for index in range(3):
+            notify("report.completed", {"id": index})
+
+        self.__run_jobs()
+
+        self.assertEqual(len(self.receiver.received), 1)
+        events = self.receiver.received[0]
+        self.assertEqual([event["data"]["id"] for event in events], [0, 1, 2])
+        self.assertEqual(events[0]["type"], "report.completed")
+        self.assertEqual(
+            Notification.objects.filter(status="completed", attempts=1).count(), 3
+        )
+
+    @override_settings(NOTIFICATIONS_BATCH_SIZE=2)
+    def test_deliver_batch_size(self):
+        """Test events over the batch size are sent in the next request"""
+        for index in range(3):
+            notify("report.completed", {"id": index})
+
+        self.__run_jobs()
+
+        self.assertEqual([len(events) for events in self.receiver.received], [2, 1])
+        self.assertFalse(Notification.objects.filter(status="pending").exists())
+
+    @override_settings(JOBS_RETRY_SECONDS=0)
+    def test_deliver_retry(self):
+        """Test rejected deliveries are retried with the same events"""
+        notify("report.error", {"id": 1})
+        self.receiver.response_status = 500
+
+        call_command("run_jobs", max_jobs=1, stdout=StringIO())
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.status, "pending")
+        self.assertEqual(notification.attempts, 1)
+        self.assertIn("500", notification.last_error)
+        job = Job.objects.get()
+        self.assertEqual(job.status, "pending")
+        self.assertEqual(job.max_attempts, 8)
+
+        # Endpoint back online
+        self.receiver.response_status = 200
+        self.__run_jobs()
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, "completed")
+        self.assertEqual(notification.attempts, 2)
+        self.assertIsNotNone(notification.delivered_at)
+        self.assertEqual(
+            [events[0]["id"] for events in self.receiver.received],
+            [str(notification.event_id)] * 2,
+        )
+
+    def test_invalid_secret_rejected(self):
+        """Test the receiver rejects events signed with another secret"""
+        self.endpoint.secret = "other secret"
+        self.endpoint.save()
+        notify("report.completed", {"id": 1})
+
+        call_command("run_jobs", max_jobs=1, stdout=StringIO())
+
+        self.assertEqual(self.receiver.received, [])
+        self.assertIn("401", Notification.objects.get().last_error)
+
+    def test_reports_download_completed(self):
+        """Test the zip generation notifies its claim and its completion with
+        the file url"""
+        report = survey_models.Report.objects.create(
+            participant=self.create_participant(),
+            survey=self.create_survey(),
+            status="completed",
+            pdf_file=SimpleUploadedFile("test_report.pdf", b"%PDF-1.4 dummy"),
+        )
+        reports_download = self.create_reports_download(reports=[report])
+        Notification.objects.all().delete()
+        Job.objects.all().delete()
+        reports_download.enqueue_job()
+
+        self.__run_jobs()
+
+        events = [event for events in self.receiver.received for event in events]
+        self.assertEqual(
+            [event["type"] for event in events],
+            ["reports_download.processing", "reports_download.completed"],
+        )
+        data = events[1]["data"]
+        self.assertEqual(data["id"], reports_download.id)
+        self.assertIn(f"reports_download_{reports_download.id}", data["file_url"])
@@ -26,8 +26,75 @@ HOST = os.getenv("HOST")
 TEST_HEADLESS = os.getenv("TEST_HEADLESS", "False") == "True"
 PAGE_SIZE = int(os.getenv("PAGE_SIZE", 10))
 NOMINAL_RANKING_CHUNK_SIZE = int(os.getenv("NOMINAL_RANKING_CHUNK_SIZE", 18))
+# Group report heatmap renderer: "svg" (single vector per page) or "table"
+GROUP_REPORT_HEATMAP_RENDERER = os.getenv("GROUP_REPORT_HEATMAP_RENDERER", "svg")
+GROUP_REPORTS_WORKERS = int(os.getenv("GROUP_REPORTS_WORKERS", 2))
+# Reports download (zip) parallel pdf downloads
+REPORTS_DOWNLOAD_WORKERS = int(os.getenv("REPORTS_DOWNLOAD_WORKERS", 8))
+REPORTS_DOWNLOAD_TIMEOUT = int(os.getenv("REPORTS_DOWNLOAD_TIMEOUT", 30))
+REPORTS_DOWNLOAD_RETRIES = int(os.getenv("REPORTS_DOWNLOAD_RETRIES", 3))
+# Read pdf files from the storage backend ("storage") or media urls ("http")
+REPORTS_DOWNLOAD_SOURCE = os.getenv("REPORTS_DOWNLOAD_SOURCE", "storage")
+# Reports zipped on the fly when downloaded (more reports use a background job)
+REPORTS_ZIP_STREAM_MAX_REPORTS = int(os.getenv("REPORTS_ZIP_STREAM_MAX_REPORTS", 200))
+# Reports download zip files cache limits (pruned by least recently used)
+REPORTS_DOWNLOADS_CACHE_MAX_MB = int(os.getenv("REPORTS_DOWNLOADS_CACHE_MAX_MB", 2048))
+REPORTS_DOWNLOADS_CACHE_DAYS = int(os.getenv("REPORTS_DOWNLOADS_CACHE_DAYS", 30))
+# Pre-render the group report pages without company data once (pdf cache)
+GROUP_REPORT_STATIC_PAGES_CACHE = (
+    os.getenv("GROUP_REPORT_STATIC_PAGES_CACHE", "True") == "True"
+)
+# Jobs queue (run_jobs command)
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", 3))
+JOBS_RETRY_SECONDS = int(os.getenv("JOBS_RETRY_SECONDS", 60))
+JOBS_POLL_SECONDS = float(os.getenv("JOBS_POLL_SECONDS", 5))
+# Processing rows return to pending if the worker stops renewing the lease
+JOBS_LEASE_SECONDS = int(os.getenv("JOBS_LEASE_SECONDS", 300))
+# Max processing jobs of the same group, like a company reports (0: no limit)
+JOBS_MAX_CONCURRENT_PER_GROUP = int(os.getenv("JOBS_MAX_CONCURRENT_PER_GROUP", 2))
+# Min seconds between progress saves of long running jobs
+JOBS_PROGRESS_SECONDS = float(os.getenv("JOBS_PROGRESS_SECONDS", 5))
+# Outbound status notifications (events in a burst are sent in one request)
+NOTIFICATIONS_BATCH_SECONDS = int(os.getenv("NOTIFICATIONS_BATCH_SECONDS", 5))
+NOTIFICATIONS_BATCH_SIZE = int(os.getenv("NOTIFICATIONS_BATCH_SIZE", 100))
+NOTIFICATIONS_TIMEOUT = int(os.getenv("NOTIFICATIONS_TIMEOUT", 10))
+NOTIFICATIONS_MAX_ATTEMPTS = int(os.getenv("NOTIFICATIONS_MAX_ATTEMPTS", 8))
+# Form progress saves buffered in the cache and written in bulk by a job
+# (requires a cache shared by all the processes, like redis or memcached:
+# ignored with the per process locmem cache, see survey.checks)
+FORM_PROGRESS_WRITE_BEHIND = os.getenv("FORM_PROGRESS_WRITE_BEHIND", "False") == "True"
+FORM_PROGRESS_FLUSH_SECONDS = int(os.getenv("FORM_PROGRESS_FLUSH_SECONDS", 5))
+# Save form progress data as zlib compressed json (compress_form_progress
+# command converts the saved rows)
+FORM_PROGRESS_COMPRESS = os.getenv("FORM_PROGRESS_COMPRESS", "False") == "True"
+# Cache (survey detail json, keyed by the version saved in each survey: a
+# per process cache is only slower to fill, never stale)
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+SURVEY_DETAIL_CACHE_SECONDS = int(os.getenv("SURVEY_DETAIL_CACHE_SECONDS", 86400))
+# Browser and CDN cache of the event calendar files (.ics)
+EVENTS_ICS_CACHE_SECONDS = int(os.getenv("EVENTS_ICS_CACHE_SECONDS", 300))
+# Invitation code lookups (unknown codes are cached for less time), only
+# cached with a CACHE_BACKEND shared by the processes
+INVITATION_CODE_CACHE_SECONDS = int(os.getenv("INVITATION_CODE_CACHE_SECONDS", 300))
+INVITATION_CODE_NEGATIVE_CACHE_SECONDS = int(
+    os.getenv("INVITATION_CODE_NEGATIVE_CACHE_SECONDS", 60)
+)
+
+# Status api: seconds between polls (Retry-After header)
+STATUS_POLL_SECONDS = int(os.getenv("STATUS_POLL_SECONDS", 2))
+# Long-poll (?wait=<seconds>) blocks a worker during the wait: keep it
+# disabled with gunicorn sync workers
+STATUS_LONG_POLL_ENABLED = os.getenv("STATUS_LONG_POLL_ENABLED", "False") == "True"
+STATUS_LONG_POLL_MAX_SECONDS = int(os.getenv("STATUS_LONG_POLL_MAX_SECONDS", 30))
+STATUS_LONG_POLL_INTERVAL = float(os.getenv("STATUS_LONG_POLL_INTERVAL", 1))
 BAR_CHART_ENDPOINT = os.getenv("BAR_CHART_ENDPOINT")
-N8N_BASE_WEBHOOKS = os.getenv("N8N_BASE_WEBHOOKS")
 PDF_REPORT_TITLE = os.getenv("PDF_REPORT_TITLE", "Alfabetización Tecnológica")
 PDF_REPORT_ACRONYM = os.getenv("PDF_REPORT_ACRONYM", "AFT")
 
@@ -37,6 +104,9 @@ TEST_BAR_CHART_ENDPOINT = os.getenv("TEST_BAR_CHART_ENDPOINT")
 # Setup database for testing and production
 IS_TESTING = len(sys.argv) > 1 and sys.argv[1] == "test"
 
+# Tests save their media files in a temporary MEDIA_ROOT
+TEST_RUNNER = "project.test_runner.TempMediaTestRunner"
+
 if IS_TESTING:
     STORAGE_AWS = False
     DATABASES = {
@@ -76,6 +146,8 @@ INSTALLED_APPS = [
     "core",
     "survey",
     "events",
+    "jobs",
+    "notifications",
     # Installed apps
     "corsheaders",
     "rest_framework",
@@ -0,0 +1,23 @@
+import shutil
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TempMediaTestRunner(DiscoverRunner):
+    """Test runner that saves the media files of the tests (logos, reports
+    pdfs, zips, group reports) in a temporary MEDIA_ROOT, removed at the end
+    of the run, instead of the repository media folder
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.media_root = tempfile.mkdtemp(prefix="test_media_")
+        self.media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.media_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.media_settings.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
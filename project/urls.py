@@ -6,6 +6,7 @@ from django.conf.urls.static import static
 
 from rest_framework import routers
 
+from survey import models as survey_models
 from survey import views as survey_views
 from events import views as events_views
 from core import views as core_views
@@ -41,7 +42,33 @@ urlpatterns = [
         name="participant-has-answer",
     ),
     path("api/progress/", survey_views.FormProgressView.as_view(), name="progress"),
+    path(
+        "api/reports/<int:pk>/status/",
+        survey_views.StatusView.as_view(model=survey_models.Report),
+        name="report-status",
+    ),
+    path(
+        "api/reports-downloads/<int:pk>/status/",
+        survey_views.StatusView.as_view(model=survey_models.ReportsDownload),
+        name="reports-download-status",
+    ),
+    path(
+        "api/group-reports/<int:pk>/status/",
+        survey_views.StatusView.as_view(model=survey_models.GroupReport),
+        name="group-report-status",
+    ),
     path("group-report-pdf/<int:company_id>/", survey_views.GroupReportPDFView.as_view(), name="group-report-pdf"),
+    path("reports-zip/", survey_views.ReportsZipView.as_view(), name="reports-zip"),
+    path(
+        "reports-downloads/<int:pk>/progress/",
+        survey_views.ProgressView.as_view(model=survey_models.ReportsDownload),
+        name="reports-download-progress",
+    ),
+    path(
+        "group-reports/<int:pk>/progress/",
+        survey_views.ProgressView.as_view(model=survey_models.GroupReport),
+        name="group-report-progress",
+    ),
     # Event forms URLs
     path("events/", include("events.urls")),
     path("api/events/<slug:slug>/submit/", events_views.LeadSubmitView.as_view(), name="lead-submit"),
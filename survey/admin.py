@@ -1,12 +1,19 @@
+from django.conf import settings
 from django.contrib import admin, messages
 from django.http import HttpResponse
 from django.shortcuts import redirect
 from django.urls import re_path
+from django.utils import timezone
 from django.utils.html import format_html
 
+from jobs.progress import get_progress
+from jobs.scheduling import get_queue_estimates
+from jobs.signals import status_updated
 from survey import models
 
 from utils.media import get_media_url
+from utils.reports_download import get_or_create_reports_download
+from utils.zip_stream import get_reports_zip_response
 
 
 # Custom filters for deep filtering relationships (3+ levels)
@@ -75,6 +82,33 @@ class QuestionFilter(admin.SimpleListFilter):
         return queryset
 
 
+class ProgressAdminMixin:
+    """Percent complete and eta columns of models with progress fields"""
+
+    progress_readonly_fields = (
+        "progress_phase",
+        "progress_done",
+        "progress_total",
+        "progress_started_at",
+        "progress_updated_at",
+    )
+
+    def progress_percent(self, obj):
+        progress = get_progress(obj)
+        if progress["percent"] is None:
+            return "-"
+        return f"{progress['percent']}% ({progress['done']}/{progress['total']})"
+
+    def progress_eta(self, obj):
+        eta = get_progress(obj)["eta"]
+        if not eta:
+            return "-"
+        return timezone.localtime(eta).strftime("%d/%m/%Y %H:%M:%S")
+
+    progress_percent.short_description = "Progreso"
+    progress_eta.short_description = "Fin estimado"
+
+
 @admin.register(models.Company)
 class CompanyAdmin(admin.ModelAdmin):
     list_display = ("name", "invitation_code", "is_active", "created_at", "group_report_button")
@@ -122,7 +156,7 @@ class CompanyAdmin(admin.ModelAdmin):
 
         group_report = models.GroupReport.objects.create(company=company)
         group_report.reports.set(completed_reports)
-        group_report.trigger_webhook()
+        group_report.enqueue_job()
 
         self.message_user(
             request,
@@ -233,11 +267,21 @@ class ParticipantAdmin(admin.ModelAdmin):
 
 @admin.register(models.Report)
 class ReportAdmin(admin.ModelAdmin):
-    actions = ("set_to_pending", "create_reports_download", "create_group_report")
+    actions = (
+        "set_to_pending",
+        "bump_priority",
+        "reset_priority",
+        "stream_reports_download",
+        "create_reports_download",
+        "create_group_report",
+    )
     list_display = (
         "participant",
         "survey",
         "status",
+        "priority",
+        "queue_position",
+        "estimated_start",
         "total",
         "created_at",
         "custom_links",
@@ -250,9 +294,58 @@ class ReportAdmin(admin.ModelAdmin):
         "updated_at",
     )
     search_fields = ("participant__name", "survey__name")
-    readonly_fields = ("created_at", "updated_at")
+    readonly_fields = (
+        "queue_position",
+        "estimated_start",
+        "created_at",
+        "updated_at",
+    )
+
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+        self.__set_queue_estimates(changelist.result_list)
+        return changelist
+
+    def get_object(self, request, object_id, from_field=None):
+        report = super().get_object(request, object_id, from_field)
+        if report:
+            self.__set_queue_estimates([report])
+        return report
+
+    def __set_queue_estimates(self, reports):
+        """Attach the queue estimates to the reports of the page (computed in
+        each request, the admin instance is shared between requests)"""
+        pending_reports = [report for report in reports if report.status == "pending"]
+        estimates = {}
+        if pending_reports:
+            estimates = get_queue_estimates("report", "report_id")
+        for report in reports:
+            report.queue_estimate = estimates.get(report.id)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if "priority" in form.changed_data:
+            obj.update_job_priority()
 
     # CUSTOM FIELDS
+    def queue_position(self, obj):
+        """Position of the pending report in the jobs queue"""
+        estimate = getattr(obj, "queue_estimate", None)
+        return estimate["position"] if estimate else "-"
+
+    queue_position.short_description = "Posición en cola"
+
+    def estimated_start(self, obj):
+        """Estimated start of the pending report generation"""
+        estimate = getattr(obj, "queue_estimate", None)
+        if not estimate:
+            return "-"
+        return timezone.localtime(estimate["estimated_start"]).strftime(
+            "%d/%m/%Y %H:%M"
+        )
+
+    estimated_start.short_description = "Inicio estimado"
+
     def custom_links(self, obj):
         """Create custom Imprimir and Ver buttons"""
 
@@ -278,14 +371,53 @@ class ReportAdmin(admin.ModelAdmin):
     custom_links.short_description = "Acciones"
 
     def set_to_pending(self, request, queryset):
+        # Queryset update: the changed reports are notified with the signal
+        updated_ids = list(
+            queryset.exclude(status="pending").values_list("id", flat=True)
+        )
         queryset.update(status="pending")
+        status_updated.send(sender=models.Report, ids=updated_ids)
+        # Reports already pending keep their queued job
+        for report in models.Report.objects.filter(id__in=updated_ids).select_related(
+            "participant"
+        ):
+            report.enqueue_job()
+
+    def bump_priority(self, request, queryset):
+        for report in queryset:
+            report.priority += 1
+            report.save(update_fields=["priority", "updated_at"])
+            report.update_job_priority()
 
-    def create_reports_download(self, request, queryset):
-        reports_download = models.ReportsDownload.objects.create(
-            status="pending",
+        self.message_user(
+            request,
+            f"Prioridad aumentada en {queryset.count()} reportes.",
+            messages.SUCCESS,
         )
-        reports_download.reports.set(queryset)
-        reports_download.trigger_webhook()
+
+    def reset_priority(self, request, queryset):
+        for report in queryset.exclude(priority=0):
+            report.priority = 0
+            report.save(update_fields=["priority", "updated_at"])
+            report.update_job_priority()
+
+        self.message_user(
+            request,
+            "Prioridad restablecida en los reportes seleccionados.",
+            messages.SUCCESS,
+        )
+
+    def create_reports_download(self, request, queryset):
+        reports_download, created = get_or_create_reports_download(queryset)
+
+        if not created:
+            self.message_user(
+                request,
+                f"Ya existe una descarga con los mismos reportes "
+                f"({reports_download}). Consulta tabla de descargas.",
+                messages.SUCCESS,
+            )
+            return
 
         self.message_user(
             request,
@@ -293,10 +425,32 @@ class ReportAdmin(admin.ModelAdmin):
             messages.SUCCESS,
         )
 
+    def stream_reports_download(self, request, queryset):
+        reports = queryset.filter(status="completed").exclude(pdf_file="")
+        if not reports.exists():
+            self.message_user(
+                request,
+                "Los reportes seleccionados no tienen PDF.",
+                messages.ERROR,
+            )
+            return
+
+        # Big selections: generate the zip file in background
+        if reports.count() > settings.REPORTS_ZIP_STREAM_MAX_REPORTS:
+            self.message_user(
+                request,
+                f"Más de {settings.REPORTS_ZIP_STREAM_MAX_REPORTS} reportes "
+                "seleccionados, se generará el ZIP en segundo plano.",
+                messages.WARNING,
+            )
+            return self.create_reports_download(request, queryset)
+
+        return get_reports_zip_response(reports)
+
     def create_group_report(self, request, queryset):
         group_report = models.GroupReport.objects.create()
         group_report.reports.set(queryset)
-        group_report.trigger_webhook()
+        group_report.enqueue_job()
 
         self.message_user(
             request,
@@ -305,6 +459,9 @@ class ReportAdmin(admin.ModelAdmin):
         )
 
     set_to_pending.short_description = "Establecer a pendiente"
+    bump_priority.short_description = "Aumentar prioridad"
+    reset_priority.short_description = "Restablecer prioridad"
+    stream_reports_download.short_description = "Descargar reportes (ZIP inmediato)"
     create_reports_download.short_description = "Descargar reportes"
     create_group_report.short_description = "Generar reporte grupal"
 
@@ -393,10 +550,29 @@ class CompanyDesiredScoreAdmin(admin.ModelAdmin):
 
 
 @admin.register(models.ReportsDownload)
-class ReportsDownloadAdmin(admin.ModelAdmin):
-    list_display = ("id", "status", "reports_num", "created_at", "custom_links")
+class ReportsDownloadAdmin(ProgressAdminMixin, admin.ModelAdmin):
+    list_display = (
+        "id",
+        "status",
+        "progress_percent",
+        "progress_eta",
+        "reports_num",
+        "zip_size",
+        "last_used_at",
+        "expired_at",
+        "created_at",
+        "custom_links",
+    )
     list_filter = ("status", "created_at", "updated_at")
-    readonly_fields = ("created_at", "updated_at")
+    readonly_fields = (
+        "fingerprint",
+        "zip_size",
+        "last_used_at",
+        "expired_at",
+        *ProgressAdminMixin.progress_readonly_fields,
+        "created_at",
+        "updated_at",
+    )
     ordering = ("-created_at",)
     list_per_page = 30
 
@@ -431,10 +607,23 @@ class ReportsDownloadAdmin(admin.ModelAdmin):
 
 
 @admin.register(models.GroupReport)
-class GroupReportAdmin(admin.ModelAdmin):
-    list_display = ("id", "status", "company_info", "reports_num", "created_at", "custom_links")
+class GroupReportAdmin(ProgressAdminMixin, admin.ModelAdmin):
+    list_display = (
+        "id",
+        "status",
+        "progress_percent",
+        "progress_eta",
+        "company_info",
+        "reports_num",
+        "created_at",
+        "custom_links",
+    )
     list_filter = ("status", "created_at", "updated_at")
-    readonly_fields = ("created_at", "updated_at")
+    readonly_fields = (
+        *ProgressAdminMixin.progress_readonly_fields,
+        "created_at",
+        "updated_at",
+    )
     ordering = ("-created_at",)
     list_per_page = 30
 
@@ -499,4 +688,6 @@ class FormProgressAdmin(admin.ModelAdmin):
     )
     list_filter = ("survey", "company", "created_at", "expires_at")
     search_fields = ("email", "company__name", "survey__name")
-    readonly_fields = ("created_at", "updated_at")
+    readonly_fields = ("form_data", "version", "created_at", "updated_at")
+    # Data shown decompressed in form_data (data is empty when compressed)
+    exclude = ("data", "data_compressed")
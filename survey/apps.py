@@ -3,4 +3,12 @@ from django.apps import AppConfig
 
 class SurveyConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
-    name = "survey"
\ No newline at end of file
+    name = "survey"
+
+    def ready(self):
+        # Register job handlers, status notifications, cache invalidation
+        # and system checks
+        from survey import checks  # noqa: F401
+        from survey import jobs  # noqa: F401
+        from survey import notifications  # noqa: F401
+        from survey import signals  # noqa: F401
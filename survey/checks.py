@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+from utils import progress_buffer
+
+
+@register()
+def check_form_progress_cache(app_configs, **kwargs):
+    """The form progress write-behind buffer needs a cache shared by all the
+    processes (the saves are flushed by the jobs worker)"""
+    if settings.FORM_PROGRESS_WRITE_BEHIND and not progress_buffer.is_shared_cache():
+        return [
+            Error(
+                "FORM_PROGRESS_WRITE_BEHIND requires a cache shared by all the "
+                "processes (CACHE_BACKEND redis, memcached, database or file "
+                "based): with a per process cache the jobs worker never sees "
+                "the buffered saves",
+                hint="Set CACHE_BACKEND or FORM_PROGRESS_WRITE_BEHIND=False",
+                id="survey.E001",
+            )
+        ]
+    return []
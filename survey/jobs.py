@@ -0,0 +1,57 @@
+from django.core.management import call_command
+from django.db import models as django_models
+
+from jobs.queue import JobError, register
+from jobs.scheduling import register_group_limit
+from survey import models
+from utils import progress_buffer
+
+
+def check_status(model: type[django_models.Model], object_id: int):
+    """Raise a job error (the job is retried) if the object failed
+
+    Args:
+        model (type[django_models.Model]): Report, ReportsDownload or GroupReport
+        object_id (int): processed object id
+    """
+    obj = model.objects.get(id=object_id)
+    if obj.status == "error":
+        logs = (obj.logs or "").strip().splitlines()
+        raise JobError(f"{obj} failed: {logs[-1] if logs else 'no logs'}")
+
+
+@register("report")
+def generate_report(payload: dict):
+    """Generate the pdf of a report"""
+    call_command("generate_next_report", id=payload["report_id"])
+    check_status(models.Report, payload["report_id"])
+
+
+@register("reports_download")
+def create_reports_download_file(payload: dict):
+    """Generate the zip file of a reports download"""
+    call_command("create_reports_download_file", id=payload["reports_download_id"])
+    check_status(models.ReportsDownload, payload["reports_download_id"])
+
+
+@register("group_report")
+def create_group_report(payload: dict):
+    """Generate the pdf of a group report"""
+    call_command("create_group_report", id=payload["group_report_id"])
+    check_status(models.GroupReport, payload["group_report_id"])
+
+
+@register("form_progress")
+def flush_form_progress(payload: dict):
+    """Write the buffered form progress saves (write-behind mode)"""
+    progress_buffer.flush_progress()
+
+
+@register_group_limit("company")
+def get_company_limit(company_id: str) -> int | None:
+    """Max reports of a company generated at the same time"""
+    return (
+        models.Company.objects.filter(id=company_id)
+        .values_list("max_concurrent_reports", flat=True)
+        .first()
+    )
@@ -0,0 +1,391 @@
+import os
+import json
+import time
+import random
+import shutil
+import platform
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.choices import POSITION_CHOICES
+from survey import models
+from utils.group_report_generator import (
+    build_group_report_context,
+    render_group_report_html,
+    write_group_report_pdf,
+)
+from utils.survey_calcs_group import SurveyCalcsGroupTexts
+
+BASE_FILE = os.path.basename(__file__)
+
+DEFAULT_SIZES = "100,1000,10000"
+DEFAULT_OUTPUT = os.path.join(
+    settings.BASE_DIR, "media", "temp", "benchmarks", "group_report.json"
+)
+PHASES = ["stats", "context", "html", "pdf"]
+METRICS = ["queries", "peak_memory_kb", "wall_time_s"]
+
+
+class Command(BaseCommand):
+    help = "Benchmark group report generation with synthetic companies. "
+    help += "Records queries, peak memory and wall time per phase "
+    help += "(stats, context, html, pdf) and compares against a baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=str,
+            default=DEFAULT_SIZES,
+            help=f"Participants per synthetic company (default: {DEFAULT_SIZES})",
+        )
+        parser.add_argument(
+            "--db",
+            type=str,
+            choices=["temp", "memory", "default"],
+            default="temp",
+            help="Database to seed: temp sqlite file, in-memory sqlite, "
+            "or the default database (rolled back at the end, only with DEBUG)",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default=DEFAULT_OUTPUT,
+            help="Json results file",
+        )
+        parser.add_argument(
+            "--baseline",
+            type=str,
+            default=None,
+            help="Json results file to compare against",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed relative increase of memory and time over the "
+            "baseline (default: 0.2)",
+        )
+        parser.add_argument(
+            "--skip-pdf",
+            action="store_true",
+            help="Skip the pdf write phase",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=1,
+            help="Random seed for the synthetic data",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",") if size]
+        except ValueError:
+            raise CommandError(f"Invalid sizes: {options['sizes']}")
+
+        phases = [
+            phase for phase in PHASES if not (phase == "pdf" and options["skip_pdf"])
+        ]
+        random_generator = random.Random(options["seed"])
+
+        # Never seed the configured database of a deployed instance
+        if options["db"] == "default" and not settings.DEBUG:
+            raise CommandError("--db default is only allowed with DEBUG=True")
+
+        results = []
+        if options["db"] == "default":
+            # Seed inside a transaction and discard the data at the end
+            with transaction.atomic():
+                self.__load_survey_data()
+                for size in sizes:
+                    results.append(self.__run_size(size, phases, random_generator))
+                transaction.set_rollback(True)
+        else:
+            in_memory = options["db"] == "memory"
+            with sqlite_database(in_memory=in_memory):
+                self.__load_survey_data()
+                for size in sizes:
+                    results.append(self.__run_size(size, phases, random_generator))
+
+        data = {
+            "created_at": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "heatmap_renderer": settings.GROUP_REPORT_HEATMAP_RENDERER,
+            "results": results,
+        }
+
+        output_folder = os.path.dirname(options["output"])
+        if output_folder:
+            os.makedirs(output_folder, exist_ok=True)
+        with open(options["output"], "w") as file:
+            json.dump(data, file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results saved in {options['output']}"))
+
+        if options["baseline"]:
+            with open(options["baseline"]) as file:
+                baseline = json.load(file)
+
+            regressions = compare_results(data, baseline, options["tolerance"])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(regression))
+                raise CommandError(f"{len(regressions)} regressions found")
+            self.stdout.write(self.style.SUCCESS("No regressions found"))
+
+    def __load_survey_data(self):
+        """Load the real survey structure and texts (fixtures)"""
+        if not models.Survey.objects.exists():
+            call_command("apps_loaddata")
+            call_command("initial_loaddata")
+
+        self.survey = models.Survey.objects.order_by("id").first()
+        if not self.survey:
+            raise CommandError("Survey fixtures could not be loaded")
+        self.question_groups = list(
+            models.QuestionGroup.objects.filter(survey=self.survey).order_by(
+                "survey_index"
+            )
+        )
+
+    def __seed_company(
+        self, size: int, random_generator: random.Random
+    ) -> models.Company:
+        """Create a company with size participants and completed reports"""
+        company = models.Company.objects.create(name=f"Benchmark {size}")
+        positions = [position for position, _ in POSITION_CHOICES]
+        paragraph_types = [
+            paragraph_type
+            for paragraph_type, _ in models.TextPDFSummary.TEXT_TYPE_CHOICES
+        ]
+
+        participants = models.Participant.objects.bulk_create(
+            [
+                models.Participant(
+                    name=f"Participante {index}",
+                    email=f"benchmark_{company.id}_{index}@test.com",
+                    gender="o",
+                    birth_range="1981-1996",
+                    position=random_generator.choice(positions),
+                    company=company,
+                )
+                for index in range(size)
+            ],
+            batch_size=1000,
+        )
+
+        scores = [
+            [random_generator.uniform(20, 100) for _ in self.question_groups]
+            for _ in participants
+        ]
+        reports = models.Report.objects.bulk_create(
+            [
+                models.Report(
+                    survey=self.survey,
+                    participant=participant,
+                    status="completed",
+                    total=round(
+                        sum(
+                            score * question_group.survey_percentage / 100
+                            for score, question_group in zip(
+                                participant_scores, self.question_groups
+                            )
+                        ),
+                        2,
+                    ),
+                )
+                for participant, participant_scores in zip(participants, scores)
+            ],
+            batch_size=1000,
+        )
+
+        models.ReportQuestionGroupTotal.objects.bulk_create(
+            [
+                models.ReportQuestionGroupTotal(
+                    report=report,
+                    question_group=question_group,
+                    total=round(score, 2),
+                )
+                for report, participant_scores in zip(reports, scores)
+                for question_group, score in zip(
+                    self.question_groups, participant_scores
+                )
+            ],
+            batch_size=1000,
+        )
+        models.ReportSummaryScore.objects.bulk_create(
+            [
+                models.ReportSummaryScore(
+                    report=report,
+                    paragraph_type=paragraph_type,
+                    score=round(random_generator.uniform(20, 100), 2),
+                )
+                for report in reports
+                for paragraph_type in paragraph_types
+            ],
+            batch_size=1000,
+        )
+
+        return company
+
+    def __run_size(
+        self, size: int, phases: list[str], random_generator: random.Random
+    ) -> dict:
+        """Seed a company and measure each generation phase"""
+        self.stdout.write(f"Seeding company with {size} participants")
+        company = self.__seed_company(size, random_generator)
+        reports = models.Report.objects.filter(participant__company=company)
+
+        state = {}
+
+        def run_stats():
+            # Warm every cached group stat used by the template
+            calcs = SurveyCalcsGroupTexts(reports=reports)
+            calcs.get_employees_number()
+            calcs.get_average()
+            calcs.get_average_areas_ordered(use_summary=True)
+            calcs.get_average_areas_ordered(use_summary=False)
+            calcs.get_standard_deviation_total()
+            calcs.get_max_score()
+            calcs.get_min_score()
+            calcs.get_participant_distribution()
+            calcs.get_heatmap_themes()
+            calcs.get_heatmap_data()
+            state["calcs"] = calcs
+
+        def run_context():
+            state["context"] = build_group_report_context(
+                reports,
+                company_name=company.name,
+                additional_recommendations=company.additional_recommendations,
+                calcs=state["calcs"],
+            )
+
+        def run_html():
+            state["html"] = render_group_report_html(state["context"])
+
+        def run_pdf():
+            state["pdf"] = write_group_report_pdf(
+                state["html"], static_pages=state["context"]["static_pages"]
+            )
+
+        phases_functions = {
+            "stats": run_stats,
+            "context": run_context,
+            "html": run_html,
+            "pdf": run_pdf,
+        }
+
+        result = {"participants": size, "phases": {}}
+        tracemalloc.start()
+        try:
+            for phase in phases:
+                tracemalloc.reset_peak()
+                memory_start = tracemalloc.get_traced_memory()[0]
+                start = time.perf_counter()
+                with CaptureQueriesContext(connection) as queries:
+                    phases_functions[phase]()
+                wall_time = time.perf_counter() - start
+                peak_memory = tracemalloc.get_traced_memory()[1] - memory_start
+
+                result["phases"][phase] = {
+                    "queries": len(queries),
+                    "peak_memory_kb": round(peak_memory / 1024, 1),
+                    "wall_time_s": round(wall_time, 4),
+                }
+                self.stdout.write(
+                    f"  {size} participants - {phase}: "
+                    f"{len(queries)} queries, "
+                    f"{result['phases'][phase]['peak_memory_kb']} KB, "
+                    f"{result['phases'][phase]['wall_time_s']} s"
+                )
+        finally:
+            tracemalloc.stop()
+
+        return result
+
+
+@contextmanager
+def sqlite_database(in_memory: bool = False):
+    """Point the default connection to a new migrated sqlite database, then
+    restore the original connection (untouched, with its open transaction)
+
+    Args:
+        in_memory (bool): use an in-memory database instead of a temp file
+    """
+    folder = None
+    name = ":memory:"
+    if not in_memory:
+        folder = tempfile.mkdtemp(prefix="benchmark_")
+        name = os.path.join(folder, "benchmark.sqlite3")
+
+    original_settings = connections.settings["default"]
+    original_connection = connections["default"]
+    try:
+        connections.settings["default"] = connections.configure_settings(
+            {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": name}}
+        )["default"]
+        del connections["default"]
+
+        call_command("migrate", verbosity=0, interactive=False)
+        yield name
+    finally:
+        if connections["default"] is not original_connection:
+            connections["default"].close()
+        connections.settings["default"] = original_settings
+        connections["default"] = original_connection
+        if folder:
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+def compare_results(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Compare benchmark results against a baseline
+
+    Args:
+        current (dict): current benchmark data
+        baseline (dict): baseline benchmark data
+        tolerance (float): allowed relative increase of memory and time
+
+    Returns:
+        list[str]: regression messages (empty if no regressions)
+    """
+    baseline_results = {
+        result["participants"]: result["phases"] for result in baseline["results"]
+    }
+
+    regressions = []
+    for result in current["results"]:
+        baseline_phases = baseline_results.get(result["participants"])
+        if not baseline_phases:
+            continue
+
+        for phase, metrics in result["phases"].items():
+            baseline_metrics = baseline_phases.get(phase)
+            if not baseline_metrics:
+                continue
+
+            for metric in METRICS:
+                value = metrics[metric]
+                baseline_value = baseline_metrics[metric]
+
+                # Query counts are deterministic, any increase is a regression
+                limit = baseline_value
+                if metric != "queries":
+                    limit = baseline_value * (1 + tolerance)
+
+                if value > limit:
+                    regressions.append(
+                        f"{result['participants']} participants - {phase} - "
+                        f"{metric}: {value} (baseline {baseline_value})"
+                    )
+
+    return regressions
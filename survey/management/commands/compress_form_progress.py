@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from survey.models import FormProgress, encode_form_data
+
+
+class Command(BaseCommand):
+    help = "Convert the saved form progress data to zlib compressed json "
+    help += "(or back to plain json with --decompress), in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Records loaded and updated in each batch",
+        )
+        parser.add_argument(
+            "--decompress",
+            action="store_true",
+            help="Convert compressed records back to plain json",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        compress = not options["decompress"]
+        if compress:
+            pending = FormProgress.objects.filter(
+                data_compressed__isnull=True, data__isnull=False
+            )
+        else:
+            pending = FormProgress.objects.filter(data_compressed__isnull=False)
+
+        converted_count = 0
+        last_id = 0
+        while True:
+            # Keyset pagination: rows saved meanwhile don't shift the batches
+            progresses = list(
+                pending.filter(id__gt=last_id)
+                .only("id", "data", "data_compressed", "version")
+                .order_by("id")[:batch_size]
+            )
+            if not progresses:
+                break
+
+            with transaction.atomic():
+                for progress in progresses:
+                    # Skip the records saved again meanwhile (new version)
+                    converted_count += FormProgress.objects.filter(
+                        id=progress.id, version=progress.version
+                    ).update(**encode_form_data(progress.form_data, compress=compress))
+
+            last_id = progresses[-1].id
+            self.stdout.write(f"Converted {converted_count} records")
+
+        action = "compressed" if compress else "decompressed"
+        self.stdout.write(
+            self.style.SUCCESS(f"Successfully {action} {converted_count} records")
+        )
@@ -1,41 +1,58 @@
 from django.core.files.base import ContentFile
 from django.core.management.base import BaseCommand
+from django.db import IntegrityError, transaction
 
+from jobs.leases import LeaseHeartbeat, claim, release
+from jobs.progress import ProgressTracker
 from survey import models
 
-from utils.group_report_generator import generate_group_report_pdf
+from utils.group_report_generator import (
+    generate_group_report_pdf,
+    get_group_report_fingerprint,
+)
 
 
 class Command(BaseCommand):
     help = "Generate next pending group report PDF"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--id",
+            type=int,
+            default=None,
+            help="Group report to generate (pending or with error)",
+        )
+
     def handle(self, *args, **kwargs):
         logs = ""
+        next_group_report = None
+        lease_heartbeat = None
 
         try:
-            next_group_report = (
-                models.GroupReport.objects.filter(status="pending")
-                .order_by("created_at")
-                .first()
-            )
+            group_reports = models.GroupReport.objects.filter(status="pending")
+            if kwargs.get("id"):
+                group_reports = models.GroupReport.objects.filter(
+                    id=kwargs["id"], status__in=["pending", "error"]
+                )
+            # Claim it (skipped by other workers while the lease is renewed)
+            next_group_report = claim(group_reports.order_by("created_at"))
             if not next_group_report:
                 message = "No pending group reports to generate"
                 logs += message + "\n"
                 self.stdout.write(self.style.SUCCESS(message))
                 return
+            lease_heartbeat = LeaseHeartbeat(next_group_report).start()
 
             message = f"Processing GroupReport {next_group_report.id}"
             logs += message + "\n"
             self.stdout.write(message)
 
-            next_group_report.status = "processing"
-            next_group_report.save()
-
             reports = next_group_report.reports.all()
             if not reports.exists():
                 message = "GroupReport has no reports linked"
                 logs += message + "\n"
                 self.stdout.write(self.style.ERROR(message))
+                release(next_group_report)
                 next_group_report.status = "error"
                 next_group_report.logs = logs
                 next_group_report.save()
@@ -57,14 +74,23 @@ class Command(BaseCommand):
                 reports=reports,
                 company_name=company_name,
                 additional_recommendations=additional_recommendations,
+                progress=ProgressTracker(next_group_report),
             )
 
+            # Fingerprint of the data actually rendered (used as pdf cache key)
+            self.__save_fingerprint(
+                next_group_report,
+                get_group_report_fingerprint(
+                    reports, company=next_group_report.company
+                ),
+            )
             next_group_report.pdf_file.save(
                 f"group_report_{next_group_report.id}.pdf",
                 ContentFile(pdf_bytes),
                 save=True,
             )
 
+            release(next_group_report)
             next_group_report.status = "completed"
             message = f"GroupReport {next_group_report.id} completed"
             logs += message + "\n"
@@ -75,8 +101,28 @@ class Command(BaseCommand):
             logs += message + "\n"
             self.stdout.write(self.style.ERROR(message))
             if next_group_report:
+                release(next_group_report)
                 next_group_report.status = "error"
 
+        finally:
+            if lease_heartbeat:
+                lease_heartbeat.stop()
+
         if next_group_report:
             next_group_report.logs = logs
             next_group_report.save()
+
+    def __save_fingerprint(self, group_report: models.GroupReport, fingerprint: str):
+        """Save the fingerprint unless another group report of the company
+        already caches the same data (then it's not used as cache)"""
+        try:
+            with transaction.atomic():
+                models.GroupReport.objects.filter(id=group_report.id).update(
+                    fingerprint=fingerprint
+                )
+        except IntegrityError:
+            fingerprint = ""
+            models.GroupReport.objects.filter(id=group_report.id).update(
+                fingerprint=fingerprint
+            )
+        group_report.fingerprint = fingerprint
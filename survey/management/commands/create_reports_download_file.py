@@ -1,116 +1,299 @@
 import os
-import uuid
-import json
+import queue
+import threading
 import requests
-import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Iterator
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from django.core.files.base import File
-from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
 
+from jobs.leases import LeaseHeartbeat, claim, release
+from jobs.progress import ProgressTracker
 from survey import models
 
-from utils import pdf_generator
-from utils.screenshots import render_image_from_url
-from utils.survey_calcs import SurveyCalcs
-from utils.media import get_media_url
+from utils.media import get_media_url, iter_media_file, save_media_stream
+from utils.reports_download import get_reports_download_fingerprint
+from utils.zip_stream import get_report_zip_name, iter_zip_stream
 
 BASE_FILE = os.path.basename(__file__)
 
+# Chunk size of the pdf files fetched (http chunks or storage reads)
+CHUNK_SIZE = 1024 * 1024
+
+# Chunks fetched ahead of the zip writer per pdf file: at most
+# REPORTS_DOWNLOAD_WORKERS * (QUEUE_CHUNKS + 1) chunks in memory
+QUEUE_CHUNKS = 4
+
+# Last item queued for a pdf file fetched completely
+END_OF_FILE = None
+
+
+class PdfFetchError(Exception):
+    """Error fetching a pdf file (queued instead of its next chunk)"""
+
+
+def get_download_session() -> requests.Session:
+    """Session with a keep-alive connection pool (one connection per worker)
+    and retries with backoff for connection errors and 5xx responses
+
+    Returns:
+        requests.Session: session to download the pdf files
+    """
+    retry = Retry(
+        total=settings.REPORTS_DOWNLOAD_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=settings.REPORTS_DOWNLOAD_WORKERS,
+        pool_maxsize=settings.REPORTS_DOWNLOAD_WORKERS,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def iter_download_chunks(session: requests.Session, pdf_url: str) -> Iterator[bytes]:
+    """Download a pdf file from its media url in chunks
+
+    Args:
+        session (requests.Session): shared download session
+        pdf_url (str): pdf file url
+
+    Returns:
+        Iterator[bytes]: pdf file content chunks
+    """
+    res = session.get(pdf_url, timeout=settings.REPORTS_DOWNLOAD_TIMEOUT, stream=True)
+    try:
+        if res.status_code != 200:
+            raise requests.HTTPError(f"status code {res.status_code}")
+        yield from res.iter_content(CHUNK_SIZE)
+    finally:
+        res.close()
+
+
+def queue_pdf_chunks(
+    chunks: Iterator[bytes],
+    error_message: str,
+    chunks_queue: queue.Queue,
+    stopped: threading.Event,
+):
+    """Fetch a pdf file into the bounded queue read by the zip writer (runs in
+    a worker thread): its chunks, then END_OF_FILE or a PdfFetchError. Waits
+    while the queue is full, until the zip writer reads it or stops
+
+    Args:
+        chunks (Iterator[bytes]): pdf file content chunks (fetched lazily)
+        error_message (str): error prefix if the fetch fails
+        chunks_queue (queue.Queue): queue of the pdf file, read in order
+        stopped (threading.Event): set when the zip writer stops reading
+    """
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                chunks_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    with closing(chunks):
+        try:
+            for chunk in chunks:
+                if not put(chunk):
+                    return
+        except Exception as e:
+            put(PdfFetchError(f"{error_message}: {str(e)}"))
+            return
+    put(END_OF_FILE)
+
+
+def iter_queued_chunks(
+    first_chunk: bytes, chunks_queue: queue.Queue
+) -> Iterator[bytes]:
+    """Read the chunks of a pdf file from its queue, until END_OF_FILE
+
+    Args:
+        first_chunk (bytes): chunk already read from the queue
+        chunks_queue (queue.Queue): queue of the pdf file
+
+    Returns:
+        Iterator[bytes]: pdf file content chunks
+    """
+    chunk = first_chunk
+    while chunk is not END_OF_FILE:
+        if isinstance(chunk, PdfFetchError):
+            # Part of the file already in the zip: the download fails
+            raise chunk
+        yield chunk
+        chunk = chunks_queue.get()
+
 
 class Command(BaseCommand):
-    help = "Generate next report ready to be processed"
+    help = "Generate the zip file of the next pending reports download "
+    help += "(or the one selected with --id)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--source",
+            type=str,
+            choices=["storage", "http"],
+            default=settings.REPORTS_DOWNLOAD_SOURCE,
+            help="Read pdf files from the storage backend or download them "
+            "from their media url",
+        )
+        parser.add_argument(
+            "--id",
+            type=int,
+            default=None,
+            help="Reports download to generate (pending or with error)",
+        )
 
     def handle(self, *args, **kwargs):
+        source = kwargs.get("source", settings.REPORTS_DOWNLOAD_SOURCE)
 
         # Process logs
         logs = ""
-        temp_dir = os.path.join(settings.BASE_DIR, "media", "temp", "zips")
-        os.makedirs(temp_dir, exist_ok=True)
+        next_reports_download = None
+        lease_heartbeat = None
 
         try:
 
             # Get next download zip file to be generated
-            next_reports_download = (
-                models.ReportsDownload.objects.filter(status="pending")
-                .order_by("created_at")
-                .first()
-            )
+            reports_downloads = models.ReportsDownload.objects.filter(status="pending")
+            if kwargs.get("id"):
+                reports_downloads = models.ReportsDownload.objects.filter(
+                    id=kwargs["id"], status__in=["pending", "error"]
+                )
+            # Claim it (skipped by other workers while the lease is renewed)
+            next_reports_download = claim(reports_downloads.order_by("created_at"))
             if not next_reports_download:
                 message = "No reports to download"
                 logs += message + "\n"
                 self.stdout.write(self.style.SUCCESS(message))
                 return
+            lease_heartbeat = LeaseHeartbeat(next_reports_download).start()
+            progress = ProgressTracker(next_reports_download)
 
-            # Update status to processing
-            next_reports_download.status = "processing"
-            next_reports_download.save()
-
-            # Download in temp folder the report pdf files
-            pdf_downloaded_paths = []
+            # Report pdf files to add to the zip file (in order)
+            downloads = []
             for report in next_reports_download.reports.all():
                 if not report.pdf_file:
                     message = f"Report {report.id} has no pdf file"
                     logs += message + "\n"
                     self.stdout.write(self.style.WARNING(message))
                     continue
-                pdf_url = get_media_url(report.pdf_file)
-                message = f"Downloading pdf file {pdf_url}"
-                logs += message + "\n"
-                self.stdout.write(message)
-                res = requests.get(pdf_url)
-                if res.status_code != 200:
-                    message = f"Failed to download pdf file {pdf_url}"
-                    logs += message + "\n"
-                    self.stdout.write(self.style.ERROR(message))
-                    continue
-                pdf_path = os.path.join(
-                    temp_dir, f"{str(report.participant)}_{report.id}.pdf"
-                )
-                with open(pdf_path, "wb") as f:
-                    f.write(res.content)
-                pdf_downloaded_paths.append(pdf_path)
+                arcname = get_report_zip_name(report)
+                downloads.append((report.pdf_file, arcname))
 
-            # Generate zip file with all pdfs
-            message = "Generating zip file with all pdfs"
-            logs += message + "\n"
-            self.stdout.write(message)
-            zip_path = os.path.join(
-                temp_dir, f"reports_download_{next_reports_download.id}.zip"
+            progress.set_phase("download", total=len(downloads))
+            message = (
+                f"Downloading {len(downloads)} pdf files from {source} with "
+                f"{settings.REPORTS_DOWNLOAD_WORKERS} workers"
             )
-            with zipfile.ZipFile(zip_path, "w") as zipf:
-                for pdf_path in pdf_downloaded_paths:
-                    zipf.write(pdf_path, os.path.basename(pdf_path))
-
-            # Delete temp pdf files
-            message = "Deleting temp pdf files"
             logs += message + "\n"
             self.stdout.write(message)
-            for pdf_path in pdf_downloaded_paths:
-                os.remove(pdf_path)
 
-            # Add zip file to model
-            message = "Adding file to model"
+            def iter_pdf_entries(session, executor):
+                """Yield the pdf files in order, fetching the next ones in
+                parallel into bounded queues (no temp files)"""
+                nonlocal logs
+                stopped = threading.Event()
+
+                def submit(pdf_file):
+                    if source == "http":
+                        pdf_url = get_media_url(pdf_file)
+                        chunks = iter_download_chunks(session, pdf_url)
+                        error_message = f"Failed to download pdf file {pdf_url}"
+                    else:
+                        chunks = iter_media_file(
+                            pdf_file, range_size=CHUNK_SIZE, workers=1
+                        )
+                        error_message = f"Failed to read pdf file {pdf_file.name}"
+                    chunks_queue = queue.Queue(maxsize=QUEUE_CHUNKS)
+                    executor.submit(
+                        queue_pdf_chunks, chunks, error_message, chunks_queue, stopped
+                    )
+                    return chunks_queue
+
+                pending = deque()
+                downloads_iter = iter(downloads)
+                for pdf_file, arcname in downloads_iter:
+                    pending.append((submit(pdf_file), arcname))
+                    if len(pending) >= settings.REPORTS_DOWNLOAD_WORKERS:
+                        break
+
+                try:
+                    while pending:
+                        chunks_queue, arcname = pending.popleft()
+                        next_download = next(downloads_iter, None)
+                        if next_download:
+                            pending.append((submit(next_download[0]), next_download[1]))
+
+                        # Files failing before their first chunk are skipped
+                        first_chunk = chunks_queue.get()
+                        if isinstance(first_chunk, PdfFetchError):
+                            logs += str(first_chunk) + "\n"
+                            self.stdout.write(self.style.ERROR(str(first_chunk)))
+                        else:
+                            yield arcname, iter_queued_chunks(first_chunk, chunks_queue)
+
+                        # Save progress and logs while downloading
+                        if progress.advance():
+                            message = (
+                                f"Downloaded {progress.obj.progress_done}/"
+                                f"{len(downloads)} pdf files"
+                            )
+                            logs += message + "\n"
+                            self.stdout.write(message)
+                            models.ReportsDownload.objects.filter(
+                                id=next_reports_download.id
+                            ).update(logs=logs)
+                finally:
+                    # Zip stream stopped: release the workers fetching ahead
+                    stopped.set()
+
+            # Stream the zip file to the storage while the pdfs are fetched
+            message = "Generating zip file with all pdfs"
             logs += message + "\n"
             self.stdout.write(message)
-            next_reports_download.zip_file = SimpleUploadedFile(
-                name=os.path.basename(zip_path),
-                content=open(zip_path, "rb").read(),
-                content_type="application/zip",
-            )
-            next_reports_download.save()
+            with get_download_session() as session, ThreadPoolExecutor(
+                max_workers=settings.REPORTS_DOWNLOAD_WORKERS
+            ) as executor:
+                zip_name = save_media_stream(
+                    next_reports_download.zip_file,
+                    f"reports_download_{next_reports_download.id}.zip",
+                    iter_zip_stream(iter_pdf_entries(session, executor)),
+                )
 
-            # Delete temp zip file
-            message = "Deleting temp zip file"
+            message = f"Zip file saved in {zip_name}"
             logs += message + "\n"
             self.stdout.write(message)
-            os.remove(zip_path)
+
+            # Cache data to reuse the zip file for the same reports
+            next_reports_download.fingerprint = get_reports_download_fingerprint(
+                next_reports_download.reports.all()
+            )
+            next_reports_download.zip_size = next_reports_download.zip_file.size
+            next_reports_download.last_used_at = timezone.now()
 
             # Update status
             message = "Updating status to completed"
             logs += message + "\n"
             self.stdout.write(self.style.SUCCESS(message))
+            release(next_reports_download)
             next_reports_download.status = "completed"
             next_reports_download.save()
 
@@ -120,8 +303,13 @@ class Command(BaseCommand):
             logs += message + "\n"
             self.stdout.write(self.style.ERROR(message))
             if next_reports_download:
+                release(next_reports_download)
                 next_reports_download.status = "error"
 
+        finally:
+            if lease_heartbeat:
+                lease_heartbeat.stop()
+
         # Save logs and report download
         if next_reports_download:
             next_reports_download.logs = logs
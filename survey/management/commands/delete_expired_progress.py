@@ -1,14 +1,59 @@
+import time
+
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 from survey.models import FormProgress
 
 
 class Command(BaseCommand):
-    help = "Delete expired FormProgress records"
+    help = "Delete expired FormProgress records, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Records deleted in each transaction",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to wait between batches (lower database load)",
+        )
 
     def handle(self, *args, **options):
+        batch_size = options["batch_size"]
         now = timezone.now()
-        deleted_count, _ = FormProgress.objects.filter(expires_at__lt=now).delete()
+        expired = FormProgress.objects.filter(expires_at__lt=now)
+
+        deleted_count = 0
+        start = time.monotonic()
+        while True:
+            # Bounded scan of the expires_at index, one short transaction
+            # per batch (rows saved again meanwhile are not expired anymore)
+            ids = list(
+                expired.order_by("expires_at").values_list("id", flat=True)[
+                    :batch_size
+                ]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                batch_count, _ = expired.filter(id__in=ids).delete()
+            deleted_count += batch_count
+
+            if len(ids) < batch_size:
+                break
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+
+        elapsed = time.monotonic() - start
+        rate = deleted_count / elapsed if elapsed else 0
         self.stdout.write(
-            self.style.SUCCESS(f"Successfully deleted {deleted_count} expired records")
+            self.style.SUCCESS(
+                f"Successfully deleted {deleted_count} expired records "
+                f"in {elapsed:.1f}s ({rate:.0f} records/s)"
+            )
         )
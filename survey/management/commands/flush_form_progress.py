@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from utils.progress_buffer import flush_progress
+
+
+class Command(BaseCommand):
+    help = "Write the buffered form progress saves to the database "
+    help += "(FORM_PROGRESS_WRITE_BEHIND mode, also run by the form_progress job)"
+
+    def handle(self, *args, **options):
+        flushed_count = flush_progress()
+        self.stdout.write(
+            self.style.SUCCESS(f"Successfully flushed {flushed_count} progress records")
+        )
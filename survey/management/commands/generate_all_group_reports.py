@@ -0,0 +1,190 @@
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.leases import LeaseHeartbeat, claim, release
+from jobs.models import Job
+from jobs.queue import finish_job
+from survey import models
+
+from utils.group_report_generator import (
+    generate_group_report_pdf,
+    get_or_create_group_report,
+    load_group_report_shared_data,
+)
+
+# Shared data loaded once in the main process (inherited by forked workers)
+shared_data = None
+
+
+def build_group_report(job_id: int) -> dict:
+    """Generate and save the pdf of a group report (runs in a worker)
+
+    The job and the group report are claimed with leases renewed during the
+    generation: if the command stops, the jobs worker (run_jobs) reaps them
+    and generates the group report again
+
+    Args:
+        job_id (int): queued "group_report" job of the group report
+
+    Returns:
+        dict: group report id, company name, status and message
+    """
+    start = time.perf_counter()
+    job = claim(Job.objects.filter(id=job_id, status="pending"))
+    if not job:
+        return {
+            "id": None,
+            "company": f"Job {job_id}",
+            "status": "skipped",
+            "message": "Claimed by the jobs worker",
+        }
+
+    group_report_id = job.payload["group_report_id"]
+    group_reports = models.GroupReport.objects.filter(
+        id=group_report_id, status="pending"
+    ).select_related("company")
+    group_report = claim(group_reports)
+    if not group_report:
+        finish_job(job)
+        return {
+            "id": group_report_id,
+            "company": f"GroupReport {group_report_id}",
+            "status": "skipped",
+            "message": "Claimed by another worker",
+        }
+    company = group_report.company
+
+    with LeaseHeartbeat(job), LeaseHeartbeat(group_report):
+        try:
+            reports = group_report.reports.all()
+            pdf_bytes = generate_group_report_pdf(
+                reports=reports,
+                company_name=company.name,
+                additional_recommendations=company.additional_recommendations,
+                shared_data=shared_data,
+            )
+            group_report.pdf_file.save(
+                f"group_report_{group_report.id}.pdf",
+                ContentFile(pdf_bytes),
+                save=False,
+            )
+            group_report.status = "completed"
+            message = (
+                f"GroupReport {group_report.id} completed "
+                f"({reports.count()} reports, {time.perf_counter() - start:.2f} s)"
+            )
+        except Exception as e:
+            group_report.status = "error"
+            message = f"Error: {str(e)}"
+
+    release(group_report)
+    group_report.logs = message + "\n"
+    group_report.save()
+    # Failed group reports are retried by the jobs worker
+    finish_job(job, message if group_report.status == "error" else "")
+
+    return {
+        "id": group_report.id,
+        "company": company.name,
+        "status": group_report.status,
+        "message": message,
+    }
+
+
+class Command(BaseCommand):
+    help = "Generate the group report PDF of every active company (or the "
+    help += "selected ones), loading shared data once and spreading the "
+    help += "companies across a worker pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--company",
+            type=int,
+            nargs="+",
+            default=None,
+            help="Company ids to generate (default: all active companies)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.GROUP_REPORTS_WORKERS,
+            help="Worker processes (1 to generate in the current process)",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Generate again reports with a completed pdf for the same data",
+        )
+
+    def handle(self, *args, **options):
+        global shared_data
+
+        companies = models.Company.objects.filter(is_active=True)
+        if options["company"]:
+            companies = models.Company.objects.filter(id__in=options["company"])
+
+        # Create and queue a group report per company with new data
+        job_ids = []
+        for company in companies.order_by("id"):
+            reports = models.Report.objects.filter(participant__company=company)
+            if not reports.exists():
+                self.stdout.write(f"{company.name}: no reports, skipped")
+                continue
+
+            # Failed group reports of the same data are generated again
+            group_report, job = get_or_create_group_report(
+                company, reports, force=options["force"], retry_error=True
+            )
+            if not job:
+                self.stdout.write(
+                    f"{company.name}: group report {group_report.status} "
+                    "for the same data, skipped"
+                )
+                continue
+            job_ids.append(job.id)
+
+        if not job_ids:
+            self.stdout.write(self.style.SUCCESS("No group reports to generate"))
+            return
+
+        # Survey structure and weasyprint resources loaded once
+        shared_data = load_group_report_shared_data()
+
+        workers = max(1, min(options["workers"], len(job_ids)))
+        self.stdout.write(
+            f"Generating {len(job_ids)} group reports with {workers} workers"
+        )
+
+        if workers == 1:
+            results = map(build_group_report, job_ids)
+            self.__write_results(results)
+        else:
+            # Forked workers can't share the parent database connections
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("fork"),
+            ) as executor:
+                results = executor.map(build_group_report, job_ids)
+                self.__write_results(results)
+
+    def __write_results(self, results):
+        errors = 0
+        for result in results:
+            message = f"{result['company']}: {result['message']}"
+            if result["status"] == "completed":
+                self.stdout.write(self.style.SUCCESS(message))
+            elif result["status"] == "skipped":
+                self.stdout.write(message)
+            else:
+                errors += 1
+                self.stdout.write(self.style.ERROR(message))
+
+        if errors:
+            self.stdout.write(self.style.ERROR(f"{errors} group reports failed"))
@@ -6,6 +6,7 @@ from django.core.management.base import BaseCommand
 from django.conf import settings
 from django.core.files.base import File
 
+from jobs.leases import LeaseHeartbeat, claim, release
 from survey import models
 
 from utils import pdf_generator
@@ -18,14 +19,30 @@ BASE_FILE = os.path.basename(__file__)
 class Command(BaseCommand):
     help = "Generate next report ready to be processed"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--id",
+            type=int,
+            default=None,
+            help="Report to generate (pending or with error)",
+        )
+
     def handle(self, *args, **kwargs):
 
         # Process logs
         logs = ""
+        report = None
+        lease_heartbeat = None
 
         try:
-            # Get oldest report ready to be processed
-            reports = models.Report.objects.filter(status="pending").order_by("id")
+            # Get oldest report ready to be processed (higher priority first)
+            reports = models.Report.objects.filter(status="pending").order_by(
+                "-priority", "id"
+            )
+            if kwargs.get("id"):
+                reports = models.Report.objects.filter(
+                    id=kwargs["id"], status__in=["pending", "error"]
+                )
             if reports.count() == 0:
                 message = "No reports ready to be processed"
                 logs += f"{message}\n"
@@ -35,14 +52,20 @@ class Command(BaseCommand):
             logs += f"{message}\n"
             print(message)
 
-            # Get oldest report
-            report = reports.first()
+            # Claim oldest report (skipped by other workers while the lease
+            # is renewed)
+            report = claim(reports)
+            if not report:
+                message = "Reports already claimed by other workers"
+                logs += f"{message}\n"
+                print(message)
+                return
+            lease_heartbeat = LeaseHeartbeat(report).start()
             message = f"Processing report {report.id}"
             logs += f"{message}\n"
             print(message)
 
             # Reset main data
-            report.status = "processing"
             report.logs = ""
             report.pdf_file = None
             report.save()
@@ -118,6 +141,7 @@ class Command(BaseCommand):
             )
 
             if not os.path.exists(pdf_path):
+                release(report)
                 report.status = "error"
                 report.logs = logs + "\nEl reporte no fue generado correctamente."
                 report.save()
@@ -131,6 +155,7 @@ class Command(BaseCommand):
             with open(pdf_path, "rb") as f:
                 report.pdf_file.save(os.path.basename(pdf_path), File(f), save=True)
 
+            release(report)
             report.status = "completed"
             message = f"Report {report.id} completed"
             logs += f"{message}\n"
@@ -141,8 +166,14 @@ class Command(BaseCommand):
             report.save()
 
         except Exception as e:
-            report.status = "error"
-            report.logs = logs + f"\nError: {str(e)}"
-            report.save()
             print(f"Error: {str(e)}")
+            if report:
+                release(report)
+                report.status = "error"
+                report.logs = logs + f"\nError: {str(e)}"
+                report.save()
             return
+
+        finally:
+            if lease_heartbeat:
+                lease_heartbeat.stop()
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from survey import models
+
+
+class Command(BaseCommand):
+    help = "Delete cached reports download zip files not used in the last days, "
+    help += "and the least recently used ones over the cache size limit "
+    help += "(the downloads are kept as expired)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-mb",
+            type=int,
+            default=settings.REPORTS_DOWNLOADS_CACHE_MAX_MB,
+            help="Max total size of the zip files in MB",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.REPORTS_DOWNLOADS_CACHE_DAYS,
+            help="Delete zip files not used in this number of days",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only show the zip files to delete",
+        )
+
+    def handle(self, *args, **options):
+        max_size = options["max_mb"] * 1024 * 1024
+        expired_at = timezone.now() - timedelta(days=options["days"])
+
+        # Completed downloads, most recently used first
+        reports_downloads = (
+            models.ReportsDownload.objects.filter(status="completed")
+            .exclude(Q(zip_file="") | Q(zip_file__isnull=True))
+            .annotate(used_at=Coalesce("last_used_at", "created_at"))
+            .order_by("-used_at", "-id")
+        )
+
+        # Keep the most recently used zip files that fit in the cache size
+        total_size = 0
+        to_delete = []
+        for reports_download in reports_downloads.iterator():
+            zip_size = reports_download.zip_size or 0
+            if (
+                reports_download.used_at < expired_at
+                or total_size + zip_size > max_size
+            ):
+                to_delete.append(reports_download)
+                continue
+            total_size += zip_size
+
+        deleted_size = 0
+        for reports_download in to_delete:
+            deleted_size += reports_download.zip_size or 0
+            self.stdout.write(
+                f"Deleting {reports_download} "
+                f"({reports_download.zip_size or 0} bytes, "
+                f"last used {reports_download.used_at.isoformat()})"
+            )
+            if options["dry_run"]:
+                continue
+            # Keep the row (admin history), only the file is removed
+            reports_download.zip_file.delete(save=False)
+            reports_download.expired_at = timezone.now()
+            reports_download.save(
+                update_fields=["zip_file", "expired_at", "updated_at"]
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {len(to_delete)} zip files ({deleted_size} bytes)"
+            )
+        )
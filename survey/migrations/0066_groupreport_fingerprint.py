@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0065_alter_reportsummaryscore_paragraph_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='groupreport',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='Huella de los datos usados para generar el PDF (caché)', max_length=64, verbose_name='Huella'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0066_groupreport_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportsdownload',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='Huella de los reportes y PDFs incluidos en el ZIP (caché)', max_length=64, verbose_name='Huella'),
+        ),
+        migrations.AddField(
+            model_name='reportsdownload',
+            name='last_used_at',
+            field=models.DateTimeField(blank=True, help_text='Última vez que se solicitó el archivo ZIP', null=True, verbose_name='Último uso'),
+        ),
+        migrations.AddField(
+            model_name='reportsdownload',
+            name='zip_size',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Tamaño del archivo ZIP en bytes', null=True, verbose_name='Tamaño del ZIP'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0067_reportsdownload_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='groupreport',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, help_text='Número de veces que se ha procesado', verbose_name='Intentos'),
+        ),
+        migrations.AddField(
+            model_name='groupreport',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Si el worker no renueva la reserva antes de esta fecha, el registro vuelve a pendiente', null=True, verbose_name='Fin de la reserva'),
+        ),
+        migrations.AddField(
+            model_name='groupreport',
+            name='worker_id',
+            field=models.CharField(blank=True, default='', help_text='Worker que está procesando el registro', max_length=255, verbose_name='Worker'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, help_text='Número de veces que se ha procesado', verbose_name='Intentos'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Si el worker no renueva la reserva antes de esta fecha, el registro vuelve a pendiente', null=True, verbose_name='Fin de la reserva'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='worker_id',
+            field=models.CharField(blank=True, default='', help_text='Worker que está procesando el registro', max_length=255, verbose_name='Worker'),
+        ),
+        migrations.AddField(
+            model_name='reportsdownload',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, help_text='Número de veces que se ha procesado', verbose_name='Intentos'),
+        ),
+        migrations.AddField(
+            model_name='reportsdownload',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Si el worker no renueva la reserva antes de esta fecha, el registro vuelve a pendiente', null=True, verbose_name='Fin de la reserva'),
+        ),
+        migrations.AddField(
+            model_name='reportsdownload',
+            name='worker_id',
+            field=models.CharField(blank=True, default='', help_text='Worker que está procesando el registro', max_length=255, verbose_name='Worker'),
+        ),
+    ]
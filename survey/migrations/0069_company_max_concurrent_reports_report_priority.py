@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0068_groupreport_attempts_groupreport_lease_expires_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='max_concurrent_reports',
+            field=models.PositiveIntegerField(blank=True, help_text='Máximo de reportes de la empresa generados al mismo tiempo. Vacío: valor por defecto del sistema, 0: sin límite', null=True, verbose_name='Reportes en paralelo'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='priority',
+            field=models.IntegerField(default=0, help_text='Los reportes con mayor prioridad se generan primero. Con la misma prioridad, las empresas se turnan', verbose_name='Prioridad'),
+        ),
+    ]
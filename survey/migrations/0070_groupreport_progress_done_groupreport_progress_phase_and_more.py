@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0069_company_max_concurrent_reports_report_priority'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='groupreport',
+            name='progress_done',
+            field=models.PositiveIntegerField(default=0, verbose_name='Elementos procesados'),
+        ),
+        migrations.AddField(
+            model_name='groupreport',
+            name='progress_phase',
+            field=models.CharField(blank=True, default='', help_text='Fase actual del procesamiento', max_length=100, verbose_name='Fase'),
+        ),
+        migrations.AddField(
+            model_name='groupreport',
+            name='progress_started_at',
+            field=models.DateTimeField(blank=True, help_text='Inicio del conteo de elementos (para calcular la velocidad)', null=True, verbose_name='Inicio del progreso'),
+        ),
+        migrations.AddField(
+            model_name='groupreport',
+            name='progress_total',
+            field=models.PositiveIntegerField(default=0, verbose_name='Elementos totales'),
+        ),
+        migrations.AddField(
+            model_name='groupreport',
+            name='progress_updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Última actualización del progreso'),
+        ),
+        migrations.AddField(
+            model_name='reportsdownload',
+            name='progress_done',
+            field=models.PositiveIntegerField(default=0, verbose_name='Elementos procesados'),
+        ),
+        migrations.AddField(
+            model_name='reportsdownload',
+            name='progress_phase',
+            field=models.CharField(blank=True, default='', help_text='Fase actual del procesamiento', max_length=100, verbose_name='Fase'),
+        ),
+        migrations.AddField(
+            model_name='reportsdownload',
+            name='progress_started_at',
+            field=models.DateTimeField(blank=True, help_text='Inicio del conteo de elementos (para calcular la velocidad)', null=True, verbose_name='Inicio del progreso'),
+        ),
+        migrations.AddField(
+            model_name='reportsdownload',
+            name='progress_total',
+            field=models.PositiveIntegerField(default=0, verbose_name='Elementos totales'),
+        ),
+        migrations.AddField(
+            model_name='reportsdownload',
+            name='progress_updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Última actualización del progreso'),
+        ),
+    ]
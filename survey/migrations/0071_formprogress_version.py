@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:27
+
+from django.db import migrations, models
+import survey.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0070_groupreport_progress_done_groupreport_progress_phase_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formprogress',
+            name='version',
+            field=models.BigIntegerField(default=survey.models.get_progress_version, help_text='Cambia en cada guardado (detecta cambios desde otra pestaña)', verbose_name='Versión'),
+        ),
+    ]
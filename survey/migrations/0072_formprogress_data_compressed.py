@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0071_formprogress_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formprogress',
+            name='data_compressed',
+            field=models.BinaryField(blank=True, help_text='JSON comprimido con zlib (FORM_PROGRESS_COMPRESS)', null=True, verbose_name='Datos del formulario (comprimidos)'),
+        ),
+        migrations.AlterField(
+            model_name='formprogress',
+            name='data',
+            field=models.JSONField(blank=True, help_text='Vacío si los datos se guardan comprimidos', null=True, verbose_name='Datos del formulario'),
+        ),
+    ]
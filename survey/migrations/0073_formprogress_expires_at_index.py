@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:46
+
+from django.db import migrations, models
+import survey.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0072_formprogress_data_compressed'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='formprogress',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, default=survey.models.get_default_expires_at, verbose_name='Fecha de expiración'),
+        ),
+    ]
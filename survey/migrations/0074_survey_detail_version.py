@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:19
+
+from django.db import migrations, models
+import time
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0073_formprogress_expires_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='detail_version',
+            field=models.BigIntegerField(default=time.time_ns, editable=False, help_text='Cambia al editar la encuesta, sus grupos, preguntas u opciones', verbose_name='Versión del detalle'),
+        ),
+    ]
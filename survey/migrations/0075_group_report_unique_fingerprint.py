@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:46
+
+from django.db import migrations, models
+
+
+def clear_duplicate_fingerprints(apps, schema_editor):
+    """Keep the fingerprint of the latest group report of each company data
+    (completed ones first), the older duplicates are not used as cache"""
+    GroupReport = apps.get_model('survey', 'GroupReport')
+    kept = set()
+    duplicate_ids = []
+    group_reports = GroupReport.objects.exclude(fingerprint='').order_by(
+        models.Case(models.When(status='completed', then=0), default=1),
+        '-created_at',
+    )
+    for group_report_id, company_id, fingerprint in group_reports.values_list(
+        'id', 'company_id', 'fingerprint'
+    ):
+        if (company_id, fingerprint) in kept:
+            duplicate_ids.append(group_report_id)
+        kept.add((company_id, fingerprint))
+    GroupReport.objects.filter(id__in=duplicate_ids).update(fingerprint='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0074_survey_detail_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_duplicate_fingerprints, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='groupreport',
+            constraint=models.UniqueConstraint(condition=models.Q(('fingerprint', ''), _negated=True), fields=('company', 'fingerprint'), name='unique_group_report_fingerprint'),
+        ),
+    ]
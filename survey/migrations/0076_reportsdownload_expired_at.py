@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0075_group_report_unique_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportsdownload',
+            name='expired_at',
+            field=models.DateTimeField(blank=True, help_text='Fecha en que se eliminó el archivo ZIP del caché', null=True, verbose_name='Expirado'),
+        ),
+    ]
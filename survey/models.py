@@ -1,9 +1,18 @@
-from django.db import models
+import json
+import time
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models
 from django.utils import timezone
 from datetime import timedelta
 from django.contrib import admin
 from django.conf import settings
 
+from jobs.models import Job, LeasedModel, ProgressModel
+from jobs.queue import enqueue
+from utils import invitation_codes
+from utils.merge_patch import merge_patch
 from utils.text_generation import get_uuid
 from core.choices import (
     STATUS_CHOICES,
@@ -13,8 +22,6 @@ from core.choices import (
     DEPARTMENT_CHOICES,
 )
 
-import requests
-
 
 class Company(models.Model):
     id = models.AutoField(primary_key=True)
@@ -56,6 +63,13 @@ class Company(models.Model):
         verbose_name="Recomendaciones Adicionales",
         help_text="Recomendaciones personalizadas para el reporte grupal en PDF. Una por línea.",
     )
+    max_concurrent_reports = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        verbose_name="Reportes en paralelo",
+        help_text="Máximo de reportes de la empresa generados al mismo tiempo. "
+        "Vacío: valor por defecto del sistema, 0: sin límite",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -94,6 +108,12 @@ class Survey(models.Model):
         help_text="Instrucciones para el participante. "
         "Se mostrarán al inicio de la encuesta.",
     )
+    detail_version = models.BigIntegerField(
+        default=time.time_ns,
+        editable=False,
+        verbose_name="Versión del detalle",
+        help_text="Cambia al editar la encuesta, sus grupos, preguntas u opciones",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -310,7 +330,7 @@ class Participant(models.Model):
         verbose_name_plural = "Participantes"
 
 
-class Report(models.Model):
+class Report(LeasedModel):
 
     id = models.AutoField(primary_key=True)
     survey = models.ForeignKey(
@@ -343,9 +363,30 @@ class Report(models.Model):
         verbose_name="Logs",
         help_text="Logs del reporte",
     )
+    priority = models.IntegerField(
+        default=0,
+        verbose_name="Prioridad",
+        help_text="Los reportes con mayor prioridad se generan primero. "
+        "Con la misma prioridad, las empresas se turnan",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def enqueue_job(self):
+        """Queue the report pdf generation (fair-share by company)"""
+        enqueue(
+            "report",
+            {"report_id": self.id},
+            priority=self.priority,
+            group_key=f"company:{self.participant.company_id}",
+        )
+
+    def update_job_priority(self):
+        """Apply the report priority to its pending jobs"""
+        Job.objects.filter(
+            job_type="report", status="pending", payload__report_id=self.id
+        ).update(priority=self.priority)
+
     def __str__(self):
         return f"{self.participant.name} - {self.survey.name}"
 
@@ -490,7 +531,7 @@ class CompanyDesiredScore(models.Model):
         unique_together = ("company", "question_group")
 
 
-class ReportsDownload(models.Model):
+class ReportsDownload(LeasedModel, ProgressModel):
     id = models.AutoField(primary_key=True)
     reports = models.ManyToManyField(
         Report,
@@ -518,6 +559,32 @@ class ReportsDownload(models.Model):
         blank=True,
         null=True,
     )
+    fingerprint = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        db_index=True,
+        verbose_name="Huella",
+        help_text="Huella de los reportes y PDFs incluidos en el ZIP (caché)",
+    )
+    zip_size = models.PositiveBigIntegerField(
+        blank=True,
+        null=True,
+        verbose_name="Tamaño del ZIP",
+        help_text="Tamaño del archivo ZIP en bytes",
+    )
+    last_used_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Último uso",
+        help_text="Última vez que se solicitó el archivo ZIP",
+    )
+    expired_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Expirado",
+        help_text="Fecha en que se eliminó el archivo ZIP del caché",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -526,26 +593,9 @@ class ReportsDownload(models.Model):
             self.status = "pending"
         super().save(*args, **kwargs)
 
-    def trigger_webhook(self):
-        """Trigger n8n webhook to generate zip file"""
-        print("Generating zip file with n8n webhook")
-        webhook_url = f"{settings.N8N_BASE_WEBHOOKS}/aft-create-reports-download-file"
-        try:
-            res = requests.get(webhook_url)
-            print(f"Webhook URL: {webhook_url}")
-            print(f"Response from n8n webhook: {res.json()}")
-
-            if res.status_code != 200:
-                self.status = "error"
-                logs = f"Failed to generate zip file with n8n webhook.\n"
-                logs += f"Webhook URL: {webhook_url}\n"
-                logs += f"Response: {res.json()}\n"
-                self.logs = logs
-                self.save()
-        except Exception as e:
-            self.status = "error"
-            self.logs = f"Error triggering webhook: {str(e)}"
-            self.save()
+    def enqueue_job(self):
+        """Queue the zip file generation"""
+        enqueue("reports_download", {"reports_download_id": self.id})
 
     def __str__(self):
         return f"ReportsDownload {self.id} ({self.status})"
@@ -555,7 +605,7 @@ class ReportsDownload(models.Model):
         verbose_name_plural = "Descargas de Reportes"
 
 
-class GroupReport(models.Model):
+class GroupReport(LeasedModel, ProgressModel):
     id = models.AutoField(primary_key=True)
     reports = models.ManyToManyField(
         Report,
@@ -591,6 +641,14 @@ class GroupReport(models.Model):
         blank=True,
         null=True,
     )
+    fingerprint = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        db_index=True,
+        verbose_name="Huella",
+        help_text="Huella de los datos usados para generar el PDF (caché)",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -599,26 +657,9 @@ class GroupReport(models.Model):
             self.status = "pending"
         super().save(*args, **kwargs)
 
-    def trigger_webhook(self):
-        """Trigger n8n webhook to generate group report PDF"""
-        print("Generating group report with n8n webhook")
-        webhook_url = f"{settings.N8N_BASE_WEBHOOKS}/aft-create-group-report-file"
-        try:
-            res = requests.get(webhook_url)
-            print(f"Webhook URL: {webhook_url}")
-            print(f"Response from n8n webhook: {res.json()}")
-
-            if res.status_code != 200:
-                self.status = "error"
-                logs = f"Failed to trigger group report webhook.\n"
-                logs += f"Webhook URL: {webhook_url}\n"
-                logs += f"Response: {res.json()}\n"
-                self.logs = logs
-                self.save()
-        except Exception as e:
-            self.status = "error"
-            self.logs = f"Error triggering webhook: {str(e)}"
-            self.save()
+    def enqueue_job(self) -> Job:
+        """Queue the group report pdf generation"""
+        return enqueue("group_report", {"group_report_id": self.id})
 
     def __str__(self):
         return f"GroupReport {self.id} - {self.get_status_display()}"
@@ -626,12 +667,46 @@ class GroupReport(models.Model):
     class Meta:
         verbose_name = "Reporte Grupal"
         verbose_name_plural = "Reportes Grupales"
+        constraints = [
+            # One cached group report per company data
+            models.UniqueConstraint(
+                fields=["company", "fingerprint"],
+                condition=~models.Q(fingerprint=""),
+                name="unique_group_report_fingerprint",
+            ),
+        ]
 
 
 def get_default_expires_at():
     return timezone.now() + timedelta(days=30)
 
 
+def get_progress_version() -> int:
+    """New form progress version: microseconds timestamp (unique per save,
+    and exact as a javascript number)"""
+    return time.time_ns() // 1000
+
+
+def encode_form_data(form_data, compress: bool | None = None) -> dict:
+    """Form progress data fields: plain json or zlib compressed json
+
+    Args:
+        form_data: form data (json serializable)
+        compress (bool | None): compress the data (default
+            FORM_PROGRESS_COMPRESS)
+
+    Returns:
+        dict: values of the data and data_compressed fields
+    """
+    if compress is None:
+        compress = settings.FORM_PROGRESS_COMPRESS
+    if not compress:
+        return {"data": form_data, "data_compressed": None}
+
+    content = json.dumps(form_data, cls=DjangoJSONEncoder, separators=(",", ":"))
+    return {"data": None, "data_compressed": zlib.compress(content.encode())}
+
+
 class FormProgress(models.Model):
     id = models.AutoField(primary_key=True)
     email = models.EmailField(verbose_name="Correo electrónico")
@@ -646,13 +721,140 @@ class FormProgress(models.Model):
         blank=True,
     )
     current_screen = models.IntegerField(default=1, verbose_name="Pantalla actual")
-    data = models.JSONField(verbose_name="Datos del formulario")
+    data = models.JSONField(
+        blank=True,
+        null=True,
+        verbose_name="Datos del formulario",
+        help_text="Vacío si los datos se guardan comprimidos",
+    )
+    data_compressed = models.BinaryField(
+        blank=True,
+        null=True,
+        verbose_name="Datos del formulario (comprimidos)",
+        help_text="JSON comprimido con zlib (FORM_PROGRESS_COMPRESS)",
+    )
     expires_at = models.DateTimeField(
-        default=get_default_expires_at, verbose_name="Fecha de expiración"
+        default=get_default_expires_at,
+        db_index=True,
+        verbose_name="Fecha de expiración",
+    )
+    version = models.BigIntegerField(
+        default=get_progress_version,
+        verbose_name="Versión",
+        help_text="Cambia en cada guardado (detecta cambios desde otra pestaña)",
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @property
+    def form_data(self):
+        """Form data, decompressed if saved compressed"""
+        if self.data_compressed is not None:
+            return json.loads(zlib.decompress(self.data_compressed))
+        return self.data
+
+    @form_data.setter
+    def form_data(self, value):
+        for field, field_value in encode_form_data(value).items():
+            setattr(self, field, field_value)
+
+    @classmethod
+    def active(cls) -> models.QuerySet["FormProgress"]:
+        """Not expired progresses (expired rows are missing for the reads
+        until delete_expired_progress purges them)"""
+        return cls.objects.filter(expires_at__gt=timezone.now())
+
+    @classmethod
+    def bulk_upsert(cls, progresses: list["FormProgress"]):
+        """Insert or update progresses by (email, survey) in one statement per
+        batch. Progresses without current_screen keep the saved screen"""
+        for keep_screen in (False, True):
+            batch = [
+                progress
+                for progress in progresses
+                if (progress.current_screen is None) == keep_screen
+            ]
+            if not batch:
+                continue
+
+            update_fields = [
+                "data",
+                "data_compressed",
+                "company",
+                "expires_at",
+                "version",
+                "updated_at",
+            ]
+            if keep_screen:
+                for progress in batch:
+                    progress.current_screen = 1
+            else:
+                update_fields.append("current_screen")
+
+            # MySQL updates on any unique conflict (no conflict target)
+            unique_fields = None
+            if connection.features.supports_update_conflicts_with_target:
+                unique_fields = ["email", "survey"]
+
+            cls.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=update_fields,
+            )
+            if keep_screen:
+                for progress in batch:
+                    progress.current_screen = None
+
+    def get_patch_fields(
+        self, data_patch: dict, current_screen: int | None = None
+    ) -> dict:
+        """New field values after merging a JSON merge patch (RFC 7396) into
+        the form data, with a new version and expiration date"""
+        form_data = merge_patch(self.form_data, data_patch)
+        fields = {
+            **encode_form_data(form_data),
+            "version": get_progress_version(),
+            "expires_at": get_default_expires_at(),
+            "updated_at": timezone.now(),
+        }
+        if current_screen is not None:
+            fields["current_screen"] = current_screen
+
+        # Company linked to the invitation code, when the code changes
+        if "guestCodeResponse" in data_patch:
+            guest_code = (form_data.get("guestCodeResponse") or {}).get("guestCode")
+            fields["company_id"] = None
+            if guest_code:
+                fields["company_id"] = invitation_codes.get_active_company_id(
+                    guest_code
+                )
+        return fields
+
+    def apply_patch(
+        self, data_patch: dict, version: int, current_screen: int | None = None
+    ) -> bool:
+        """Merge a JSON merge patch into the form data, only if the progress
+        was not saved since the given version (single conditional update)
+
+        Args:
+            data_patch (dict): JSON merge patch (RFC 7396) of the data
+            version (int): progress version the patch was made from
+            current_screen (int | None): new screen (None: keep it)
+
+        Returns:
+            bool: True if saved, False if the progress changed since the version
+        """
+        fields = self.get_patch_fields(data_patch, current_screen)
+        updated = FormProgress.objects.filter(id=self.id, version=version).update(
+            **fields
+        )
+        if not updated:
+            return False
+        for field, value in fields.items():
+            setattr(self, field, value)
+        return True
+
     def __str__(self):
         return f"{self.email} - {self.survey.name}"
 
@@ -0,0 +1,50 @@
+from django.db import models as django_models
+
+from notifications.events import get_default_data, notify_status_changes
+from survey import models
+from utils.media import get_media_url
+
+
+def get_file_data(obj: django_models.Model, file_field: str) -> dict:
+    """Event data with the generated file url (once completed)"""
+    data = get_default_data(obj)
+    file = getattr(obj, file_field)
+    data["file_url"] = ""
+    if obj.status == "completed" and file:
+        data["file_url"] = get_media_url(file)
+    return data
+
+
+def get_report_data(report: models.Report) -> dict:
+    data = get_file_data(report, "pdf_file")
+    data["survey_id"] = report.survey_id
+    data["participant_id"] = report.participant_id
+    # Participant loaded by the caller (select_related), or only its company
+    if models.Report.participant.is_cached(report):
+        data["company_id"] = report.participant.company_id
+    else:
+        data["company_id"] = (
+            models.Participant.objects.filter(id=report.participant_id)
+            .values_list("company_id", flat=True)
+            .first()
+        )
+    return data
+
+
+def get_reports_download_data(reports_download: models.ReportsDownload) -> dict:
+    return get_file_data(reports_download, "zip_file")
+
+
+def get_group_report_data(group_report: models.GroupReport) -> dict:
+    data = get_file_data(group_report, "pdf_file")
+    data["company_id"] = group_report.company_id
+    return data
+
+
+notify_status_changes(
+    models.Report, "report", get_report_data, select_related=("participant",)
+)
+notify_status_changes(
+    models.ReportsDownload, "reports_download", get_reports_download_data
+)
+notify_status_changes(models.GroupReport, "group_report", get_group_report_data)
@@ -1,5 +1,6 @@
 from django.db import transaction
-from django.db.models import Sum, Count
+from django.db.models import Count, Exists, OuterRef, Sum
+from django.utils import timezone
 
 from rest_framework import serializers
 
@@ -12,6 +13,7 @@ from core.choices import (
 
 from survey import models
 
+from utils import invitation_codes, progress_buffer
 from utils.survey_calcs import SurveyCalcs
 
 
@@ -40,9 +42,8 @@ class QuestionSerializer(serializers.ModelSerializer):
         ]
 
     def get_options(self, obj):
-        return QuestionOptionSerializer(
-            obj.questionoption_set.order_by("question_index"), many=True
-        ).data
+        # Sorted options prefetched (see get_survey_detail_queryset)
+        return QuestionOptionSerializer(obj.questionoption_set.all(), many=True).data
 
 
 class QuestionGroupSerializer(serializers.ModelSerializer):
@@ -62,12 +63,10 @@ class QuestionGroupSerializer(serializers.ModelSerializer):
         ]
 
     def get_modifiers(self, obj):
-        return obj.modifiers.values_list("name", flat=True)
+        return [modifier.name for modifier in obj.modifiers.all()]
 
     def get_questions(self, obj):
-        return QuestionSerializer(
-            obj.question_set.order_by("question_group_index"), many=True
-        ).data
+        return QuestionSerializer(obj.question_set.all(), many=True).data
 
 
 class SurveyDetailSerializer(serializers.ModelSerializer):
@@ -85,8 +84,41 @@ class SurveyDetailSerializer(serializers.ModelSerializer):
         ]
 
     def get_question_groups(self, obj):
-        return QuestionGroupSerializer(
-            obj.questiongroup_set.order_by("survey_index"), many=True
+        return QuestionGroupSerializer(obj.questiongroup_set.all(), many=True).data
+
+
+class QuestionGroupOutlineSerializer(serializers.ModelSerializer):
+    questions_count = serializers.IntegerField()
+
+    class Meta:
+        model = models.QuestionGroup
+        fields = [
+            "id",
+            "name",
+            "survey_percentage",
+            "survey_index",
+            "questions_count",
+        ]
+
+
+class SurveyOutlineSerializer(serializers.ModelSerializer):
+    question_groups = serializers.SerializerMethodField()
+
+    class Meta:
+        model = models.Survey
+        fields = [
+            "id",
+            "name",
+            "instructions",
+            "created_at",
+            "updated_at",
+            "question_groups",
+        ]
+
+    def get_question_groups(self, obj):
+        # Groups annotated with questions_count (see render_survey_outline)
+        return QuestionGroupOutlineSerializer(
+            obj.questiongroup_set.all(), many=True
         ).data
 
 
@@ -130,10 +162,7 @@ class AnswerDataSerializer(serializers.Serializer):
 
 
 class ResponseSerializer(serializers.Serializer):
-    invitation_code = serializers.SlugRelatedField(
-        queryset=models.Company.objects.filter(is_active=True),
-        slug_field="invitation_code",
-    )
+    invitation_code = serializers.CharField(max_length=255)
     survey_id = serializers.PrimaryKeyRelatedField(
         queryset=models.Survey.objects.all(), source="survey"
     )
@@ -142,6 +171,15 @@ class ResponseSerializer(serializers.Serializer):
         queryset=models.QuestionOption.objects.all(), many=True, source="answers_data"
     )
 
+    def validate_invitation_code(self, value):
+        # Active company id, from the cached lookup table
+        company_id = invitation_codes.get_active_company_id(value)
+        if company_id is None:
+            raise serializers.ValidationError(
+                f"Object with invitation_code={value} does not exist."
+            )
+        return company_id
+
     def validate(self, data):
         participant_email = data.get("participant_data", {}).get("email")
         survey = data.get("survey")
@@ -159,7 +197,7 @@ class ResponseSerializer(serializers.Serializer):
 
     def create(self, validated_data):
 
-        company = validated_data.pop("invitation_code")
+        company_id = validated_data.pop("invitation_code")
         participant_data = validated_data.pop("participant_data")
         selected_options = validated_data.pop("answers_data")
         survey = validated_data.pop("survey")
@@ -169,7 +207,7 @@ class ResponseSerializer(serializers.Serializer):
             # Save participant and answers
             print("Saving report and calculating totals")
             participant = models.Participant.objects.create(
-                company=company, **participant_data
+                company_id=company_id, **participant_data
             )
             for option in selected_options:
                 models.Answer.objects.create(
@@ -199,6 +237,9 @@ class ResponseSerializer(serializers.Serializer):
             # Save summary scores
             survey_calcs.save_report_summary_scores()
 
+            # Queue pdf generation (saved with the report)
+            report.enqueue_job()
+
         return participant, selected_options, report
 
 
@@ -206,11 +247,20 @@ class FormProgressSerializer(serializers.ModelSerializer):
     survey_id = serializers.PrimaryKeyRelatedField(
         queryset=models.Survey.objects.all(), source="survey"
     )
+    # Plain or compressed json
+    data = serializers.JSONField(source="form_data")
 
     class Meta:
         model = models.FormProgress
-        fields = ["email", "survey_id", "current_screen", "data", "expires_at"]
-        read_only_fields = ["expires_at"]
+        fields = [
+            "email",
+            "survey_id",
+            "current_screen",
+            "data",
+            "expires_at",
+            "version",
+        ]
+        read_only_fields = ["expires_at", "version"]
 
     def validate(self, data):
         email = data.get("email")
@@ -227,3 +277,179 @@ class FormProgressSerializer(serializers.ModelSerializer):
                 )
 
         return data
+
+
+class FormProgressSaveSerializer(serializers.Serializer):
+    """Progress saved with one validation query and one upsert on
+    (email, survey), safe for concurrent saves of the same participant.
+    Without data, the saved progress is kept (new screen and expiration)"""
+
+    email = serializers.EmailField()
+    survey_id = serializers.IntegerField()
+    current_screen = serializers.IntegerField(required=False)
+    data = serializers.JSONField(required=False)
+
+    def validate(self, data):
+        # Survey and previous answers in one query, invitation code company
+        # from the cached lookup table
+        guest_code = ""
+        if isinstance(data.get("data"), dict):
+            guest_code_response = data["data"].get("guestCodeResponse") or {}
+            guest_code = guest_code_response.get("guestCode") or ""
+        answers = models.Answer.objects.filter(
+            participant__email=data["email"],
+            question_option__question__question_group__survey=OuterRef("id"),
+        )
+        survey = (
+            models.Survey.objects.filter(id=data["survey_id"])
+            .annotate(has_answer=Exists(answers))
+            .values("has_answer")
+            .first()
+        )
+
+        if not survey:
+            raise serializers.ValidationError(
+                {
+                    "survey_id": [
+                        f'Invalid pk "{data["survey_id"]}" - object does not exist.'
+                    ]
+                }
+            )
+        if survey["has_answer"]:
+            raise serializers.ValidationError(
+                "ALREADY_SUBMITTED",
+                code="ALREADY_SUBMITTED",
+            )
+
+        if "data" not in data:
+            # Partial save: only of a saved progress
+            data["progress"] = self.get_saved_progress(data)
+            if not data["progress"]:
+                raise serializers.ValidationError(
+                    {"data": ["This field is required."]}
+                )
+            return data
+
+        data["company_id"] = None
+        if guest_code:
+            data["company_id"] = invitation_codes.get_active_company_id(
+                str(guest_code)
+            )
+        return data
+
+    def get_saved_progress(self, data) -> models.FormProgress | None:
+        """Last save of the participant (buffered or not expired)"""
+        progress = None
+        if progress_buffer.is_enabled():
+            progress = progress_buffer.get_buffered_progress(
+                data["email"], data["survey_id"]
+            )
+        if not progress:
+            progress = (
+                models.FormProgress.active()
+                .filter(email=data["email"], survey_id=data["survey_id"])
+                .first()
+            )
+        return progress
+
+    def update_saved(self, validated_data) -> models.FormProgress:
+        """Keep the saved data and company, with a new screen (if sent),
+        expiration and version"""
+        progress = validated_data["progress"]
+        fields = {
+            "expires_at": models.get_default_expires_at(),
+            "version": models.get_progress_version(),
+            "updated_at": timezone.now(),
+        }
+        if validated_data.get("current_screen") is not None:
+            fields["current_screen"] = validated_data["current_screen"]
+        for field, value in fields.items():
+            setattr(progress, field, value)
+
+        if progress_buffer.is_enabled():
+            progress_buffer.buffer_progress(progress)
+        else:
+            models.FormProgress.objects.filter(id=progress.id).update(**fields)
+        return progress
+
+    def create(self, validated_data):
+        if "progress" in validated_data:
+            return self.update_saved(validated_data)
+
+        # Without current_screen the saved screen is kept
+        progress = models.FormProgress(
+            email=validated_data["email"],
+            survey_id=validated_data["survey_id"],
+            company_id=validated_data["company_id"],
+            current_screen=validated_data.get("current_screen"),
+            expires_at=models.get_default_expires_at(),
+            version=models.get_progress_version(),
+        )
+        progress.form_data = validated_data["data"]
+
+        if not progress_buffer.is_enabled():
+            models.FormProgress.bulk_upsert([progress])
+            return progress
+
+        # Write-behind: screen of the previous buffered save
+        if progress.current_screen is None:
+            buffered = progress_buffer.get_buffered_progress(
+                progress.email, progress.survey_id
+            )
+            if buffered:
+                progress.current_screen = buffered.current_screen
+        progress_buffer.buffer_progress(progress)
+        return progress
+
+    def to_representation(self, instance):
+        data = {
+            "email": instance.email,
+            "survey_id": instance.survey_id,
+            "data": instance.form_data,
+            "expires_at": serializers.DateTimeField().to_representation(
+                instance.expires_at
+            ),
+            "version": instance.version,
+            "current_screen": instance.current_screen,
+        }
+        # Screen kept in the database when not sent
+        if instance.current_screen is None:
+            data["current_screen"] = (
+                models.FormProgress.objects.filter(
+                    email=instance.email, survey_id=instance.survey_id
+                )
+                .values_list("current_screen", flat=True)
+                .first()
+            )
+        return data
+
+
+class FormProgressPatchSerializer(serializers.Serializer):
+    """Merge patch of the progress data, made from a progress version"""
+
+    email = serializers.EmailField()
+    survey_id = serializers.IntegerField()
+    version = serializers.IntegerField()
+    current_screen = serializers.IntegerField(required=False)
+    data = serializers.DictField(help_text="JSON merge patch (RFC 7396)")
+
+    def validate(self, data):
+        # Current progress and previous answers in one query
+        answers = models.Answer.objects.filter(
+            participant__email=data["email"],
+            question_option__question__question_group__survey=OuterRef("survey_id"),
+        )
+        progress = (
+            models.FormProgress.active()
+            .filter(email=data["email"], survey_id=data["survey_id"])
+            .annotate(has_answer=Exists(answers))
+            .first()
+        )
+        if progress and progress.has_answer:
+            raise serializers.ValidationError(
+                "ALREADY_SUBMITTED",
+                code="ALREADY_SUBMITTED",
+            )
+
+        data["progress"] = progress
+        return data
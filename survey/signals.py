@@ -0,0 +1,54 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from survey import models
+from utils.invitation_codes import bump_version
+from utils.survey_detail_cache import (
+    SURVEY_LOOKUPS,
+    get_survey_ids,
+    invalidate_survey_details,
+)
+
+
+def invalidate_survey_detail(sender, instance, **kwargs):
+    """Invalidate the cached detail of the surveys showing an object"""
+    invalidate_survey_details(get_survey_ids(instance))
+
+
+# Before and after saving: objects can be moved to another survey
+for model in SURVEY_LOOKUPS:
+    pre_save.connect(invalidate_survey_detail, sender=model)
+    post_save.connect(invalidate_survey_detail, sender=model)
+    pre_delete.connect(invalidate_survey_detail, sender=model)
+
+
+@receiver(m2m_changed, sender=models.QuestionGroup.modifiers.through)
+def invalidate_survey_detail_modifiers(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Invalidate the cached detail of the surveys when group modifiers change"""
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        invalidate_survey_details([instance.survey_id])
+    elif pk_set:
+        invalidate_survey_details(
+            models.QuestionGroup.objects.filter(id__in=pk_set).values_list(
+                "survey_id", flat=True
+            )
+        )
+    else:
+        invalidate_survey_details(get_survey_ids(instance))
+
+
+@receiver(post_save, sender=models.Company)
+@receiver(post_delete, sender=models.Company)
+def invalidate_invitation_codes(sender, instance, **kwargs):
+    """Discard the cached invitation code lookups when a company changes"""
+    bump_version()
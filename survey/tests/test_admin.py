@@ -1,4 +1,6 @@
+import io
 import math
+import zipfile
 from unittest import mock
 
 from django.http import HttpResponse
@@ -10,6 +12,8 @@ from bs4 import BeautifulSoup
 
 from core.tests_base.test_admin import TestAdminBase
 from core.tests_base.test_models import TestSurveyModelBase
+from jobs.models import Job
+from notifications.models import Endpoint, Notification
 from survey import models as survey_models
 from utils.media import get_media_url
 
@@ -322,6 +326,94 @@ class ReportAdminTestCase(TestAdminBase, TestSurveyModelBase):
         self.report.refresh_from_db()
         self.assertEqual(self.report.status, "pending")
 
+    def test_action_set_to_pending_skips_pending(self):
+        """Validate reports already pending are not queued again"""
+        self.assertEqual(Job.objects.count(), 1)
+
+        self.client.post(
+            f"{self.endpoint}",
+            {"action": "set_to_pending", "_selected_action": [self.report.id]},
+        )
+
+        self.assertEqual(Job.objects.count(), 1)
+
+        # Completed reports are queued again
+        Job.objects.update(status="completed")
+        self.report.status = "completed"
+        self.report.save()
+        self.client.post(
+            f"{self.endpoint}",
+            {"action": "set_to_pending", "_selected_action": [self.report.id]},
+        )
+        self.assertEqual(Job.objects.filter(status="pending").count(), 1)
+
+    def test_action_set_to_pending_notified(self):
+        """Validate reports set to pending by the action are notified"""
+        self.report.status = "completed"
+        self.report.save()
+        Endpoint.objects.create(name="Test", url="http://localhost/", secret="test")
+
+        self.client.post(
+            f"{self.endpoint}",
+            {"action": "set_to_pending", "_selected_action": [self.report.id]},
+        )
+
+        data = Notification.objects.get(event_type="report.pending").data
+        self.assertEqual(data["id"], self.report.id)
+        self.assertEqual(data["company_id"], self.report.participant.company_id)
+
+    def test_action_bump_priority(self):
+        """Validate action bump priority updates the report and its job"""
+
+        # Simulate action twice
+        for _ in range(2):
+            self.client.post(
+                f"{self.endpoint}",
+                {"action": "bump_priority", "_selected_action": [self.report.id]},
+            )
+
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.priority, 2)
+        job = Job.objects.get(payload__report_id=self.report.id)
+        self.assertEqual(job.priority, 2)
+        self.assertEqual(job.group_key, f"company:{self.company.id}")
+
+        # Reset priority
+        self.client.post(
+            f"{self.endpoint}",
+            {"action": "reset_priority", "_selected_action": [self.report.id]},
+        )
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.priority, 0)
+        self.assertEqual(Job.objects.get().priority, 0)
+
+    def test_queue_position(self):
+        """Validate queue position and estimated start of pending reports"""
+
+        response = self.client.get(f"{self.endpoint}")
+
+        soup = BeautifulSoup(response.content, "html.parser")
+        position = soup.select_one(".field-queue_position")
+        self.assertEqual(position.text, "1")
+        estimated_start = soup.select_one(".field-estimated_start")
+        self.assertNotEqual(estimated_start.text, "-")
+
+        # Reports without pending jobs
+        Job.objects.update(status="completed")
+        response = self.client.get(f"{self.endpoint}")
+
+        soup = BeautifulSoup(response.content, "html.parser")
+        self.assertEqual(soup.select_one(".field-queue_position").text, "-")
+
+    def test_queue_position_change_view(self):
+        """Validate queue position in the report detail"""
+
+        response = self.client.get(f"{self.endpoint}{self.report.id}/change/")
+
+        soup = BeautifulSoup(response.content, "html.parser")
+        position = soup.select_one(".field-queue_position .readonly")
+        self.assertEqual(position.text, "1")
+
     def test_action_create_reports_download(self):
         """Validate action create reports download working"""
 
@@ -343,6 +435,84 @@ class ReportAdminTestCase(TestAdminBase, TestSurveyModelBase):
             "Descarga creada correctamente. Consulta tabla de descargas para ver el estado.",
         )
 
+    @mock.patch("survey.models.ReportsDownload.enqueue_job")
+    def test_action_create_reports_download_reused(self, mock_webhook):
+        """Validate action create reports download reuses the download of
+        the same reports"""
+
+        # Simulate action twice
+        for _ in range(2):
+            response = self.client.post(
+                f"{self.endpoint}",
+                {
+                    "action": "create_reports_download",
+                    "_selected_action": [self.report.id],
+                },
+                follow=True,
+            )
+
+        # Validate only one download created and triggered
+        self.assertEqual(survey_models.ReportsDownload.objects.count(), 1)
+        mock_webhook.assert_called_once()
+        messages = list(response.context["messages"])
+        self.assertIn("Ya existe una descarga", str(messages[0]))
+
+    def test_action_stream_reports_download(self):
+        """Validate action stream reports download returns the zip file"""
+
+        # Add pdf file to report
+        self.report.status = "completed"
+        self.report.pdf_file = SimpleUploadedFile(
+            "test_report.pdf", b"%PDF-1.4 dummy content"
+        )
+        self.report.save()
+
+        # Simulate action
+        response = self.client.post(
+            f"{self.endpoint}",
+            {"action": "stream_reports_download", "_selected_action": [self.report.id]},
+        )
+
+        # Validate zip file streamed without a reports download
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        content = b"".join(response.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(content)) as zipf:
+            self.assertEqual(
+                zipf.namelist(), [f"{str(self.report.participant)}_{self.report.id}.pdf"]
+            )
+        self.assertEqual(survey_models.ReportsDownload.objects.count(), 0)
+
+    @mock.patch("survey.models.ReportsDownload.enqueue_job")
+    def test_action_stream_reports_download_big_selection(self, mock_webhook):
+        """Validate action stream reports download falls back to a reports
+        download over the limit"""
+
+        # Add pdf file to report
+        self.report.status = "completed"
+        self.report.pdf_file = SimpleUploadedFile(
+            "test_report.pdf", b"%PDF-1.4 dummy content"
+        )
+        self.report.save()
+
+        # Simulate action
+        with self.settings(REPORTS_ZIP_STREAM_MAX_REPORTS=0):
+            response = self.client.post(
+                f"{self.endpoint}",
+                {
+                    "action": "stream_reports_download",
+                    "_selected_action": [self.report.id],
+                },
+                follow=True,
+            )
+
+        # Validate download created in table
+        self.assertEqual(survey_models.ReportsDownload.objects.count(), 1)
+        mock_webhook.assert_called_once()
+        messages = list(response.context["messages"])
+        self.assertEqual(len(messages), 2)
+
 
 class ReportQuestionGroupTotalAdminTestCase(TestAdminBase, TestSurveyModelBase):
     """Testing report question group total admin"""
@@ -508,3 +678,33 @@ class ReportsDownloadAdminTestCase(TestAdminBase, TestSurveyModelBase):
         self.assertIn("btn-primary", link["class"])
         self.assertIn("reports_downloads/zip_files/test", link.get("href"))
         self.assertIsNone(link.get("disabled"))
+
+
+class FormProgressAdminTestCase(TestAdminBase, TestSurveyModelBase):
+    """Testing form progress admin"""
+
+    def setUp(self):
+        super().setUp()
+        self.endpoint = "/admin/survey/formprogress/"
+
+    def test_search_bar(self):
+        """Validate search bar working"""
+        self.submit_search_bar(self.endpoint)
+
+    def test_change_compressed_data(self):
+        """Validate compressed data is shown decoded and read only"""
+        form_data = {"answers": {"1": "Respuesta comprimida"}}
+        progress = survey_models.FormProgress.objects.create(
+            email="test@example.com",
+            survey=self.create_survey(),
+            current_screen=2,
+            **survey_models.encode_form_data(form_data, compress=True),
+        )
+
+        response = self.client.get(f"{self.endpoint}{progress.id}/change/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Respuesta comprimida")
+        soup = BeautifulSoup(response.content, "html.parser")
+        self.assertIsNone(soup.select_one("[name=data]"))
+        self.assertIsNone(soup.select_one("[name=data_compressed]"))
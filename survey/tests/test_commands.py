@@ -3,9 +3,12 @@ import re
 import json
 import random
 import shutil
+import queue
+import threading
+import zipfile
 from time import sleep
 
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -14,6 +17,7 @@ from rest_framework.test import APITestCase
 from rest_framework import status
 
 from core.tests_base.test_models import TestSurveyModelBase
+from jobs.models import Job
 from survey import models as survey_models
 from utils.media import get_media_url
 from utils.survey_calcs import SurveyCalcs
@@ -112,7 +116,7 @@ class GenerateNextReportBase(TestSurveyModelBase, APITestCase):
         """
 
         # Detect files already in pdf folder
-        pdf_folder = os.path.join(settings.BASE_DIR, "media", "reports")
+        pdf_folder = os.path.join(settings.MEDIA_ROOT, "reports")
         if not os.path.exists(pdf_folder):
             os.makedirs(pdf_folder)
 
@@ -1569,7 +1573,7 @@ class GenerateNextReportTextPDFSummaryTestCase(GenerateNextReportBase):
             except AssertionError as e:
                 print(f"DEBUG: create_get_pdf failed for {score}/{summary_type}: {e}")
                 # List files in dir to see what happened
-                pdf_folder = os.path.join(settings.BASE_DIR, "media", "reports")
+                pdf_folder = os.path.join(settings.MEDIA_ROOT, "reports")
                 if os.path.exists(pdf_folder):
                     print(f"DEBUG: Files in {pdf_folder}: {os.listdir(pdf_folder)}")
                 raise
@@ -1646,7 +1650,7 @@ class CreateReportsDownloadFileCommandTest(TestSurveyModelBase, APITestCase):
         self.client.login(username=username, password=password)
 
         # Ensure temp dir exists or is clean for tests
-        self.temp_dir = os.path.join(settings.BASE_DIR, "media", "temp", "zips")
+        self.temp_dir = os.path.join(settings.MEDIA_ROOT, "temp", "zips")
         if os.path.exists(self.temp_dir):
             shutil.rmtree(self.temp_dir)
         os.makedirs(self.temp_dir, exist_ok=True)
@@ -1699,13 +1703,13 @@ class CreateReportsDownloadFileCommandTest(TestSurveyModelBase, APITestCase):
             survey_models.ReportsDownload.objects.filter(status="pending").count(), 0
         )
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_success_single_report(self, mock_get):
         """Test successful zip generation for a single report"""
         # Configure mock for model creation (n8n webhook) AND pdf download
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.content = self.dummy_pdf_content
+        mock_response.iter_content.return_value = [self.dummy_pdf_content]
         mock_response.json.return_value = {"success": True}
         mock_get.return_value = mock_response
 
@@ -1715,7 +1719,7 @@ class CreateReportsDownloadFileCommandTest(TestSurveyModelBase, APITestCase):
         # Verify creation didn't fail
         self.assertEqual(download.status, "pending", download.logs)
 
-        call_command("create_reports_download_file")
+        call_command("create_reports_download_file", source="http")
 
         download.refresh_from_db()
         self.assertEqual(download.status, "completed", download.logs)
@@ -1723,12 +1727,12 @@ class CreateReportsDownloadFileCommandTest(TestSurveyModelBase, APITestCase):
         self.assertTrue(download.zip_file.name.endswith(".zip"))
         self.assertIn("completed", download.logs)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_success_multiple_reports(self, mock_get):
         """Test successful zip generation for multiple reports"""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.content = self.dummy_pdf_content
+        mock_response.iter_content.return_value = [self.dummy_pdf_content]
         mock_response.json.return_value = {"success": True}
         mock_get.return_value = mock_response
 
@@ -1736,7 +1740,7 @@ class CreateReportsDownloadFileCommandTest(TestSurveyModelBase, APITestCase):
         report2 = self.create_dummy_report_with_pdf()
         download = self.create_reports_download([report1, report2])
 
-        call_command("create_reports_download_file")
+        call_command("create_reports_download_file", source="http")
 
         download.refresh_from_db()
         self.assertEqual(download.status, "completed", download.logs)
@@ -1744,13 +1748,21 @@ class CreateReportsDownloadFileCommandTest(TestSurveyModelBase, APITestCase):
 
         # Requests: 2 for PDFs
         self.assertEqual(mock_get.call_count, 2)
+        mock_get.assert_called_with(
+            get_media_url(report2.pdf_file),
+            timeout=settings.REPORTS_DOWNLOAD_TIMEOUT,
+            stream=True,
+        )
 
-    @patch("requests.get")
+        # Progress saved in logs
+        self.assertIn("Downloaded 2/2 pdf files", download.logs)
+
+    @patch("requests.Session.get")
     def test_missing_pdf_file_in_report(self, mock_get):
         """Test handling when a report is missing the PDF file"""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.content = self.dummy_pdf_content
+        mock_response.iter_content.return_value = [self.dummy_pdf_content]
         mock_response.json.return_value = {"success": True}
         mock_get.return_value = mock_response
 
@@ -1763,7 +1775,7 @@ class CreateReportsDownloadFileCommandTest(TestSurveyModelBase, APITestCase):
 
         download = self.create_reports_download([report1, report2])
 
-        call_command("create_reports_download_file")
+        call_command("create_reports_download_file", source="http")
 
         download.refresh_from_db()
         self.assertEqual(download.status, "completed", download.logs)
@@ -1773,7 +1785,7 @@ class CreateReportsDownloadFileCommandTest(TestSurveyModelBase, APITestCase):
         # Check logs for missing PDF message
         self.assertIn(f"Report {report2.id} has no pdf file", download.logs)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_download_error_404(self, mock_get):
         """Test handling when PDF download fails"""
         # Response for download
@@ -1787,21 +1799,113 @@ class CreateReportsDownloadFileCommandTest(TestSurveyModelBase, APITestCase):
 
         self.assertEqual(download.status, "pending")
 
-        call_command("create_reports_download_file")
+        call_command("create_reports_download_file", source="http")
 
         download.refresh_from_db()
         # Command should complete even if one file fails (it logs error)
         self.assertEqual(download.status, "completed", download.logs)
         self.assertIn(f"Failed to download pdf file", download.logs)
 
+    @patch("requests.Session.get")
+    def test_download_connection_error(self, mock_get):
+        """Test a file failing after retries is logged and the others are zipped"""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.iter_content.return_value = [self.dummy_pdf_content]
+        mock_get.side_effect = [
+            requests.ConnectionError("Connection refused"),
+            mock_response,
+        ]
+
+        report1 = self.create_dummy_report_with_pdf()
+        report2 = self.create_dummy_report_with_pdf()
+        download = self.create_reports_download([report1, report2])
+
+        with self.settings(REPORTS_DOWNLOAD_WORKERS=1):
+            call_command("create_reports_download_file", source="http")
+
+        download.refresh_from_db()
+        self.assertEqual(download.status, "completed", download.logs)
+        self.assertIn("Connection refused", download.logs)
+        self.assertIn("Downloaded 2/2 pdf files", download.logs)
+
+        # Only the downloaded pdf in the zip
+        with download.zip_file.open("rb") as zip_file:
+            with zipfile.ZipFile(zip_file) as zipf:
+                self.assertEqual(
+                    zipf.namelist(),
+                    [f"{str(report2.participant)}_{report2.id}.pdf"],
+                )
+                self.assertEqual(zipf.read(zipf.namelist()[0]), self.dummy_pdf_content)
+
+    def test_pdf_chunks_bounded_queue(self):
+        """Test the workers pass the pdf chunks to the zip writer through a
+        bounded queue (no temp files), released when the zip writer stops"""
+        from survey.management.commands.create_reports_download_file import (
+            QUEUE_CHUNKS,
+            PdfFetchError,
+            iter_queued_chunks,
+            queue_pdf_chunks,
+        )
+
+        def fetch(chunks):
+            chunks_queue = queue.Queue(maxsize=QUEUE_CHUNKS)
+            stopped = threading.Event()
+            worker = threading.Thread(
+                target=queue_pdf_chunks,
+                args=(chunks, "Failed to read pdf file", chunks_queue, stopped),
+            )
+            worker.start()
+            return worker, chunks_queue, stopped
+
+        # Worker waits while the queue is full, until the zip writer stops
+        chunks = (b"a" for _ in range(QUEUE_CHUNKS * 3))
+        worker, chunks_queue, stopped = fetch(chunks)
+        worker.join(timeout=0.5)
+        self.assertTrue(worker.is_alive())
+        self.assertEqual(chunks_queue.qsize(), QUEUE_CHUNKS)
+        stopped.set()
+        worker.join(timeout=5)
+        self.assertFalse(worker.is_alive())
+
+        # Chunks read in order
+        content = [bytes([index]) * 10 for index in range(QUEUE_CHUNKS * 3)]
+        worker, chunks_queue, _ = fetch(chunk for chunk in content)
+        chunks = iter_queued_chunks(chunks_queue.get(), chunks_queue)
+        self.assertEqual(b"".join(chunks), b"".join(content))
+        worker.join(timeout=5)
+
+        # Errors after the first chunk fail the zip entry
+        def failing_chunks():
+            yield b"a"
+            raise OSError("Boom!")
+
+        worker, chunks_queue, _ = fetch(failing_chunks())
+        with self.assertRaisesMessage(PdfFetchError, "Failed to read pdf file: Boom!"):
+            list(iter_queued_chunks(chunks_queue.get(), chunks_queue))
+        worker.join(timeout=5)
+
+    def test_download_session_retries(self):
+        """Test the download session retries with backoff using a pool"""
+        from survey.management.commands.create_reports_download_file import (
+            get_download_session,
+        )
+
+        session = get_download_session()
+        adapter = session.get_adapter("https://example.com")
+        self.assertEqual(adapter.max_retries.total, settings.REPORTS_DOWNLOAD_RETRIES)
+        self.assertGreater(adapter.max_retries.backoff_factor, 0)
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+        self.assertEqual(adapter._pool_maxsize, settings.REPORTS_DOWNLOAD_WORKERS)
+
     @patch("zipfile.ZipFile")
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_general_exception(self, mock_get, mock_zip):
         """Test handling of unexpected exceptions"""
         # Download success
         download_response = MagicMock()
         download_response.status_code = 200
-        download_response.content = self.dummy_pdf_content
+        download_response.iter_content.return_value = [self.dummy_pdf_content]
 
         mock_get.return_value = download_response
 
@@ -1811,20 +1915,20 @@ class CreateReportsDownloadFileCommandTest(TestSurveyModelBase, APITestCase):
         # Mock an exception during zip creation
         mock_zip.side_effect = Exception("Boom!")
 
-        call_command("create_reports_download_file")
+        call_command("create_reports_download_file", source="http")
 
         download.refresh_from_db()
         self.assertEqual(download.status, "error", download.logs)
         self.assertIn("Error: Boom!", download.logs)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_duplicate_participant_names_reproduce_crash(self, mock_get):
         """
         Test that duplicate participant names currently cause a crash
         """
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.content = self.dummy_pdf_content
+        mock_response.iter_content.return_value = [self.dummy_pdf_content]
         mock_response.json.return_value = {"success": True}
         mock_get.return_value = mock_response
 
@@ -1841,7 +1945,7 @@ class CreateReportsDownloadFileCommandTest(TestSurveyModelBase, APITestCase):
         download = self.create_reports_download([report1, report2])
 
         # This should currently fail (status error) or crash the command
-        call_command("create_reports_download_file")
+        call_command("create_reports_download_file", source="http")
 
         download.refresh_from_db()
 
@@ -1853,10 +1957,160 @@ class CreateReportsDownloadFileCommandTest(TestSurveyModelBase, APITestCase):
             f"Expected completed, got {download.status}. Logs: {download.logs}",
         )
 
+    @patch("requests.Session.get")
+    def test_source_storage(self, mock_get):
+        """Test pdf files are read from the storage backend without http"""
+        report1 = self.create_dummy_report_with_pdf()
+        report2 = self.create_dummy_report_with_pdf()
+        download = self.create_reports_download([report1, report2])
+
+        call_command("create_reports_download_file", source="storage")
+
+        download.refresh_from_db()
+        self.assertEqual(download.status, "completed", download.logs)
+        self.assertIn("from storage", download.logs)
+        self.assertIn("Downloaded 2/2 pdf files", download.logs)
+        mock_get.assert_not_called()
+
+        # Zip contains the stored pdf files
+        with download.zip_file.open("rb") as zip_file:
+            with zipfile.ZipFile(zip_file) as zipf:
+                self.assertEqual(
+                    zipf.namelist(),
+                    [
+                        f"{str(report1.participant)}_{report1.id}.pdf",
+                        f"{str(report2.participant)}_{report2.id}.pdf",
+                    ],
+                )
+                for name in zipf.namelist():
+                    self.assertEqual(zipf.read(name), self.dummy_pdf_content)
+
+    def test_source_storage_missing_file(self):
+        """Test a pdf file missing in the storage is logged and skipped"""
+        report1 = self.create_dummy_report_with_pdf()
+        report2 = self.create_dummy_report_with_pdf()
+        report1.pdf_file.storage.delete(report1.pdf_file.name)
+        download = self.create_reports_download([report1, report2])
+
+        call_command("create_reports_download_file", source="storage")
+
+        download.refresh_from_db()
+        self.assertEqual(download.status, "completed", download.logs)
+        self.assertIn(f"Failed to read pdf file {report1.pdf_file.name}", download.logs)
+
+    @patch("requests.Session.get")
+    def test_zip_streamed_to_storage(self, mock_get):
+        """Test the zip is streamed to the storage with stored entries
+        and without temp files"""
+        report1 = self.create_dummy_report_with_pdf()
+        report2 = self.create_dummy_report_with_pdf()
+        download = self.create_reports_download([report1, report2])
+
+        call_command("create_reports_download_file", source="storage")
+
+        download.refresh_from_db()
+        self.assertEqual(download.status, "completed", download.logs)
+        self.assertTrue(
+            download.zip_file.name.startswith(
+                f"reports_downloads/zip_files/reports_download_{download.id}"
+            )
+        )
+        mock_get.assert_not_called()
+        self.assertIn(f"Zip file saved in {download.zip_file.name}", download.logs)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+        with download.zip_file.open("rb") as zip_file:
+            with zipfile.ZipFile(zip_file) as zipf:
+                self.assertIsNone(zipf.testzip())
+                for zip_info in zipf.infolist():
+                    self.assertEqual(zip_info.compress_type, zipfile.ZIP_STORED)
+
+    def test_save_media_stream_s3_multipart(self):
+        """Test s3 zip files are written with the multipart s3 file"""
+        from storages.backends.s3boto3 import S3Boto3Storage
+        from utils.media import save_media_stream
+
+        download = self.create_reports_download()
+        storage = MagicMock(spec=S3Boto3Storage)
+        storage.get_available_name.side_effect = lambda name, max_length: name
+        s3_file = storage.open.return_value
+        s3_file.__enter__.return_value = s3_file
+
+        field_file = download.zip_file
+        field_file.storage = storage
+        name = save_media_stream(field_file, "test.zip", [b"a", b"b"])
+
+        self.assertEqual(name, "reports_downloads/zip_files/test.zip")
+        self.assertEqual(field_file.name, name)
+        storage.open.assert_called_once_with(name, "wb")
+        self.assertEqual(s3_file.write.call_count, 2)
+        storage.delete.assert_not_called()
+
+    def test_cache_data_saved(self):
+        """Test the fingerprint, size and last use are saved with the zip"""
+        from utils.reports_download import get_reports_download_fingerprint
+
+        report1 = self.create_dummy_report_with_pdf()
+        report2 = self.create_dummy_report_with_pdf()
+        download = self.create_reports_download([report2, report1])
+
+        call_command("create_reports_download_file")
+
+        download.refresh_from_db()
+        self.assertEqual(download.status, "completed", download.logs)
+        self.assertEqual(
+            download.fingerprint,
+            get_reports_download_fingerprint(
+                survey_models.Report.objects.filter(id__in=[report1.id, report2.id])
+            ),
+        )
+        self.assertEqual(download.zip_size, download.zip_file.size)
+        self.assertIsNotNone(download.last_used_at)
+
+    def test_iter_media_file_s3_ranges(self):
+        """Test s3 files are read with parallel range requests in order"""
+        from storages.backends.s3boto3 import S3Boto3Storage
+        from utils.media import iter_media_file
+
+        content = bytes(range(256)) * 40
+        range_size = 1000
+
+        def get_object(Bucket, Key, Range=None):
+            body = MagicMock()
+            data = content
+            if Range:
+                start, end = Range.replace("bytes=", "").split("-")
+                data = content[int(start) : int(end) + 1]
+            body.read.return_value = data
+            return {"Body": body}
+
+        storage = MagicMock(spec=S3Boto3Storage)
+        storage.bucket_name = "bucket"
+        storage._normalize_name.side_effect = lambda name: f"media/{name}"
+        client = storage.connection.meta.client
+        client.head_object.return_value = {"ContentLength": len(content)}
+        client.get_object.side_effect = get_object
+
+        field_file = MagicMock()
+        field_file.storage = storage
+        field_file.name = "reports/test.pdf"
+
+        chunks = list(iter_media_file(field_file, range_size=range_size, workers=3))
+
+        self.assertEqual(b"".join(chunks), content)
+        self.assertEqual(len(chunks), 11)
+        self.assertEqual(client.get_object.call_count, 11)
+        client.head_object.assert_called_once_with(
+            Bucket="bucket", Key="media/reports/test.pdf"
+        )
+
 
 from datetime import timedelta
+from io import StringIO
+from django.db import connection
 from django.utils import timezone
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from survey.models import FormProgress, Survey
 
 
@@ -1885,6 +2139,26 @@ class DeleteExpiredProgressCommandTestCase(TestCase):
         self.assertFalse(FormProgress.objects.filter(pk=self.expired.pk).exists())
         self.assertTrue(FormProgress.objects.filter(pk=self.active.pk).exists())
 
+    def test_delete_expired_batches(self):
+        """Test expired records are deleted in batches and the rate reported"""
+        for index in range(4):
+            FormProgress.objects.create(
+                email=f"expired{index}@example.com",
+                survey=self.survey,
+                data={},
+                expires_at=timezone.now() - timedelta(days=index + 1),
+            )
+        out = StringIO()
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command("delete_expired_progress", batch_size=2, stdout=out)
+
+        self.assertIn("Successfully deleted 5 expired records", out.getvalue())
+        self.assertIn("records/s", out.getvalue())
+        self.assertEqual(list(FormProgress.objects.all()), [self.active])
+        deletes = [query for query in queries if query["sql"].startswith("DELETE")]
+        self.assertEqual(len(deletes), 3)
+
 class GenerateNextReportDifferentiatedSummaryTestCase(GenerateNextReportBase):
     """
     Integration test for differentiated summary results in a single PDF
@@ -2007,3 +2281,313 @@ class GenerateNextReportDifferentiatedSummaryTestCase(GenerateNextReportBase):
         self.assertNotEqual(score_record.score, -1)
         self.assertEqual(survey_models.ReportSummaryScore.objects.filter(report=report, paragraph_type="CD").count(), 1)
 
+
+
+class BenchmarkGroupReportCommandTestCase(TestCase):
+    """Test benchmark_group_report command (default database, rolled back)"""
+
+    def setUp(self):
+        self.output_folder = os.path.join(settings.MEDIA_ROOT, "temp", "tests")
+        os.makedirs(self.output_folder, exist_ok=True)
+        self.output = os.path.join(self.output_folder, "benchmark.json")
+
+    def tearDown(self):
+        if os.path.exists(self.output):
+            os.remove(self.output)
+
+    @override_settings(DEBUG=True)
+    def test_results_file(self):
+        """Test results are saved per size and phase and seed data is discarded"""
+        call_command(
+            "benchmark_group_report",
+            sizes="3,5",
+            db="default",
+            skip_pdf=True,
+            output=self.output,
+        )
+
+        with open(self.output) as file:
+            data = json.load(file)
+
+        self.assertEqual(
+            [result["participants"] for result in data["results"]], [3, 5]
+        )
+        for result in data["results"]:
+            self.assertEqual(
+                list(result["phases"].keys()), ["stats", "context", "html"]
+            )
+            for metrics in result["phases"].values():
+                self.assertEqual(
+                    set(metrics.keys()),
+                    {"queries", "peak_memory_kb", "wall_time_s"},
+                )
+            self.assertGreater(result["phases"]["stats"]["queries"], 0)
+            self.assertEqual(result["phases"]["html"]["queries"], 0)
+
+        self.assertFalse(survey_models.Company.objects.exists())
+        self.assertFalse(survey_models.Report.objects.exists())
+
+    def test_default_db_requires_debug(self):
+        """Test the default database is not seeded without DEBUG"""
+        with self.assertRaises(CommandError):
+            call_command(
+                "benchmark_group_report",
+                sizes="3",
+                db="default",
+                skip_pdf=True,
+                output=self.output,
+            )
+
+        self.assertFalse(survey_models.Company.objects.exists())
+
+    @patch("survey.management.commands.benchmark_group_report.call_command")
+    def test_sqlite_database_restores_connection(self, mock_call_command):
+        """Test the default connection is restored after the benchmark database"""
+        from django.db import connections
+        from survey.management.commands.benchmark_group_report import (
+            sqlite_database,
+        )
+
+        original_connection = connections["default"]
+        original_settings = connections.settings["default"]
+
+        with self.assertRaises(ValueError):
+            with sqlite_database(in_memory=True):
+                self.assertIsNot(connections["default"], original_connection)
+                raise ValueError("Boom!")
+
+        mock_call_command.assert_called_once()
+        self.assertIs(connections["default"], original_connection)
+        self.assertEqual(connections.settings["default"], original_settings)
+        # The original connection is usable (same test transaction)
+        self.assertFalse(survey_models.Company.objects.exists())
+
+    def test_compare_results(self):
+        """Test regressions are flagged over the baseline and tolerance"""
+        from survey.management.commands.benchmark_group_report import (
+            compare_results,
+        )
+
+        baseline = {
+            "results": [
+                {
+                    "participants": 100,
+                    "phases": {
+                        "stats": {
+                            "queries": 10,
+                            "peak_memory_kb": 100,
+                            "wall_time_s": 1.0,
+                        }
+                    },
+                }
+            ]
+        }
+        current = {
+            "results": [
+                {
+                    "participants": 100,
+                    "phases": {
+                        "stats": {
+                            "queries": 11,
+                            "peak_memory_kb": 110,
+                            "wall_time_s": 1.5,
+                        }
+                    },
+                }
+            ]
+        }
+
+        regressions = compare_results(current, baseline, tolerance=0.2)
+        self.assertEqual(len(regressions), 2)
+        self.assertIn("queries", regressions[0])
+        self.assertIn("wall_time_s", regressions[1])
+
+        self.assertEqual(compare_results(baseline, baseline, tolerance=0.2), [])
+
+
+class GenerateAllGroupReportsCommandTestCase(TestSurveyModelBase):
+    """Test generate_all_group_reports command"""
+
+    def setUp(self):
+        self.survey = self.create_survey()
+        self.question_group = self.create_question_group(survey=self.survey)
+
+        self.company_1 = self.create_company(name="Company 1")
+        self.company_2 = self.create_company(name="Company 2")
+        self.company_inactive = self.create_company(
+            name="Company inactive", is_active=False
+        )
+        self.company_empty = self.create_company(name="Company empty")
+
+        for company in [self.company_1, self.company_2, self.company_inactive]:
+            participant = self.create_participant(company=company)
+            report = survey_models.Report.objects.create(
+                survey=self.survey, participant=participant, total=85
+            )
+            self.create_report_question_group_total(
+                report=report, question_group=self.question_group, total=85
+            )
+
+    def test_active_companies(self):
+        """Test a completed group report is created per active company with reports"""
+        call_command("generate_all_group_reports", workers=1)
+
+        group_reports = survey_models.GroupReport.objects.order_by("company_id")
+        self.assertEqual(
+            [group_report.company for group_report in group_reports],
+            [self.company_1, self.company_2],
+        )
+        for group_report in group_reports:
+            self.assertEqual(group_report.status, "completed")
+            self.assertTrue(group_report.pdf_file)
+            self.assertEqual(len(group_report.fingerprint), 64)
+            self.assertEqual(group_report.reports.count(), 1)
+            self.assertIn("completed", group_report.logs)
+
+    def test_company_filter(self):
+        """Test only the selected companies are generated"""
+        call_command(
+            "generate_all_group_reports",
+            company=[self.company_2.id, self.company_inactive.id],
+            workers=1,
+        )
+
+        group_reports = survey_models.GroupReport.objects.order_by("company_id")
+        self.assertEqual(
+            [group_report.company for group_report in group_reports],
+            [self.company_2, self.company_inactive],
+        )
+
+    def test_skip_up_to_date(self):
+        """Test companies without data changes are skipped unless forced"""
+        call_command("generate_all_group_reports", workers=1)
+        call_command("generate_all_group_reports", workers=1)
+        self.assertEqual(survey_models.GroupReport.objects.count(), 2)
+
+        # Forced: the same group reports are generated again
+        call_command("generate_all_group_reports", workers=1, force=True)
+        self.assertEqual(survey_models.GroupReport.objects.count(), 2)
+        self.assertEqual(Job.objects.filter(status="completed").count(), 4)
+        for group_report in survey_models.GroupReport.objects.all():
+            self.assertEqual(group_report.status, "completed")
+
+    @patch("survey.management.commands.generate_all_group_reports.generate_group_report_pdf")
+    def test_error_per_company(self, mock_generate):
+        """Test a failing company is saved as error without stopping the others"""
+        mock_generate.side_effect = [Exception("Boom!"), b"%PDF-1.7"]
+
+        call_command("generate_all_group_reports", workers=1)
+
+        group_report_1 = survey_models.GroupReport.objects.get(company=self.company_1)
+        self.assertEqual(group_report_1.status, "error")
+        self.assertIn("Error: Boom!", group_report_1.logs)
+
+        group_report_2 = survey_models.GroupReport.objects.get(company=self.company_2)
+        self.assertEqual(group_report_2.status, "completed")
+
+        # The failed group report is retried by the jobs worker
+        job_1 = Job.objects.get(payload__group_report_id=group_report_1.id)
+        self.assertEqual(job_1.status, "pending")
+        self.assertIn("Boom!", job_1.last_error)
+        job_2 = Job.objects.get(payload__group_report_id=group_report_2.id)
+        self.assertEqual(job_2.status, "completed")
+
+    @patch("survey.management.commands.generate_all_group_reports.generate_group_report_pdf")
+    def test_leased_while_generating(self, mock_generate):
+        """Test the group report and its job are leased during the generation
+        (reaped back to pending if the command stops)"""
+        leases = []
+
+        def generate(**kwargs):
+            group_report = survey_models.GroupReport.objects.get()
+            job = Job.objects.get()
+            leases.append((group_report.status, group_report.lease_expires_at))
+            leases.append((job.status, job.lease_expires_at))
+            return b"%PDF-1.7"
+
+        mock_generate.side_effect = generate
+
+        call_command("generate_all_group_reports", company=[self.company_1.id])
+
+        for lease_status, lease_expires_at in leases:
+            self.assertEqual(lease_status, "processing")
+            self.assertIsNotNone(lease_expires_at)
+        group_report = survey_models.GroupReport.objects.get()
+        self.assertEqual(group_report.status, "completed")
+        self.assertIsNone(group_report.lease_expires_at)
+
+    def test_claimed_by_jobs_worker(self):
+        """Test group reports already claimed by the jobs worker are skipped"""
+        with patch.object(
+            survey_models.GroupReport,
+            "enqueue_job",
+            lambda group_report: Job.objects.create(
+                job_type="group_report",
+                payload={"group_report_id": group_report.id},
+                status="processing",
+            ),
+        ):
+            out = StringIO()
+            call_command(
+                "generate_all_group_reports",
+                company=[self.company_1.id],
+                workers=1,
+                stdout=out,
+            )
+
+        self.assertIn("Claimed by the jobs worker", out.getvalue())
+        self.assertEqual(survey_models.GroupReport.objects.get().status, "pending")
+
+
+class PruneReportsDownloadsCommandTestCase(TestSurveyModelBase):
+    """Test suite for prune_reports_downloads command"""
+
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+
+    def create_cached_download(self, zip_size: int, days_ago: int):
+        """Create a completed reports download with a zip file"""
+        download = survey_models.ReportsDownload.objects.create()
+        download.zip_file = SimpleUploadedFile("test.zip", b"0" * zip_size)
+        download.status = "completed"
+        download.zip_size = zip_size
+        download.last_used_at = self.now - timedelta(days=days_ago)
+        download.save()
+        return download
+
+    def test_prune_expired_and_least_recently_used(self):
+        """Test old zip files and the least recently used over the size
+        limit are deleted"""
+        mb = 1024 * 1024
+        recent = self.create_cached_download(zip_size=mb, days_ago=1)
+        older = self.create_cached_download(zip_size=mb, days_ago=2)
+        oldest = self.create_cached_download(zip_size=mb, days_ago=3)
+        expired = self.create_cached_download(zip_size=10, days_ago=40)
+        expired_path = expired.zip_file.path
+
+        call_command("prune_reports_downloads", max_mb=2, days=30)
+
+        cached = survey_models.ReportsDownload.objects.exclude(zip_file="")
+        self.assertEqual(
+            set(cached.values_list("id", flat=True)), {recent.id, older.id}
+        )
+        self.assertFalse(os.path.exists(expired_path))
+
+        # Pruned downloads are kept as expired, without file
+        for reports_download in (oldest, expired):
+            reports_download.refresh_from_db()
+            self.assertFalse(reports_download.zip_file)
+            self.assertIsNotNone(reports_download.expired_at)
+        recent.refresh_from_db()
+        self.assertIsNone(recent.expired_at)
+
+    def test_prune_dry_run(self):
+        """Test dry run doesn't delete zip files"""
+        self.create_cached_download(zip_size=10, days_ago=40)
+
+        call_command("prune_reports_downloads", days=30, dry_run=True)
+
+        reports_download = survey_models.ReportsDownload.objects.get()
+        self.assertTrue(reports_download.zip_file)
+        self.assertIsNone(reports_download.expired_at)
@@ -1,51 +1,28 @@
+import os
+import shutil
 from unittest import mock
 from django.conf import settings
+from django.test import override_settings
 from django.core.management import call_command
 from core.tests_base.test_models import TestSurveyModelBase
+from jobs.models import Job
 from survey import models as survey_models
+from utils.group_report_generator import get_or_create_group_report
 
 
 class ReportsDownloadModelTestCase(TestSurveyModelBase):
 
-    @mock.patch("survey.models.requests.get")
-    def test_save_triggers_api_call(self, mock_get):
-        # Configure the mock to return a 200 status code
-        mock_response = mock.Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"message": "Success"}
-        mock_get.return_value = mock_response
-
-        # Create a new ReportsDownload instance using helper
+    def test_enqueue_job(self):
         download = self.create_reports_download()
-        download.trigger_webhook()
-
-        # Check if api call was made
-        expected_url = f"{settings.N8N_BASE_WEBHOOKS}/aft-create-reports-download-file"
-        mock_get.assert_called_once_with(expected_url)
+        download.enqueue_job()
 
-        # Verify status update based on response
+        # Check job queued with the download id (no network calls)
+        job = Job.objects.get()
+        self.assertEqual(job.job_type, "reports_download")
+        self.assertEqual(job.payload, {"reports_download_id": download.id})
+        self.assertEqual(job.status, "pending")
         self.assertEqual(download.status, "pending")
 
-    @mock.patch("survey.models.requests.get")
-    def test_save_api_call_failure(self, mock_get):
-        # Configure the mock to return a non-200 status code
-        mock_response = mock.Mock()
-        mock_response.status_code = 500
-        mock_response.json.return_value = {"error": "Failed"}
-        mock_get.return_value = mock_response
-
-        # Create a new ReportsDownload instance using helper
-        download = self.create_reports_download()
-        download.trigger_webhook()
-
-        # Check if api call was made
-        expected_url = f"{settings.N8N_BASE_WEBHOOKS}/aft-create-reports-download-file"
-        mock_get.assert_called_once_with(expected_url)
-
-        # Verify status update based on response
-        self.assertEqual(download.status, "error")
-
-
 
 class ReportSummaryScoreModelTestCase(TestSurveyModelBase):
     def test_report_summary_score_creation(self):
@@ -81,43 +58,16 @@ class ReportSummaryScoreModelTestCase(TestSurveyModelBase):
 
 class GroupReportModelTestCase(TestSurveyModelBase):
 
-    @mock.patch("survey.models.requests.get")
-    def test_save_triggers_webhook(self, mock_get):
-        mock_response = mock.Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"message": "Success"}
-        mock_get.return_value = mock_response
-
+    def test_enqueue_job(self):
         group_report = self.create_group_report()
-        group_report.trigger_webhook()
+        group_report.enqueue_job()
 
-        expected_url = f"{settings.N8N_BASE_WEBHOOKS}/aft-create-group-report-file"
-        mock_get.assert_called_once_with(expected_url)
+        job = Job.objects.get()
+        self.assertEqual(job.job_type, "group_report")
+        self.assertEqual(job.payload, {"group_report_id": group_report.id})
         self.assertEqual(group_report.status, "pending")
 
-    @mock.patch("survey.models.requests.get")
-    def test_save_webhook_failure(self, mock_get):
-        mock_response = mock.Mock()
-        mock_response.status_code = 500
-        mock_response.json.return_value = {"error": "Failed"}
-        mock_get.return_value = mock_response
-
-        group_report = self.create_group_report()
-        group_report.trigger_webhook()
-
-        expected_url = f"{settings.N8N_BASE_WEBHOOKS}/aft-create-group-report-file"
-        mock_get.assert_called_once_with(expected_url)
-        self.assertEqual(group_report.status, "error")
-        self.assertIn("Failed", group_report.logs)
-
-
-    @mock.patch("survey.models.requests.get")
-    def test_generate_group_report_pdf(self, mock_get):
-        mock_response = mock.Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"message": "Success"}
-        mock_get.return_value = mock_response
-
+    def test_generate_group_report_pdf(self):
         from django.contrib.auth.models import User
         call_command("apps_loaddata")
         call_command("initial_loaddata")
@@ -145,13 +95,131 @@ class GroupReportModelTestCase(TestSurveyModelBase):
         self.assertGreater(len(pdf_bytes), 0)
         self.assertTrue(pdf_bytes.startswith(b"%PDF"))
 
-    @mock.patch("survey.models.requests.get")
-    def test_admin_action_creates_group_report(self, mock_get):
-        mock_response = mock.Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"message": "Success"}
-        mock_get.return_value = mock_response
+    def test_heatmap_svg(self):
+        from utils.group_report_generator import _build_heatmap_svg
+
+        themes = ["Tema 1", "Tema 2", "Tema 3"]
+        rows = [
+            {"name": "User <1>", "dots": ["red", "yellow", "green"]},
+            {"name": "User 2", "dots": ["green", "green", "red"]},
+        ]
+        svg = _build_heatmap_svg(themes, rows)
+
+        # Single vector element with one circle per participant and theme
+        self.assertEqual(svg.count("<svg"), 1)
+        self.assertEqual(svg.count("<circle"), 6)
+        self.assertEqual(svg.count('fill="#e31e24"'), 2)
+        self.assertEqual(svg.count('fill="#fdb913"'), 1)
+        self.assertEqual(svg.count('fill="#39b54a"'), 3)
+
+        # Names and themes are escaped
+        self.assertIn("User &lt;1&gt;", svg)
+        for theme in themes:
+            self.assertIn(theme, svg)
+
+    def test_generate_group_report_pdf_static_pages(self):
+        import tempfile
+        from io import BytesIO
+        from PyPDF2 import PdfReader
+        from utils import group_report_generator
+
+        report = self.__setup_company_with_report()
+        reports = survey_models.Report.objects.filter(id=report.id)
+
+        static_folder = tempfile.mkdtemp()
+        group_report_generator._static_pages_cache.clear()
+        with mock.patch.object(
+            group_report_generator, "STATIC_PAGES_FOLDER", static_folder
+        ):
+            pdf_bytes = group_report_generator.generate_group_report_pdf(
+                reports=reports, company_name=self.company.name
+            )
+
+            # Static pages rendered once and saved in the temp folder
+            self.assertEqual(len(os.listdir(static_folder)), 3)
+            cached = group_report_generator.get_static_pages("toc")
+            self.assertIs(cached, group_report_generator.get_static_pages("toc"))
+
+        with self.settings(GROUP_REPORT_STATIC_PAGES_CACHE=False):
+            pdf_bytes_no_cache = group_report_generator.generate_group_report_pdf(
+                reports=reports, company_name=self.company.name
+            )
+
+        pages = PdfReader(BytesIO(pdf_bytes)).pages
+        pages_no_cache = PdfReader(BytesIO(pdf_bytes_no_cache)).pages
+        self.assertEqual(len(pages), len(pages_no_cache))
+
+        # Static content spliced with the report footer (company name)
+        toc_text = pages[1].extract_text()
+        self.assertIn("Contenido", toc_text)
+        self.assertIn(self.company.name, toc_text)
+        closing_text = pages[-1].extract_text()
+        self.assertIn("leadforward.mx", closing_text)
+        self.assertIn(self.company.name, closing_text)
+
+        shutil.rmtree(static_folder, ignore_errors=True)
+
+    @override_settings(GROUP_REPORT_STATIC_PAGES_CACHE=False)
+    @mock.patch("utils.group_report_generator.render_to_string")
+    def test_generate_group_report_pdf_heatmap_renderer(self, mock_render):
+        mock_render.return_value = "<html></html>"
+
+        from utils.group_report_generator import generate_group_report_pdf
+
+        report = self.__setup_company_with_report()
+        reports = survey_models.Report.objects.filter(id=report.id)
+
+        # Svg renderer: one svg per heatmap page
+        with self.settings(GROUP_REPORT_HEATMAP_RENDERER="svg"):
+            generate_group_report_pdf(reports=reports)
+        context = mock_render.call_args[0][1]
+        self.assertEqual(
+            len(context["heatmap_svg_chunks"]), len(context["heatmap_chunks"])
+        )
+        self.assertGreater(len(context["heatmap_svg_chunks"]), 0)
+
+        # Table renderer: no svg
+        with self.settings(GROUP_REPORT_HEATMAP_RENDERER="table"):
+            generate_group_report_pdf(reports=reports)
+        context = mock_render.call_args[0][1]
+        self.assertEqual(context["heatmap_svg_chunks"], [])
 
+    def test_generate_group_report_pdf_pages_progress(self):
+        """Pages laid out by weasyprint are counted as they are reported"""
+        import logging
+        from jobs.progress import ProgressTracker
+        from utils import group_report_generator
+
+        report = self.__setup_company_with_report()
+        reports = survey_models.Report.objects.filter(id=report.id)
+        group_report = self.create_group_report(reports=[report], company=self.company)
+        saved = survey_models.GroupReport.objects.filter(id=group_report.id)
+        logger = logging.getLogger("weasyprint.progress")
+        progress_saved = []
+
+        def write_pdf(*args, **kwargs):
+            for page in range(1, 4):
+                logger.info("Step 5 - Creating layout - Page %d", page)
+                progress_saved.append(saved.values_list("progress_done", flat=True)[0])
+            return b"%PDF"
+
+        with mock.patch.object(
+            group_report_generator, "write_group_report_pdf", side_effect=write_pdf
+        ):
+            group_report_generator.generate_group_report_pdf(
+                reports=reports,
+                progress=ProgressTracker(group_report, interval=0),
+            )
+
+        # One participant, then one item per page
+        self.assertEqual(progress_saved, [2, 3, 4])
+        group_report.refresh_from_db()
+        self.assertEqual(group_report.progress_phase, "pdf")
+        self.assertEqual(group_report.progress_done, group_report.progress_total)
+        self.assertGreater(group_report.progress_total, 4)
+        self.assertFalse(logger.handlers)
+
+    def test_admin_action_creates_group_report(self):
         from django.contrib.auth.models import User
         call_command("apps_loaddata")
         call_command("initial_loaddata")
@@ -181,13 +249,7 @@ class GroupReportModelTestCase(TestSurveyModelBase):
         self.assertIsNotNone(group_report)
         self.assertIn(report, group_report.reports.all())
 
-    @mock.patch("survey.models.requests.get")
-    def test_management_command_processes_pending(self, mock_get):
-        mock_response = mock.Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"message": "Success"}
-        mock_get.return_value = mock_response
-
+    def test_management_command_processes_pending(self):
         from django.contrib.auth.models import User
         call_command("apps_loaddata")
         call_command("initial_loaddata")
@@ -217,13 +279,12 @@ class GroupReportModelTestCase(TestSurveyModelBase):
         self.assertEqual(group_report.status, "completed")
         self.assertTrue(group_report.pdf_file)
 
-    @mock.patch("survey.models.requests.get")
-    def test_route_admin_only(self, mock_get):
-        mock_response = mock.Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"message": "Success"}
-        mock_get.return_value = mock_response
+        # Progress of the participants and the pages
+        self.assertEqual(group_report.progress_phase, "pdf")
+        self.assertGreater(group_report.progress_total, 1)
+        self.assertEqual(group_report.progress_done, group_report.progress_total)
 
+    def test_route_admin_only(self):
         from django.contrib.auth.models import User
         call_command("apps_loaddata")
         call_command("initial_loaddata")
@@ -242,9 +303,131 @@ class GroupReportModelTestCase(TestSurveyModelBase):
         )
         self.client.login(username=username, password=password)
 
+        response = self.client.get(f"/group-report-pdf/{self.company.id}/")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(survey_models.GroupReport.objects.count(), 1)
+
+    def __setup_company_with_report(self) -> survey_models.Report:
+        """Load survey data, login as admin and create a company with one report"""
+        from django.contrib.auth.models import User
+        call_command("apps_loaddata")
+        call_command("initial_loaddata")
+
+        username = "test_user"
+        password = "test_pass"
+        User.objects.create_superuser(
+            username=username,
+            email="test@gmail.com",
+            password=password,
+        )
+        self.client.login(username=username, password=password)
+
+        self.company = self.create_company()
+        return self.create_report()
+
+    def test_route_cache_miss_enqueues_build(self):
+        report = self.__setup_company_with_report()
+
+        response = self.client.get(f"/group-report-pdf/{self.company.id}/")
+        self.assertEqual(response.status_code, 202)
+        self.assertContains(response, 'http-equiv="refresh"', status_code=202)
+
+        group_report = survey_models.GroupReport.objects.get()
+        self.assertEqual(group_report.status, "pending")
+        self.assertEqual(group_report.company, self.company)
+        self.assertEqual(len(group_report.fingerprint), 64)
+        self.assertIn(report, group_report.reports.all())
+        self.assertTrue(
+            Job.objects.filter(
+                job_type="group_report",
+                payload__group_report_id=group_report.id,
+            ).exists()
+        )
+
+        # Refreshing while building does not enqueue a second build
+        response = self.client.get(f"/group-report-pdf/{self.company.id}/")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(survey_models.GroupReport.objects.count(), 1)
+
+    def test_route_cache_hit_serves_pdf(self):
+        self.__setup_company_with_report()
+
+        self.client.get(f"/group-report-pdf/{self.company.id}/")
+        call_command("create_group_report")
+
         response = self.client.get(f"/group-report-pdf/{self.company.id}/")
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+        self.assertEqual(survey_models.GroupReport.objects.count(), 1)
+
+    def test_route_data_change_rebuilds(self):
+        report = self.__setup_company_with_report()
+
+        self.client.get(f"/group-report-pdf/{self.company.id}/")
+        call_command("create_group_report")
+
+        # New totals invalidate the cached pdf
+        report.total = 99
+        report.save()
+
+        response = self.client.get(f"/group-report-pdf/{self.company.id}/")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(survey_models.GroupReport.objects.count(), 2)
+
+
+    def test_route_participant_change_rebuilds(self):
+        report = self.__setup_company_with_report()
+
+        self.client.get(f"/group-report-pdf/{self.company.id}/")
+        call_command("create_group_report")
+
+        # Participant names are rendered in the rankings
+        report.participant.name = "Nuevo Nombre"
+        report.participant.save()
+
+        response = self.client.get(f"/group-report-pdf/{self.company.id}/")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(survey_models.GroupReport.objects.count(), 2)
+
+    def test_route_error_not_retried(self):
+        self.__setup_company_with_report()
+
+        self.client.get(f"/group-report-pdf/{self.company.id}/")
+        survey_models.GroupReport.objects.update(status="error")
+
+        # Error shown without refresh, not queued again on each request
+        for _ in range(2):
+            response = self.client.get(f"/group-report-pdf/{self.company.id}/")
+            self.assertEqual(response.status_code, 500)
+            self.assertContains(response, "No se pudo generar", status_code=500)
+            self.assertNotContains(response, "http-equiv", status_code=500)
+        group_report = survey_models.GroupReport.objects.get()
+        self.assertEqual(group_report.status, "error")
+        self.assertEqual(Job.objects.filter(job_type="group_report").count(), 1)
+
+        # Retried on request (generate_all_group_reports)
+        reports = survey_models.Report.objects.filter(participant__company=self.company)
+        group_report, job = get_or_create_group_report(
+            self.company, reports, retry_error=True
+        )
+        self.assertIsNotNone(job)
+        self.assertEqual(group_report.status, "pending")
+
+    def test_unique_fingerprint(self):
+        from django.db import IntegrityError, transaction
+
+        self.company = self.create_company()
+        survey_models.GroupReport.objects.create(company=self.company, fingerprint="a")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            survey_models.GroupReport.objects.create(
+                company=self.company, fingerprint="a"
+            )
+
+        # Group reports without fingerprint (admin) are not cache entries
+        survey_models.GroupReport.objects.create(company=self.company)
+        survey_models.GroupReport.objects.create(company=self.company)
+        self.assertEqual(survey_models.GroupReport.objects.count(), 3)
 
 
 class TextPDFSummaryModelTestCase(TestSurveyModelBase):
@@ -1,13 +1,43 @@
+import io
+import gzip
 import json
+import os
 import random
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timedelta
+from unittest.mock import patch
 
+import brotli
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
 from django.db.models import Avg
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.management import call_command
+from django.core.checks import run_checks
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 from rest_framework import status
 
 from core.tests_base.test_views import TestSurveyViewsBase
+from jobs.models import Job
 from survey import models as survey_models
+from utils import progress_buffer
+
+
+# Cache shared by processes (required by the form progress write-behind
+# and the invitation code lookups cache)
+SHARED_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(tempfile.gettempdir(), "survey_tests_cache"),
+    }
+}
 
 
 class InvitationCodeViewTestCase(TestSurveyViewsBase):
@@ -62,6 +92,71 @@ class InvitationCodeViewTestCase(TestSurveyViewsBase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("error", response.data["status"])
 
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_post_cached_lookups(self):
+        """Test repeated valid and invalid codes don't query the database"""
+        cache.clear()
+        company = self.create_company(invitation_code="test")
+        for invitation_code in ("test", "invalid_code"):
+            self.client.post(
+                self.endpoint, {"invitation_code": invitation_code}, format="json"
+            )
+
+        with CaptureQueriesContext(connection) as context:
+            valid = self.client.post(
+                self.endpoint, {"invitation_code": "test"}, format="json"
+            )
+            invalid = self.client.post(
+                self.endpoint, {"invitation_code": "invalid_code"}, format="json"
+            )
+
+        self.assertEqual(valid.status_code, status.HTTP_200_OK)
+        self.assertEqual(valid.data["data"]["name"], company.name)
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+        queries = [query["sql"] for query in context.captured_queries]
+        self.assertEqual([query for query in queries if "survey_" in query], [])
+
+    def test_post_process_cache_not_used(self):
+        """Test lookups are not cached in a per process cache (the company
+        edits of other processes would not invalidate them)"""
+        self.create_company(invitation_code="test")
+        self.client.post(self.endpoint, {"invitation_code": "test"}, format="json")
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                self.endpoint, {"invitation_code": "test"}, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        queries = [query["sql"] for query in context.captured_queries]
+        self.assertNotEqual([query for query in queries if "survey_" in query], [])
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_post_cache_invalidated(self):
+        """Test company saves and deletes update the cached lookups"""
+        cache.clear()
+        payload = {"invitation_code": "new_code"}
+        response = self.client.post(self.endpoint, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Unknown code now used
+        company = self.create_company(invitation_code="new_code")
+        response = self.client.post(self.endpoint, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Company deactivated
+        company.is_active = False
+        company.save()
+        response = self.client.post(self.endpoint, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Company deleted
+        company.is_active = True
+        company.save()
+        company.delete()
+        response = self.client.post(self.endpoint, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class OptionsViewTestCase(TestSurveyViewsBase):
     def setUp(self):
@@ -82,6 +177,18 @@ class OptionsViewTestCase(TestSurveyViewsBase):
                 self.assertIn("value", response.data[key][0])
                 self.assertIn("label", response.data[key][0])
 
+    def test_get_options_not_modified(self):
+        """Test 304 when the client has the current options"""
+        response = self.client.get(self.endpoint)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertNotIn("public", response["Cache-Control"])
+        self.assertIn("Authorization", response["Vary"])
+
+        response = self.client.get(self.endpoint, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
 
 class SurveyViewTestCase(TestSurveyViewsBase):
     def setUp(self):
@@ -98,8 +205,8 @@ class SurveyViewTestCase(TestSurveyViewsBase):
         response = self.client.get(f"{self.endpoint}{survey.id}/")
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data["name"], survey.name)
-        self.assertEqual(response.data["instructions"], survey.instructions)
+        self.assertEqual(response.json()["name"], survey.name)
+        self.assertEqual(response.json()["instructions"], survey.instructions)
 
     def test_question_group_data_single(self):
         """
@@ -117,7 +224,7 @@ class SurveyViewTestCase(TestSurveyViewsBase):
         # Retrieve question group data
         response = self.client.get(f"{self.endpoint}{question_group.survey.id}/")
 
-        question_group_response = response.data["question_groups"][0]
+        question_group_response = response.json()["question_groups"][0]
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(question_group_response["name"], question_group.name)
@@ -149,7 +256,7 @@ class SurveyViewTestCase(TestSurveyViewsBase):
         for question_group_index, question_group in enumerate(question_groups):
             self.assertEqual(response.status_code, status.HTTP_200_OK)
             self.assertEqual(
-                response.data["question_groups"][question_group_index]["name"],
+                response.json()["question_groups"][question_group_index]["name"],
                 question_group.name,
             )
 
@@ -174,7 +281,9 @@ class SurveyViewTestCase(TestSurveyViewsBase):
         for question_group_index, question_group in enumerate(question_groups):
             self.assertEqual(response.status_code, status.HTTP_200_OK)
             self.assertEqual(
-                response.data["question_groups"][question_group_index]["survey_index"],
+                response.json()["question_groups"][question_group_index][
+                    "survey_index"
+                ],
                 question_group_index + 1,
             )
 
@@ -221,7 +330,7 @@ class SurveyViewTestCase(TestSurveyViewsBase):
             f"{self.endpoint}{question.question_group.survey.id}/"
         )
 
-        question_response = response.data["question_groups"][0]["questions"][0]
+        question_response = response.json()["question_groups"][0]["questions"][0]
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(question_response["text"], question.text)
         self.assertEqual(question_response["details"], question.details)
@@ -251,7 +360,7 @@ class SurveyViewTestCase(TestSurveyViewsBase):
 
         # Retrieve questions data
         response = self.client.get(f"{self.endpoint}{survey.id}/")
-        question_response = response.data["question_groups"][0]["questions"]
+        question_response = response.json()["question_groups"][0]["questions"]
         for question_index, question in enumerate(questions):
             self.assertEqual(response.status_code, status.HTTP_200_OK)
             self.assertEqual(
@@ -287,7 +396,7 @@ class SurveyViewTestCase(TestSurveyViewsBase):
 
         # Retrieve questions data
         response = self.client.get(f"{self.endpoint}{survey.id}/")
-        question_response = response.data["question_groups"][0]["questions"]
+        question_response = response.json()["question_groups"][0]["questions"]
         for question_index, question in enumerate(questions):
             self.assertEqual(response.status_code, status.HTTP_200_OK)
             self.assertEqual(
@@ -311,9 +420,9 @@ class SurveyViewTestCase(TestSurveyViewsBase):
             f"{self.endpoint}{question_option.question.question_group.survey.id}/"
         )
 
-        question_option_response = response.data["question_groups"][0]["questions"][0][
-            "options"
-        ][0]
+        question_option_response = response.json()["question_groups"][0]["questions"][
+            0
+        ]["options"][0]
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(question_option_response["text"], question_option.text)
         self.assertEqual(
@@ -352,9 +461,9 @@ class SurveyViewTestCase(TestSurveyViewsBase):
 
         # Retrieve question options data
         response = self.client.get(f"{self.endpoint}{survey.id}/")
-        question_option_response = response.data["question_groups"][0]["questions"][0][
-            "options"
-        ]
+        question_option_response = response.json()["question_groups"][0]["questions"][
+            0
+        ]["options"]
         for question_option_index, question_option in enumerate(question_options):
             self.assertEqual(response.status_code, status.HTTP_200_OK)
             self.assertEqual(
@@ -395,9 +504,9 @@ class SurveyViewTestCase(TestSurveyViewsBase):
 
         # Retrieve question options data
         response = self.client.get(f"{self.endpoint}{survey.id}/")
-        question_option_response = response.data["question_groups"][0]["questions"][0][
-            "options"
-        ]
+        question_option_response = response.json()["question_groups"][0]["questions"][
+            0
+        ]["options"]
         for question_option_index, question_option in enumerate(question_options):
             self.assertEqual(response.status_code, status.HTTP_200_OK)
             self.assertEqual(
@@ -406,6 +515,258 @@ class SurveyViewTestCase(TestSurveyViewsBase):
             )
 
 
+class SurveyViewCacheTestCase(TestSurveyViewsBase):
+    """Test survey detail built with fixed queries and cached per version"""
+
+    def setUp(self):
+        super().setUp(endpoint="/api/surveys/")
+        self.survey = self.create_survey()
+        self.add_question_groups(1)
+
+    def add_question_groups(self, count: int):
+        """Add groups with a modifier, two questions and two options each"""
+        for _ in range(count):
+            question_group = self.create_question_group(
+                survey=self.survey,
+                modifiers=[self.create_question_group_modifier()],
+            )
+            for _ in range(2):
+                question = self.create_question(question_group=question_group)
+                for _ in range(2):
+                    self.create_question_option(question=question)
+
+    def get_survey_queries(self) -> list[str]:
+        """Queries to the survey tables in a survey detail request"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f"{self.endpoint}{self.survey.id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        queries = [query["sql"] for query in context.captured_queries]
+        return [query for query in queries if "survey_" in query]
+
+    def test_fixed_queries(self):
+        """Test the number of queries does not depend on the survey size"""
+        small_survey_queries = self.get_survey_queries()
+
+        self.add_question_groups(3)
+        large_survey_queries = self.get_survey_queries()
+
+        # Version and survey, groups, modifiers, questions and options
+        self.assertEqual(len(small_survey_queries), 6)
+        self.assertEqual(len(large_survey_queries), 6)
+
+    def test_cache_hit(self):
+        """Test cached requests only query the survey version"""
+        first_response = self.client.get(f"{self.endpoint}{self.survey.id}/")
+
+        queries = self.get_survey_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertIn("detail_version", queries[0])
+        response = self.client.get(f"{self.endpoint}{self.survey.id}/")
+        self.assertEqual(response.content, first_response.content)
+
+    def test_version_from_database(self):
+        """Test versions changed by other processes refresh the detail (the
+        version is not kept in the per process cache)"""
+        self.client.get(f"{self.endpoint}{self.survey.id}/")
+        survey_models.Survey.objects.filter(id=self.survey.id).update(
+            name="Updated by another process", detail_version=time.time_ns()
+        )
+
+        data = self.client.get(f"{self.endpoint}{self.survey.id}/").json()
+
+        self.assertEqual(data["name"], "Updated by another process")
+
+    def test_invalidation(self):
+        """Test changes in options, modifiers and questions refresh the detail"""
+        self.client.get(f"{self.endpoint}{self.survey.id}/")
+        question_group = self.survey.questiongroup_set.get()
+        question = question_group.question_set.first()
+
+        option = question.questionoption_set.first()
+        option.text = "Updated option"
+        option.save()
+        data = self.client.get(f"{self.endpoint}{self.survey.id}/").json()
+        options = data["question_groups"][0]["questions"][0]["options"]
+        self.assertIn("Updated option", [option["text"] for option in options])
+
+        modifier = self.create_question_group_modifier(name="New modifier")
+        question_group.modifiers.add(modifier)
+        data = self.client.get(f"{self.endpoint}{self.survey.id}/").json()
+        self.assertIn("New modifier", data["question_groups"][0]["modifiers"])
+
+        modifier.name = "Renamed modifier"
+        modifier.save()
+        data = self.client.get(f"{self.endpoint}{self.survey.id}/").json()
+        self.assertIn("Renamed modifier", data["question_groups"][0]["modifiers"])
+
+        question.delete()
+        data = self.client.get(f"{self.endpoint}{self.survey.id}/").json()
+        self.assertEqual(len(data["question_groups"][0]["questions"]), 1)
+
+    def test_moved_question_group(self):
+        """Test moving a group refreshes both surveys"""
+        other_survey = self.create_survey()
+        self.client.get(f"{self.endpoint}{self.survey.id}/")
+        self.client.get(f"{self.endpoint}{other_survey.id}/")
+
+        question_group = self.survey.questiongroup_set.get()
+        question_group.survey = other_survey
+        question_group.save()
+
+        data = self.client.get(f"{self.endpoint}{self.survey.id}/").json()
+        self.assertEqual(data["question_groups"], [])
+        data = self.client.get(f"{self.endpoint}{other_survey.id}/").json()
+        self.assertEqual(len(data["question_groups"]), 1)
+
+    def test_compressed_content(self):
+        """Test brotli and gzip versions of the same json"""
+        content = self.client.get(f"{self.endpoint}{self.survey.id}/").content
+
+        response = self.client.get(
+            f"{self.endpoint}{self.survey.id}/", HTTP_ACCEPT_ENCODING="gzip, br"
+        )
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(response.content), content)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        response = self.client.get(
+            f"{self.endpoint}{self.survey.id}/", HTTP_ACCEPT_ENCODING="gzip, br;q=0"
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), content)
+
+    def test_not_found(self):
+        """Test missing surveys"""
+        response = self.client.get(f"{self.endpoint}999/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_not_modified(self):
+        """Test 304 with only the version query, until the survey changes"""
+        response = self.client.get(f"{self.endpoint}{self.survey.id}/")
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("Authorization", response["Vary"])
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                f"{self.endpoint}{self.survey.id}/", HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        queries = [query["sql"] for query in context.captured_queries]
+        self.assertEqual(len([query for query in queries if "survey_" in query]), 1)
+
+        # Other encoding, other etag
+        response = self.client.get(
+            f"{self.endpoint}{self.survey.id}/",
+            HTTP_IF_NONE_MATCH=etag,
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.survey.name = "Updated survey"
+        self.survey.save()
+        response = self.client.get(
+            f"{self.endpoint}{self.survey.id}/", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["name"], "Updated survey")
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class SurveyScreensViewTestCase(TestSurveyViewsBase):
+    """Test survey outline and question groups loaded screen by screen"""
+
+    def setUp(self):
+        super().setUp(endpoint="/api/surveys/")
+        self.survey = self.create_survey()
+        self.question_groups = []
+        for survey_index in [1, 2, 4]:
+            question_group = self.create_question_group(
+                survey=self.survey, survey_index=survey_index
+            )
+            for question_group_index in range(1, 4):
+                question = self.create_question(
+                    question_group=question_group,
+                    question_group_index=question_group_index,
+                )
+                self.create_question_option(question=question)
+            self.question_groups.append(question_group)
+        self.screens_endpoint = f"{self.endpoint}{self.survey.id}/screens/"
+
+    def test_outline(self):
+        """Test groups without questions or details"""
+        response = self.client.get(f"{self.endpoint}{self.survey.id}/outline/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["name"], self.survey.name)
+        self.assertEqual(
+            [group["survey_index"] for group in data["question_groups"]], [1, 2, 4]
+        )
+        question_group = data["question_groups"][0]
+        self.assertEqual(question_group["questions_count"], 3)
+        self.assertNotIn("questions", question_group)
+        self.assertNotIn("details", question_group)
+
+    def test_screen(self):
+        """Test the group questions and the prefetch hint of the next screen"""
+        response = self.client.get(f"{self.screens_endpoint}2/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["id"], self.question_groups[1].id)
+        self.assertEqual(
+            [question["question_group_index"] for question in data["questions"]],
+            [1, 2, 3],
+        )
+        self.assertEqual(len(data["questions"][0]["options"]), 1)
+        self.assertEqual(data["next_survey_index"], 4)
+        self.assertEqual(
+            response["Link"], f"<{self.screens_endpoint}4/>; rel=prefetch"
+        )
+
+    def test_last_screen(self):
+        """Test the last screen has no next screen"""
+        response = self.client.get(f"{self.screens_endpoint}4/")
+
+        self.assertIsNone(response.json()["next_survey_index"])
+        self.assertFalse(response.has_header("Link"))
+
+    def test_screen_not_found(self):
+        """Test positions without group"""
+        response = self.client.get(f"{self.screens_endpoint}3/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_screen_cache(self):
+        """Test cached screens, refreshed when the survey changes"""
+        response = self.client.get(f"{self.screens_endpoint}1/")
+        etag = response["ETag"]
+        outline_etag = self.client.get(f"{self.endpoint}{self.survey.id}/outline/")[
+            "ETag"
+        ]
+        self.assertNotEqual(etag, outline_etag)
+
+        response = self.client.get(
+            f"{self.screens_endpoint}1/", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        question = self.question_groups[0].question_set.first()
+        question.text = "Updated question"
+        question.save()
+        response = self.client.get(
+            f"{self.screens_endpoint}1/", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(
+            "Updated question",
+            [question["text"] for question in response.json()["questions"]],
+        )
+
+
 class HasAnswerViewTestCase(TestSurveyViewsBase):
 
     def setUp(self):
@@ -704,6 +1065,11 @@ class ResponseViewTestCase(TestSurveyViewsBase):
         self.assertEqual(report.participant, participant)
         self.assertEqual(answers.count(), len(self.data["answers"]))
 
+        # Validate pdf generation queued
+        self.assertTrue(
+            Job.objects.filter(job_type="report", payload__report_id=report.id).exists()
+        )
+
 
 class ResponseViewTotalsTestCase(TestSurveyViewsBase):
     """
@@ -969,6 +1335,7 @@ class FormProgressViewTestCase(TestSurveyViewsBase):
             restricted_get=False,
             restricted_post=False,
         )
+        self.restricted_patch = False
         self.restricted_delete = False
         self.survey = self.create_survey()
         self.company = self.create_company(invitation_code="TEST-CODE")
@@ -1059,3 +1426,854 @@ class FormProgressViewTestCase(TestSurveyViewsBase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         # Check for ALREADY_SUBMITTED code in errors
         self.assertIn("ALREADY_SUBMITTED", str(response.data))
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_post_single_upsert(self):
+        """Test saves use one validation query and one upsert"""
+        cache.clear()
+        self.client.post(self.endpoint, self.progress_data, format="json")
+        update_data = {**self.progress_data, "current_screen": 3}
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.endpoint, update_data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        queries = [query["sql"] for query in context.captured_queries]
+        self.assertEqual(len([query for query in queries if "survey_" in query]), 2)
+        progress = survey_models.FormProgress.objects.get()
+        self.assertEqual(progress.current_screen, 3)
+        self.assertEqual(progress.company, self.company)
+
+    def test_post_extends_expiration(self):
+        """Test each save moves the expiration date"""
+        self.client.post(self.endpoint, self.progress_data, format="json")
+        survey_models.FormProgress.objects.update(
+            expires_at=timezone.now() + timedelta(days=1)
+        )
+
+        response = self.client.post(self.endpoint, self.progress_data, format="json")
+
+        progress = survey_models.FormProgress.objects.get()
+        self.assertGreater(progress.expires_at, timezone.now() + timedelta(days=29))
+        self.assertEqual(
+            datetime.fromisoformat(response.data["expires_at"].replace("Z", "+00:00")),
+            progress.expires_at,
+        )
+
+    def test_post_without_screen(self):
+        """Test saves without current_screen keep the saved screen"""
+        self.client.post(self.endpoint, self.progress_data, format="json")
+        update_data = {**self.progress_data}
+        update_data.pop("current_screen")
+        update_data["data"] = {"responses": []}
+
+        response = self.client.post(self.endpoint, update_data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["current_screen"], 2)
+        progress = survey_models.FormProgress.objects.get()
+        self.assertEqual(progress.current_screen, 2)
+        self.assertEqual(progress.data, {"responses": []})
+        self.assertIsNone(progress.company)
+
+    def test_patch_merge(self):
+        """Test patches are merged into the saved data with a new version"""
+        version = self.client.post(
+            self.endpoint, self.progress_data, format="json"
+        ).data["version"]
+
+        response = self.client.patch(
+            self.endpoint,
+            {
+                "email": self.email,
+                "survey_id": self.survey.id,
+                "version": version,
+                "current_screen": 3,
+                "data": {"screen3": {"questionId": 5}, "responses": None},
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data["version"], version)
+        progress = survey_models.FormProgress.objects.get()
+        self.assertEqual(progress.version, response.data["version"])
+        self.assertEqual(progress.current_screen, 3)
+        self.assertEqual(
+            progress.data,
+            {
+                "guestCodeResponse": {"guestCode": "TEST-CODE"},
+                "screen3": {"questionId": 5},
+            },
+        )
+        self.assertEqual(progress.company, self.company)
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_patch_guest_code(self):
+        """Test patches of the invitation code link the company from the
+        cached invitation codes"""
+        cache.clear()
+        other_company = self.create_company(invitation_code="OTHER-CODE")
+        version = self.client.post(
+            self.endpoint, self.progress_data, format="json"
+        ).data["version"]
+        data_patch = {"guestCodeResponse": {"guestCode": "OTHER-CODE"}}
+
+        response = self.client.patch(
+            self.endpoint,
+            {
+                "email": self.email,
+                "survey_id": self.survey.id,
+                "version": version,
+                "data": data_patch,
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        progress = survey_models.FormProgress.objects.get()
+        self.assertEqual(progress.company, other_company)
+        with CaptureQueriesContext(connection) as queries:
+            fields = progress.get_patch_fields(data_patch)
+        self.assertEqual(fields["company_id"], other_company.id)
+        self.assertEqual(len(queries), 0)
+
+    def test_patch_conflict(self):
+        """Test patches from an old version are rejected with the saved data"""
+        version = self.client.post(
+            self.endpoint, self.progress_data, format="json"
+        ).data["version"]
+        patch_data = {
+            "email": self.email,
+            "survey_id": self.survey.id,
+            "version": version,
+            "data": {"screen2": {"questionId": 3}},
+        }
+        self.client.patch(self.endpoint, patch_data, format="json")
+
+        # Other tab with the first version
+        patch_data["data"] = {"screen2": {"questionId": 4}}
+        response = self.client.patch(self.endpoint, patch_data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            response.data["progress"]["data"]["screen2"], {"questionId": 3}
+        )
+        progress = survey_models.FormProgress.objects.get()
+        self.assertEqual(progress.version, response.data["progress"]["version"])
+        self.assertEqual(progress.data["screen2"], {"questionId": 3})
+
+    def test_patch_concurrent_save(self):
+        """Test the conditional update when the row changes after the read"""
+        self.client.post(self.endpoint, self.progress_data, format="json")
+        progress = survey_models.FormProgress.objects.get()
+        version = progress.version
+        survey_models.FormProgress.objects.update(version=version + 1)
+
+        self.assertFalse(progress.apply_patch({"screen2": {}}, version))
+        self.assertNotIn("screen2", survey_models.FormProgress.objects.get().data)
+
+    def test_patch_deleted_concurrently(self):
+        """Test patches of progress deleted after the read are not found"""
+        version = self.client.post(
+            self.endpoint, self.progress_data, format="json"
+        ).data["version"]
+
+        def delete_progress(progress, *args):
+            survey_models.FormProgress.objects.filter(id=progress.id).delete()
+            return False
+
+        with patch.object(
+            survey_models.FormProgress, "apply_patch", delete_progress
+        ):
+            response = self.client.patch(
+                self.endpoint,
+                {
+                    "email": self.email,
+                    "survey_id": self.survey.id,
+                    "version": version,
+                    "data": {"screen2": {"questionId": 3}},
+                },
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_patch_not_found(self):
+        """Test patches without saved progress"""
+        response = self.client.patch(
+            self.endpoint,
+            {
+                "email": self.email,
+                "survey_id": self.survey.id,
+                "version": 1,
+                "data": {},
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_expired_progress_missing(self):
+        """Test expired progress not purged yet is not found, and replaced
+        by the next save"""
+        response = self.client.post(self.endpoint, self.progress_data, format="json")
+        version = response.data["version"]
+        survey_models.FormProgress.objects.update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        response = self.client.get(
+            self.endpoint, {"email": self.email, "survey_id": self.survey.id}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.patch(
+            self.endpoint,
+            {
+                "email": self.email,
+                "survey_id": self.survey.id,
+                "version": version,
+                "data": {},
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.post(self.endpoint, self.progress_data, format="json")
+        response = self.client.get(
+            self.endpoint, {"email": self.email, "survey_id": self.survey.id}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_post_partial(self):
+        """Test saves without data keep the saved data and company"""
+        self.client.post(self.endpoint, self.progress_data, format="json")
+        survey_models.FormProgress.objects.update(
+            expires_at=timezone.now() + timedelta(days=1)
+        )
+
+        response = self.client.post(
+            self.endpoint,
+            {"email": self.email, "survey_id": self.survey.id, "current_screen": 5},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"], self.progress_data["data"])
+        self.assertEqual(response.data["current_screen"], 5)
+        progress = survey_models.FormProgress.objects.get()
+        self.assertEqual(progress.current_screen, 5)
+        self.assertEqual(progress.form_data, self.progress_data["data"])
+        self.assertEqual(progress.company, self.company)
+        self.assertGreater(progress.expires_at, timezone.now() + timedelta(days=29))
+        self.assertEqual(progress.version, response.data["version"])
+
+    def test_post_partial_without_screen(self):
+        """Test saves without data nor current_screen return the saved screen"""
+        self.client.post(self.endpoint, self.progress_data, format="json")
+
+        response = self.client.post(
+            self.endpoint,
+            {"email": self.email, "survey_id": self.survey.id},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["current_screen"], 2)
+        self.assertEqual(response.data["data"], self.progress_data["data"])
+
+    def test_post_partial_without_progress(self):
+        """Test saves without data need a saved progress"""
+        response = self.client.post(
+            self.endpoint,
+            {"email": self.email, "survey_id": self.survey.id, "current_screen": 5},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("data", response.data)
+        self.assertFalse(survey_models.FormProgress.objects.exists())
+
+    def test_post_invalid_survey(self):
+        """Test missing surveys are rejected"""
+        response = self.client.post(
+            self.endpoint, {**self.progress_data, "survey_id": 999}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("survey_id", response.data)
+        self.assertFalse(survey_models.FormProgress.objects.exists())
+
+
+@override_settings(
+    CACHES=SHARED_CACHES,
+    FORM_PROGRESS_WRITE_BEHIND=True,
+    FORM_PROGRESS_FLUSH_SECONDS=0,
+)
+class FormProgressWriteBehindTestCase(TestSurveyViewsBase):
+    """Test form progress saves buffered in the cache and flushed in bulk"""
+
+    def setUp(self):
+        super().setUp(endpoint="/api/progress/", restricted_post=False)
+        self.restricted_patch = False
+        self.restricted_delete = False
+        cache.clear()
+        self.survey = self.create_survey()
+        self.company = self.create_company(invitation_code="TEST-CODE")
+        self.email = "test@example.com"
+        self.progress_data = {
+            "email": self.email,
+            "survey_id": self.survey.id,
+            "current_screen": 2,
+            "data": {"guestCodeResponse": {"guestCode": "TEST-CODE"}},
+        }
+        self.query_params = {"email": self.email, "survey_id": self.survey.id}
+
+    def __flush(self):
+        call_command("flush_form_progress", stdout=io.StringIO())
+
+    def test_post_buffered(self):
+        """Test saves are read from the buffer until flushed"""
+        response = self.client.post(self.endpoint, self.progress_data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(survey_models.FormProgress.objects.exists())
+        response = self.client.get(self.endpoint, self.query_params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["current_screen"], 2)
+
+        # One flush job per interval
+        self.assertEqual(Job.objects.filter(job_type="form_progress").count(), 1)
+
+        self.__flush()
+
+        progress = survey_models.FormProgress.objects.get()
+        self.assertEqual(progress.current_screen, 2)
+        self.assertEqual(progress.company, self.company)
+        self.assertEqual(progress.version, response.data["version"])
+
+    def test_last_save_wins(self):
+        """Test several saves of a participant are written once"""
+        for current_screen in [2, 3, 4]:
+            self.client.post(
+                self.endpoint,
+                {**self.progress_data, "current_screen": current_screen},
+                format="json",
+            )
+        self.client.post(
+            self.endpoint,
+            {"email": "other@example.com", "survey_id": self.survey.id, "data": {}},
+            format="json",
+        )
+
+        self.assertEqual(progress_buffer.flush_progress(), 2)
+        self.assertEqual(progress_buffer.flush_progress(), 0)
+
+        progress = survey_models.FormProgress.objects.get(email=self.email)
+        self.assertEqual(progress.current_screen, 4)
+        other_progress = survey_models.FormProgress.objects.get(
+            email="other@example.com"
+        )
+        self.assertEqual(other_progress.current_screen, 1)
+
+    def test_flush_job(self):
+        """Test the queued job writes the saves"""
+        self.client.post(self.endpoint, self.progress_data, format="json")
+
+        call_command("run_jobs", once=True, stdout=io.StringIO())
+
+        self.assertEqual(Job.objects.get().status, "completed")
+        self.assertTrue(survey_models.FormProgress.objects.exists())
+
+    def test_patch_buffered(self):
+        """Test patches are merged into the buffered save"""
+        version = self.client.post(
+            self.endpoint, self.progress_data, format="json"
+        ).data["version"]
+
+        response = self.client.patch(
+            self.endpoint,
+            {**self.query_params, "version": version, "data": {"screen2": [1]}},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(
+            self.endpoint,
+            {**self.query_params, "version": version, "data": {"screen2": [2]}},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        self.__flush()
+        progress = survey_models.FormProgress.objects.get()
+        self.assertEqual(progress.data["screen2"], [1])
+        self.assertEqual(progress.data["guestCodeResponse"]["guestCode"], "TEST-CODE")
+
+    def test_delete_discards_buffer(self):
+        """Test deleted progress is not written by the next flush"""
+        self.client.post(self.endpoint, self.progress_data, format="json")
+
+        self.client.delete(
+            f"{self.endpoint}?email={self.email}&survey_id={self.survey.id}"
+        )
+        self.__flush()
+
+        self.assertFalse(survey_models.FormProgress.objects.exists())
+        response = self.client.get(self.endpoint, self.query_params)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_flush_waits_for_mark(self):
+        """Test a numbered save without mark is waited for one flush"""
+        self.client.post(self.endpoint, self.progress_data, format="json")
+        cache.incr(progress_buffer.SEQUENCE_KEY)
+
+        self.client.post(
+            self.endpoint,
+            {"email": "other@example.com", "survey_id": self.survey.id, "data": {}},
+            format="json",
+        )
+
+        self.assertEqual(progress_buffer.flush_progress(), 1)
+        self.assertEqual(progress_buffer.flush_progress(), 1)
+        self.assertEqual(survey_models.FormProgress.objects.count(), 2)
+
+    def test_delete_during_flush(self):
+        """Test a progress deleted while the flush writes it is not recreated"""
+        self.client.post(self.endpoint, self.progress_data, format="json")
+        bulk_upsert = survey_models.FormProgress.bulk_upsert
+
+        def delete_then_upsert(progresses):
+            self.client.delete(
+                f"{self.endpoint}?email={self.email}&survey_id={self.survey.id}"
+            )
+            bulk_upsert(progresses)
+
+        with patch.object(
+            survey_models.FormProgress,
+            "bulk_upsert",
+            side_effect=delete_then_upsert,
+        ):
+            self.__flush()
+
+        self.assertFalse(survey_models.FormProgress.objects.exists())
+
+    def test_new_save_during_flush_kept(self):
+        """Test a save replacing the flushed one is not removed by the flush"""
+        self.client.post(self.endpoint, self.progress_data, format="json")
+        bulk_upsert = survey_models.FormProgress.bulk_upsert
+
+        def save_then_upsert(progresses):
+            self.client.post(
+                self.endpoint,
+                {**self.progress_data, "current_screen": 3},
+                format="json",
+            )
+            bulk_upsert(progresses)
+
+        with patch.object(
+            survey_models.FormProgress,
+            "bulk_upsert",
+            side_effect=save_then_upsert,
+        ):
+            self.__flush()
+        self.__flush()
+
+        self.assertEqual(survey_models.FormProgress.objects.get().current_screen, 3)
+
+    def test_post_partial_buffered(self):
+        """Test saves without data keep the buffered data"""
+        self.client.post(self.endpoint, self.progress_data, format="json")
+
+        response = self.client.post(
+            self.endpoint,
+            {"email": self.email, "survey_id": self.survey.id, "current_screen": 4},
+            format="json",
+        )
+        self.__flush()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        progress = survey_models.FormProgress.objects.get()
+        self.assertEqual(progress.current_screen, 4)
+        self.assertEqual(progress.form_data, self.progress_data["data"])
+        self.assertEqual(progress.company, self.company)
+
+    @override_settings(CACHES=settings.CACHES)
+    def test_per_process_cache_disabled(self):
+        """Test saves go to the database with a per process cache (the jobs
+        worker would not see the buffer), reported by the system checks"""
+        response = self.client.post(self.endpoint, self.progress_data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(survey_models.FormProgress.objects.exists())
+        errors = [error.id for error in run_checks()]
+        self.assertIn("survey.E001", errors)
+
+
+@override_settings(FORM_PROGRESS_COMPRESS=True)
+class FormProgressCompressTestCase(TestSurveyViewsBase):
+    """Test form progress data saved as compressed json"""
+
+    def setUp(self):
+        super().setUp(endpoint="/api/progress/", restricted_post=False)
+        self.restricted_patch = False
+        self.restricted_delete = False
+        self.survey = self.create_survey()
+        self.company = self.create_company(invitation_code="TEST-CODE")
+        self.email = "test@example.com"
+        self.form_data = {
+            "guestCodeResponse": {"guestCode": "TEST-CODE"},
+            "answers": {"1": "Sí", "2": [3, 4]},
+        }
+        self.query_params = {"email": self.email, "survey_id": self.survey.id}
+
+    def __save(self, form_data: dict):
+        return self.client.post(
+            self.endpoint,
+            {"email": self.email, "survey_id": self.survey.id, "data": form_data},
+            format="json",
+        )
+
+    def test_post_compressed(self):
+        """Test saves are compressed and decoded in the responses"""
+        response = self.__save(self.form_data)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"], self.form_data)
+        progress = survey_models.FormProgress.objects.get()
+        self.assertIsNone(progress.data)
+        self.assertIsNotNone(progress.data_compressed)
+        self.assertEqual(progress.company, self.company)
+
+        response = self.client.get(self.endpoint, self.query_params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"], self.form_data)
+
+    def test_patch_compressed(self):
+        """Test patches are merged into the compressed data"""
+        version = self.__save(self.form_data).data["version"]
+
+        response = self.client.patch(
+            self.endpoint,
+            {**self.query_params, "version": version, "data": {"answers": {"1": None}}},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        expected = {**self.form_data, "answers": {"2": [3, 4]}}
+        self.assertEqual(response.data["data"], expected)
+        progress = survey_models.FormProgress.objects.get()
+        self.assertIsNone(progress.data)
+        self.assertEqual(progress.form_data, expected)
+
+    def test_plain_rows_read(self):
+        """Test rows saved before enabling the compression are still read"""
+        with self.settings(FORM_PROGRESS_COMPRESS=False):
+            self.__save(self.form_data)
+
+        response = self.client.get(self.endpoint, self.query_params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"], self.form_data)
+
+    def test_compress_command(self):
+        """Test the command converts the saved rows in batches, and back"""
+        with self.settings(FORM_PROGRESS_COMPRESS=False):
+            for index in range(3):
+                self.email = f"test{index}@example.com"
+                self.__save({**self.form_data, "index": index})
+
+        out = io.StringIO()
+        call_command("compress_form_progress", batch_size=2, stdout=out)
+
+        self.assertIn("Successfully compressed 3 records", out.getvalue())
+        progresses = survey_models.FormProgress.objects.order_by("id")
+        self.assertFalse(progresses.filter(data__isnull=False).exists())
+        self.assertEqual(
+            [progress.form_data["index"] for progress in progresses], [0, 1, 2]
+        )
+
+        out = io.StringIO()
+        call_command("compress_form_progress", decompress=True, stdout=out)
+
+        self.assertIn("Successfully decompressed 3 records", out.getvalue())
+        self.assertFalse(progresses.filter(data_compressed__isnull=False).exists())
+        self.assertEqual(
+            [progress.data["index"] for progress in progresses.all()], [0, 1, 2]
+        )
+
+
+
+class ReportsZipViewTestCase(TestSurveyViewsBase):
+    """Test reports zip download built on the fly"""
+
+    def setUp(self):
+        super().setUp(endpoint="/reports-zip/")
+        self.survey = self.create_survey()
+        self.pdf_content = b"%PDF-1.4 dummy content"
+        self.reports = [self.__create_report_with_pdf() for _ in range(3)]
+
+    def __create_report_with_pdf(self) -> survey_models.Report:
+        """Create a completed report with a pdf file"""
+        return survey_models.Report.objects.create(
+            participant=self.create_participant(company=self.company_1),
+            survey=self.survey,
+            status="completed",
+            pdf_file=SimpleUploadedFile(
+                "test_report.pdf", self.pdf_content, content_type="application/pdf"
+            ),
+        )
+
+    def test_get_zip_streamed(self):
+        """Test the zip file is streamed with the selected reports pdfs"""
+        ids = ",".join(str(report.id) for report in self.reports[:2])
+        response = self.client.get(self.endpoint, {"ids": ids})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/zip")
+
+        content = b"".join(response.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(content)) as zipf:
+            self.assertEqual(
+                zipf.namelist(),
+                [
+                    f"{str(report.participant)}_{report.id}.pdf"
+                    for report in self.reports[:2]
+                ],
+            )
+            for name in zipf.namelist():
+                self.assertEqual(zipf.read(name), self.pdf_content)
+
+    def test_get_zip_company(self):
+        """Test all the company reports are zipped"""
+        response = self.client.get(self.endpoint, {"company": self.company_1.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = b"".join(response.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(content)) as zipf:
+            self.assertEqual(len(zipf.namelist()), 3)
+
+    def test_get_zip_missing_file_skipped(self):
+        """Test reports with a missing pdf file in the storage are skipped"""
+        report = self.reports[0]
+        report.pdf_file.storage.delete(report.pdf_file.name)
+
+        response = self.client.get(self.endpoint, {"company": self.company_1.id})
+
+        content = b"".join(response.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(content)) as zipf:
+            self.assertEqual(len(zipf.namelist()), 2)
+
+    def test_get_invalid_params(self):
+        """Test missing or invalid selection"""
+        response = self.client.get(self.endpoint)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.endpoint, {"ids": "a,b"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.endpoint, {"ids": "0"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @patch("survey.models.ReportsDownload.enqueue_job")
+    def test_get_big_selection_background_job(self, mock_enqueue_job):
+        """Test selections over the limit create a reports download"""
+        with self.settings(REPORTS_ZIP_STREAM_MAX_REPORTS=2):
+            response = self.client.get(self.endpoint, {"company": self.company_1.id})
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        reports_download = survey_models.ReportsDownload.objects.get(
+            id=response.json()["reports_download"]
+        )
+        self.assertEqual(reports_download.reports.count(), 3)
+        mock_enqueue_job.assert_called_once()
+
+    def test_unauthenticated_user_get(self):
+        """Test that non staff users are redirected to login"""
+        self.client.logout()
+        response = self.client.get(self.endpoint, {"company": self.company_1.id})
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+
+
+class ProgressViewTestCase(TestSurveyViewsBase):
+    """Test progress of reports downloads and group reports"""
+
+    def setUp(self):
+        super().setUp()
+        self.reports_download = self.create_reports_download()
+        self.endpoint = f"/reports-downloads/{self.reports_download.id}/progress/"
+
+    def test_get_progress(self):
+        """Test percent complete and eta of a processing download"""
+        now = timezone.now()
+        survey_models.ReportsDownload.objects.filter(
+            id=self.reports_download.id
+        ).update(
+            status="processing",
+            progress_phase="download",
+            progress_done=25,
+            progress_total=100,
+            progress_started_at=now - timedelta(seconds=50),
+            progress_updated_at=now,
+        )
+
+        response = self.client.get(self.endpoint)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["id"], self.reports_download.id)
+        self.assertEqual(data["status"], "processing")
+        self.assertEqual(data["phase"], "download")
+        self.assertEqual(data["percent"], 25.0)
+
+        # 25 items in 50 seconds: 150 seconds left
+        eta = datetime.fromisoformat(data["eta"])
+        self.assertAlmostEqual((eta - now).total_seconds(), 150, delta=1)
+
+    def test_get_progress_pending(self):
+        """Test pending rows without progress"""
+        response = self.client.get(self.endpoint)
+
+        data = response.json()
+        self.assertEqual(data["status"], "pending")
+        self.assertIsNone(data["percent"])
+        self.assertIsNone(data["eta"])
+
+    def test_get_group_report_progress(self):
+        """Test group report progress"""
+        group_report = self.create_group_report()
+        group_report.status = "completed"
+        group_report.save()
+
+        response = self.client.get(f"/group-reports/{group_report.id}/progress/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["percent"], 100.0)
+
+    def test_get_not_found(self):
+        """Test missing rows"""
+        response = self.client.get("/group-reports/999/progress/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unauthenticated_user_get(self):
+        """Test that non staff users are redirected to login"""
+        self.client.logout()
+        response = self.client.get(self.endpoint)
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+
+
+class StatusViewTestCase(TestSurveyViewsBase):
+    """Test status api with etags and long-poll"""
+
+    def setUp(self):
+        super().setUp()
+        self.report = survey_models.Report.objects.create(
+            participant=self.create_participant(),
+            survey=self.create_survey(),
+        )
+        self.endpoint = f"/api/reports/{self.report.id}/status/"
+
+    def __complete_report(self, *args):
+        """Finish the report (sleep side effect of the long-poll)"""
+        self.report.status = "completed"
+        self.report.save()
+
+    def test_get_status(self):
+        """Test status data and etag header"""
+        response = self.client.get(self.endpoint)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()["data"]
+        self.assertEqual(data["id"], self.report.id)
+        self.assertEqual(data["status"], "pending")
+        self.assertTrue(response["ETag"])
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertEqual(response["Retry-After"], "2")
+
+    def test_get_not_modified(self):
+        """Test 304 without body when the etag matches"""
+        etag = self.client.get(self.endpoint)["ETag"]
+
+        response = self.client.get(self.endpoint, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def test_get_modified(self):
+        """Test new etag after a status change (also by queryset updates)"""
+        etag = self.client.get(self.endpoint)["ETag"]
+        survey_models.Report.objects.filter(id=self.report.id).update(
+            status="processing"
+        )
+
+        response = self.client.get(self.endpoint, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["data"]["status"], "processing")
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_long_poll_disabled(self):
+        """Test 304 right away when the long-poll is disabled (sync workers)"""
+        etag = self.client.get(self.endpoint)["ETag"]
+
+        with patch("survey.views.time.sleep") as mock_sleep:
+            response = self.client.get(
+                f"{self.endpoint}?wait=30", HTTP_IF_NONE_MATCH=etag
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertTrue(response["Retry-After"])
+        mock_sleep.assert_not_called()
+
+    @override_settings(STATUS_LONG_POLL_ENABLED=True)
+    def test_long_poll_change(self):
+        """Test the long-poll answers as soon as the status changes"""
+        etag = self.client.get(self.endpoint)["ETag"]
+
+        with patch(
+            "survey.views.time.sleep", side_effect=self.__complete_report
+        ) as mock_sleep:
+            response = self.client.get(
+                f"{self.endpoint}?wait=30", HTTP_IF_NONE_MATCH=etag
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["data"]["status"], "completed")
+        self.assertEqual(mock_sleep.call_count, 1)
+
+    @override_settings(STATUS_LONG_POLL_ENABLED=True)
+    def test_long_poll_timeout(self):
+        """Test 304 when nothing changes during the wait"""
+        etag = self.client.get(self.endpoint)["ETag"]
+
+        with self.settings(STATUS_LONG_POLL_INTERVAL=0.05):
+            response = self.client.get(
+                f"{self.endpoint}?wait=0.2", HTTP_IF_NONE_MATCH=etag
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_get_progress(self):
+        """Test downloads and group reports include their progress"""
+        reports_download = self.create_reports_download()
+        group_report = self.create_group_report()
+
+        for endpoint in [
+            f"/api/reports-downloads/{reports_download.id}/status/",
+            f"/api/group-reports/{group_report.id}/status/",
+        ]:
+            response = self.client.get(endpoint)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json()["data"]["progress"]["status"], "pending")
+
+    def test_get_not_found(self):
+        """Test missing rows"""
+        response = self.client.get("/api/reports/999/status/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unauthenticated_user_get(self):
+        """Test that anonymous users are rejected"""
+        self.client.logout()
+        response = self.client.get(self.endpoint)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1,54 +1,267 @@
+import json
+import time
+from datetime import datetime, timezone
+from functools import cache
+
+from django.conf import settings
 from django.contrib.admin.views.decorators import staff_member_required
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
 from django.utils.decorators import method_decorator
 from django.views import View
-from django.shortcuts import get_object_or_404
+from django.shortcuts import get_object_or_404, render
 from rest_framework import status, viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from core import choices
+from jobs.models import ProgressModel
+from jobs.progress import get_progress
 from survey import models, serializers
 
-from utils.group_report_generator import generate_group_report_pdf
+from utils.group_report_generator import get_or_create_group_report
+from utils import invitation_codes, progress_buffer
+from utils.conditional import AUTH_VARY_HEADERS, conditional_get, get_etag
+from utils.reports_download import get_or_create_reports_download
+from utils.survey_detail_cache import (
+    get_accepted_encoding,
+    get_survey_detail,
+    get_survey_detail_queryset,
+    get_survey_outline,
+    get_survey_screen,
+    get_survey_version,
+)
+from utils.zip_stream import get_reports_zip_response
 
 
 @method_decorator(staff_member_required, name="dispatch")
 class GroupReportPDFView(View):
+    """Serve the cached group report pdf of a company, building it in background
+    when the company data changed since the last generation"""
+
+    refresh_seconds = 10
 
     def get(self, request, company_id):
         company = get_object_or_404(models.Company, id=company_id)
-        participants = models.Participant.objects.filter(company=company)
-        reports = models.Report.objects.filter(participant__in=participants)
-
-        pdf_bytes = generate_group_report_pdf(
-            reports=reports,
-            company_name=company.name,
-            additional_recommendations=company.additional_recommendations,
+        reports = models.Report.objects.filter(participant__company=company)
+        # Group report of the current data (queued if new)
+        group_report, _ = get_or_create_group_report(company, reports)
+
+        # Cache hit: return stored pdf
+        if group_report.status == "completed" and group_report.pdf_file:
+            response = FileResponse(
+                group_report.pdf_file.open("rb"), content_type="application/pdf"
+            )
+            response["Content-Disposition"] = 'inline; filename="group_report.pdf"'
+            return response
+
+        # Failed: error shown without refresh (retried with
+        # generate_all_group_reports or when the company data changes)
+        failed = group_report.status == "error"
+        return render(
+            request,
+            "survey/group_report_building.html",
+            {
+                "company": company,
+                "group_report": group_report,
+                "failed": failed,
+                "refresh_seconds": self.refresh_seconds,
+            },
+            status=(
+                status.HTTP_500_INTERNAL_SERVER_ERROR
+                if failed
+                else status.HTTP_202_ACCEPTED
+            ),
         )
 
-        response = HttpResponse(pdf_bytes, content_type="application/pdf")
-        response["Content-Disposition"] = 'inline; filename="group_report.pdf"'
-        return response
 
+@method_decorator(staff_member_required, name="dispatch")
+class ReportsZipView(View):
+    """Download a zip file with the pdf files of the selected reports
+    (?ids=1,2,3 and/or ?company=1), built on the fly. Bigger selections
+    create a reports download processed in background"""
 
-class OptionsView(APIView):
     def get(self, request):
-        def format_choices(choices_list):
-            return [{"value": c[0], "label": c[1]} for c in choices_list]
+        reports = models.Report.objects.filter(status="completed").exclude(
+            pdf_file=""
+        )
 
-        data = {
-            "status": choices.STATUS_CHOICES,
-            "gender": choices.GENDER_CHOICES,
-            "birth_range": choices.BIRTH_RANGE_CHOICES,
-            "position": choices.POSITION_CHOICES,
-            "department": choices.DEPARTMENT_CHOICES,
+        ids = request.GET.get("ids", "")
+        company_id = request.GET.get("company", "")
+        try:
+            ids = [int(report_id) for report_id in ids.split(",") if report_id]
+            company_id = int(company_id) if company_id else None
+        except ValueError:
+            return JsonResponse(
+                {"status": "error", "message": "Parámetros inválidos"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not ids and not company_id:
+            return JsonResponse(
+                {"status": "error", "message": "Selecciona reportes o empresa"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if ids:
+            reports = reports.filter(id__in=ids)
+        if company_id:
+            reports = reports.filter(participant__company_id=company_id)
+
+        reports_num = reports.count()
+        if not reports_num:
+            return JsonResponse(
+                {"status": "error", "message": "No hay reportes para descargar"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        # Big selections: generate the zip file in background
+        if reports_num > settings.REPORTS_ZIP_STREAM_MAX_REPORTS:
+            reports_download, _ = get_or_create_reports_download(reports)
+            return JsonResponse(
+                {
+                    "status": "pending",
+                    "message": "Descarga creada. Consulta tabla de descargas "
+                    "para ver el estado.",
+                    "reports_download": reports_download.id,
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
+
+        return get_reports_zip_response(reports)
+
+
+@method_decorator(staff_member_required, name="dispatch")
+class ProgressView(View):
+    """Progress of a reports download or group report: phase, items
+    done/total, percent complete and eta"""
+
+    model = None
+
+    def get(self, request, pk):
+        obj = get_object_or_404(self.model, id=pk)
+        return JsonResponse({"id": obj.id, **get_progress(obj)})
+
+
+class StatusView(APIView):
+    """Status of a report, reports download or group report. Responses
+    have an ETag (status and last update): send it in If-None-Match to get
+    304 if nothing changed, and poll again after the Retry-After seconds.
+
+    With STATUS_LONG_POLL_ENABLED (async or threaded workers only: each
+    wait blocks a worker), ?wait=<seconds> waits for a change before
+    answering (long-poll)"""
+
+    model = None
+
+    def get_object(self, pk):
+        """Object with only the status fields (single query, no joins)"""
+        fields = ["id", "status", "updated_at"]
+        if issubclass(self.model, ProgressModel):
+            fields += [
+                "progress_phase",
+                "progress_done",
+                "progress_total",
+                "progress_started_at",
+                "progress_updated_at",
+            ]
+        return self.model.objects.only(*fields).filter(id=pk).first()
+
+    def get_etag(self, obj) -> str:
+        """Quoted hash of the status and update dates of the object"""
+        # Lease claims and progress saves don't change updated_at
+        parts = [obj.status, obj.updated_at.isoformat()]
+        if isinstance(obj, ProgressModel) and obj.progress_updated_at:
+            parts.append(obj.progress_updated_at.isoformat())
+        return get_etag(*parts)
+
+    def get(self, request, pk):
+        try:
+            wait = float(request.query_params.get("wait", 0))
+        except ValueError:
+            wait = 0
+        wait = min(max(wait, 0), settings.STATUS_LONG_POLL_MAX_SECONDS)
+        if not settings.STATUS_LONG_POLL_ENABLED:
+            wait = 0
+
+        if_none_match = request.headers.get("If-None-Match", "")
+        client_etags = [etag.strip() for etag in if_none_match.split(",")]
+
+        obj = self.get_object(pk)
+        if not obj:
+            return Response(
+                {"status": "error", "message": "Not found.", "data": {}},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        etag = self.get_etag(obj)
+
+        # Long-poll: check again until the object changes or the wait ends
+        deadline = time.monotonic() + wait
+        while etag in client_etags and time.monotonic() < deadline:
+            remaining = max(0, deadline - time.monotonic())
+            time.sleep(min(settings.STATUS_LONG_POLL_INTERVAL, remaining))
+            obj = self.get_object(pk)
+            if not obj:
+                break
+            etag = self.get_etag(obj)
+
+        if not obj:
+            return Response(
+                {"status": "error", "message": "Not found.", "data": {}},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "private, no-cache",
+            "Retry-After": str(settings.STATUS_POLL_SECONDS),
         }
+        if etag in client_etags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        data = {"id": obj.id, "status": obj.status, "updated_at": obj.updated_at}
+        if isinstance(obj, ProgressModel):
+            data["progress"] = get_progress(obj)
+
+        return Response(
+            {"status": "ok", "message": "Status found.", "data": data},
+            status=status.HTTP_200_OK,
+            headers=headers,
+        )
+
 
-        # Format each list
-        formatted_data = {key: format_choices(val) for key, val in data.items()}
+@cache
+def get_options_data() -> dict:
+    """Choices of the participant fields (constant while the app runs)"""
 
-        return Response(formatted_data, status=status.HTTP_200_OK)
+    def format_choices(choices_list):
+        return [{"value": c[0], "label": c[1]} for c in choices_list]
+
+    data = {
+        "status": choices.STATUS_CHOICES,
+        "gender": choices.GENDER_CHOICES,
+        "birth_range": choices.BIRTH_RANGE_CHOICES,
+        "position": choices.POSITION_CHOICES,
+        "department": choices.DEPARTMENT_CHOICES,
+    }
+
+    # Format each list
+    return {key: format_choices(val) for key, val in data.items()}
+
+
+@cache
+def get_options_etag() -> str:
+    return get_etag(json.dumps(get_options_data(), sort_keys=True))
+
+
+class OptionsView(APIView):
+    @conditional_get(
+        etag_func=lambda request: get_options_etag(),
+        vary=AUTH_VARY_HEADERS,
+        private=True,
+        no_cache=True,
+    )
+    def get(self, request):
+        return Response(get_options_data(), status=status.HTTP_200_OK)
 
 
 class InvitationCodeView(APIView):
@@ -58,23 +271,11 @@ class InvitationCodeView(APIView):
             # Validate data structure
             invitation_code = serializer.validated_data["invitation_code"]
 
-            # Check if the invitation code is valid
-            try:
-                company = models.Company.objects.get(
-                    invitation_code=invitation_code, is_active=True
-                )
-            except models.Company.DoesNotExist:
-                return Response(
-                    {
-                        "status": "error",
-                        "message": "Invalid or inactive invitation code.",
-                        "data": {},
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+            # Check if the invitation code is valid (cached lookup)
+            company = invitation_codes.get_company(invitation_code)
 
             # Check if the company is active
-            if not company.is_active:
+            if not company or not company["is_active"]:
                 return Response(
                     {
                         "status": "error",
@@ -89,9 +290,9 @@ class InvitationCodeView(APIView):
                 "status": "ok",
                 "message": "Valid invitation code.",
                 "data": {
-                    "id": company.id,
-                    "name": company.name,
-                    "details": company.details,
+                    "id": company["id"],
+                    "name": company["name"],
+                    "details": company["details"],
                 },
             }
 
@@ -108,12 +309,112 @@ class InvitationCodeView(APIView):
 
 
 # Get api endpoint
+def get_request_survey_version(request, pk) -> int | None:
+    """Version of the requested survey, read once per request (validators
+    and content)"""
+    if not hasattr(request, "survey_version"):
+        try:
+            request.survey_version = get_survey_version(int(pk))
+        except ValueError:
+            request.survey_version = None
+    return request.survey_version
+
+
+def get_survey_detail_etag(request, pk=None, **kwargs) -> str | None:
+    """Url, survey version and content encoding (single version query)"""
+    version = get_request_survey_version(request, pk)
+    if version is None:
+        return None
+    encoding = get_accepted_encoding(request.headers.get("Accept-Encoding", ""))
+    return get_etag(request.path, version, encoding)
+
+
+def get_survey_detail_last_modified(request, pk=None, **kwargs) -> datetime | None:
+    """Time of the last survey change (versions are nanosecond timestamps)"""
+    version = get_request_survey_version(request, pk)
+    if version is None:
+        return None
+    return datetime.fromtimestamp(version / 1e9, timezone.utc)
+
+
 class SurveyDetailView(viewsets.ReadOnlyModelViewSet):
     queryset = models.Survey.objects.all()
     serializer_class = serializers.SurveyDetailSerializer
 
     def get_queryset(self):
-        return self.queryset
+        return get_survey_detail_queryset()
+
+    def get_cached_response(self, request, cached: dict | None) -> HttpResponse:
+        """Cached json response (compressed if the client accepts it)"""
+        if cached is None:
+            raise Http404
+
+        encoding = get_accepted_encoding(request.headers.get("Accept-Encoding", ""))
+        response = HttpResponse(
+            cached["content"][encoding], content_type="application/json"
+        )
+        for header, value in cached["headers"].items():
+            response[header] = value
+        if encoding != "identity":
+            response["Content-Encoding"] = encoding
+        patch_vary_headers(response, ["Accept-Encoding"])
+        return response
+
+    def get_survey_id(self, pk) -> int:
+        try:
+            return int(pk)
+        except ValueError:
+            raise Http404
+
+    def get_survey_version(self, request, pk) -> int | None:
+        return get_request_survey_version(request, pk)
+
+    @conditional_get(
+        etag_func=get_survey_detail_etag,
+        last_modified_func=get_survey_detail_last_modified,
+        vary=AUTH_VARY_HEADERS,
+        private=True,
+        no_cache=True,
+    )
+    def retrieve(self, request, pk=None):
+        """Full survey: all groups, questions and options"""
+        cached = get_survey_detail(
+            self.get_survey_id(pk), self.get_survey_version(request, pk)
+        )
+        return self.get_cached_response(request, cached)
+
+    @action(detail=True)
+    @conditional_get(
+        etag_func=get_survey_detail_etag,
+        last_modified_func=get_survey_detail_last_modified,
+        vary=AUTH_VARY_HEADERS,
+        private=True,
+        no_cache=True,
+    )
+    def outline(self, request, pk=None):
+        """Survey and its groups without questions (first screen)"""
+        cached = get_survey_outline(
+            self.get_survey_id(pk), self.get_survey_version(request, pk)
+        )
+        return self.get_cached_response(request, cached)
+
+    @action(detail=True, url_path=r"screens/(?P<survey_index>-?\d+)")
+    @conditional_get(
+        etag_func=get_survey_detail_etag,
+        last_modified_func=get_survey_detail_last_modified,
+        vary=AUTH_VARY_HEADERS,
+        private=True,
+        no_cache=True,
+    )
+    def screen(self, request, pk=None, survey_index=None):
+        """Question group in a survey position, with a prefetch Link
+        header to the next screen"""
+        cached = get_survey_screen(
+            self.get_survey_id(pk),
+            self.get_survey_version(request, pk),
+            int(survey_index),
+        )
+        return self.get_cached_response(request, cached)
 
 
 class HasAnswerView(APIView):
@@ -175,7 +476,8 @@ class ResponseView(APIView):
 
         participant, options, report = serializer.save()
 
-        # Delete progress after successful submission
+        # Delete progress after successful submission (also the buffered one)
+        progress_buffer.discard_progress(participant.email, report.survey_id)
         models.FormProgress.objects.filter(
             email=participant.email, survey=report.survey
         ).delete()
@@ -205,15 +507,23 @@ class FormProgressView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            progress = models.FormProgress.objects.get(email=email, survey_id=survey_id)
-            serializer = serializers.FormProgressSerializer(progress)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except models.FormProgress.DoesNotExist:
+        progress = None
+        if progress_buffer.is_enabled():
+            progress = progress_buffer.get_buffered_progress(email, survey_id)
+        if not progress:
+            progress = (
+                models.FormProgress.active()
+                .filter(email=email, survey_id=survey_id)
+                .first()
+            )
+        if not progress:
             return Response(
                 {"detail": "Progress not found."}, status=status.HTTP_404_NOT_FOUND
             )
 
+        serializer = serializers.FormProgressSerializer(progress)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
     def post(self, request):
         email = request.data.get("email")
         survey_id = request.data.get("survey_id")
@@ -224,34 +534,74 @@ class FormProgressView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Handle Upsert logic
-        try:
-            progress = models.FormProgress.objects.get(email=email, survey_id=survey_id)
-            serializer = serializers.FormProgressSerializer(
-                progress, data=request.data, partial=True
-            )
-        except models.FormProgress.DoesNotExist:
-            serializer = serializers.FormProgressSerializer(data=request.data)
-
+        # Upsert with the company of the guest code and a new expiration date
+        serializer = serializers.FormProgressSaveSerializer(data=request.data)
         if serializer.is_valid():
-            # Extract guestCode for company linking
-            data_blob = request.data.get("data", {})
-            guest_code = data_blob.get("guestCodeResponse", {}).get("guestCode")
-            company = None
-            if guest_code:
-                company = models.Company.objects.filter(
-                    invitation_code=guest_code, is_active=True
-                ).first()
-
-            progress = serializer.save(company=company)
-            # Update expires_at on every save to extend validity
-            progress.expires_at = models.get_default_expires_at()
-            progress.save()
-
+            serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def patch(self, request):
+        """Merge a patch of the data into the saved progress. The version
+        must be the one of the last save read by the client: 409 with the
+        saved progress if it changed since (e.g. from another tab)"""
+        serializer = serializers.FormProgressPatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        progress = serializer.validated_data["progress"]
+        buffered = None
+        if progress_buffer.is_enabled():
+            buffered = progress_buffer.get_buffered_progress(
+                serializer.validated_data["email"],
+                serializer.validated_data["survey_id"],
+            )
+            progress = buffered or progress
+        if not progress:
+            return Response(
+                {"detail": "Progress not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        version = serializer.validated_data["version"]
+        data_patch = serializer.validated_data["data"]
+        current_screen = serializer.validated_data.get("current_screen")
+        if progress_buffer.is_enabled():
+            # Write-behind: last save wins in the buffer
+            saved = progress.version == version
+            if saved:
+                fields = progress.get_patch_fields(data_patch, current_screen)
+                for field, value in fields.items():
+                    setattr(progress, field, value)
+                progress_buffer.buffer_progress(progress)
+        else:
+            saved = progress.version == version and progress.apply_patch(
+                data_patch, version, current_screen
+            )
+
+        if not saved:
+            if not buffered:
+                try:
+                    progress.refresh_from_db()
+                except models.FormProgress.DoesNotExist:
+                    # Deleted (or submitted) since it was read
+                    return Response(
+                        {"detail": "Progress not found."},
+                        status=status.HTTP_404_NOT_FOUND,
+                    )
+            return Response(
+                {
+                    "detail": "Progress changed since the version.",
+                    "progress": serializers.FormProgressSerializer(progress).data,
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        return Response(
+            serializers.FormProgressSerializer(progress).data,
+            status=status.HTTP_200_OK,
+        )
+
     def delete(self, request):
         email = request.query_params.get("email")
         survey_id = request.query_params.get("survey_id")
@@ -262,5 +612,6 @@ class FormProgressView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        progress_buffer.discard_progress(email, survey_id)
         models.FormProgress.objects.filter(email=email, survey_id=survey_id).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
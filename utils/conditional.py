@@ -0,0 +1,43 @@
+import hashlib
+
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
+
+# Headers identifying the user of authenticated api requests (token or
+# session), for the Vary header of private responses
+AUTH_VARY_HEADERS = ("Authorization", "Cookie")
+
+
+def get_etag(*parts) -> str:
+    """Quoted ETag value: md5 of the parts identifying a content version"""
+    digest = hashlib.md5("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def conditional_get(
+    etag_func=None, last_modified_func=None, vary=(), **cache_control_kwargs
+):
+    """Conditional GET for methods of class based views (django and drf)
+
+    The validators are computed from the request and the url kwargs before
+    the method runs: If-None-Match / If-Modified-Since matches are answered
+    with 304 without building the content. Responses get ETag,
+    Last-Modified, Cache-Control and Vary headers.
+
+    Args:
+        etag_func (callable | None): (request, **kwargs) -> quoted etag
+        last_modified_func (callable | None): (request, **kwargs) -> datetime
+        vary (tuple[str]): request headers the response depends on (e.g.
+            AUTH_VARY_HEADERS for authenticated endpoints)
+        cache_control_kwargs: Cache-Control directives (e.g. private=True)
+    """
+
+    def decorator(view_func):
+        view_func = condition(etag_func, last_modified_func)(view_func)
+        if vary:
+            view_func = vary_on_headers(*vary)(view_func)
+        return cache_control(**cache_control_kwargs)(view_func)
+
+    return method_decorator(decorator)
@@ -1,18 +1,52 @@
 import os
+import re
+import hashlib
+import logging
+import textwrap
+import threading
+from contextlib import contextmanager
+from io import BytesIO
 from datetime import datetime
 
 from django.conf import settings
-from django.db.models import QuerySet
-from django.template.loader import render_to_string
-from weasyprint import HTML
+from django.db.models import Count, Max, Q, QuerySet
+from django.template.loader import get_template, render_to_string
+from django.utils.html import escape
+from PyPDF2 import PdfReader, PdfWriter
+from weasyprint import CSS, HTML, __version__ as weasyprint_version
+from weasyprint.text.fonts import FontConfiguration
 
+from jobs.models import Job
+from jobs.progress import ProgressTracker
+from jobs.signals import status_updated
 from survey import models
 from utils.survey_calcs_group import SurveyCalcsGroupTexts
 
+TEMPLATES_FOLDER = os.path.join(
+    settings.BASE_DIR, "survey", "templates", "survey", "pdf"
+)
+STYLESHEETS = [
+    "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css",
+    os.path.join(TEMPLATES_FOLDER, "group_report_style.css"),
+]
+
+# Pages without company data, pre-rendered once and spliced in every report
+STATIC_PAGES = ["toc", "annex", "closing"]
+STATIC_PAGES_FOLDER = os.path.join(
+    settings.BASE_DIR, "media", "temp", "group_report_static"
+)
+STATIC_PAGE_ANCHOR = re.compile(r"static-(?P<name>\w+)-(?P<index>\d+)")
+
 NOMINAL_RANKING_CHUNK_SIZE = settings.NOMINAL_RANKING_CHUNK_SIZE
 HEATMAP_CHUNK_SIZE = 15
 STRATEGIC_CHUNK_SIZE = 40
 
+# Progress of the group report generation: one item per participant ranked
+# while building the context, then one per page laid out by weasyprint
+# (reported in its progress logger)
+WEASYPRINT_PROGRESS_LOGGER = "weasyprint.progress"
+WEASYPRINT_PAGE_MESSAGE = re.compile(r"Creating layout - Page \d+")
+
 MONTHS_ES = {
     1: "enero",
     2: "febrero",
@@ -40,6 +74,22 @@ DOT_COLORS = {
     "high": "green",
 }
 
+# Heatmap svg layout (px), matches the heatmap table styles in
+# group_report_style.css
+HEATMAP_SVG_WIDTH = 660
+HEATMAP_SVG_NAME_WIDTH = 180
+HEATMAP_SVG_HEADER_HEIGHT = 160
+HEATMAP_SVG_ROW_HEIGHT = 38
+HEATMAP_SVG_LINE_HEIGHT = 12
+HEATMAP_SVG_NAME_CHARS = 32
+HEATMAP_SVG_DOT_RADIUS = 7.5
+HEATMAP_SVG_HEADER_COLOR = "#003366"
+HEATMAP_SVG_DOT_COLORS = {
+    "red": "#e31e24",
+    "yellow": "#fdb913",
+    "green": "#39b54a",
+}
+
 
 def _chunk_list(lst: list, chunk_size: int) -> list[list]:
     if not lst:
@@ -55,36 +105,393 @@ def _get_dot_color(range_val: str) -> str:
     return DOT_COLORS.get(range_val, "")
 
 
-def generate_group_report_pdf(
+# Static pages loaded in this process {name: {"key", "pdf", "pages"}}
+_static_pages_cache = {}
+
+
+def _get_static_pages_key(name: str) -> str:
+    """Hash of every input of a static pages pdf (template version)"""
+    hasher = hashlib.sha256(weasyprint_version.encode())
+    for template_name in [
+        "survey/pdf/group_report_static/page.html",
+        f"survey/pdf/group_report_static/{name}.html",
+    ]:
+        hasher.update(get_template(template_name).template.source.encode())
+    for stylesheet in STYLESHEETS:
+        hasher.update(stylesheet.encode())
+        if not stylesheet.startswith("http"):
+            with open(stylesheet, "rb") as file:
+                hasher.update(file.read())
+    return hasher.hexdigest()
+
+
+def get_static_pages(name: str) -> dict:
+    """Get the pdf of a group of static pages, rendered only once per
+    template version and cached in memory and in the temp folder
+
+    Args:
+        name (str): static pages name (one of STATIC_PAGES)
+
+    Returns:
+        dict: cache key, pdf bytes and page numbers list
+    """
+    key = _get_static_pages_key(name)
+    cached = _static_pages_cache.get(name)
+    if cached and cached["key"] == key:
+        return cached
+
+    path = os.path.join(STATIC_PAGES_FOLDER, f"{name}_{key[:16]}.pdf")
+    if os.path.exists(path):
+        with open(path, "rb") as file:
+            pdf_bytes = file.read()
+    else:
+        html_string = render_to_string(
+            "survey/pdf/group_report_static/page.html",
+            {"static_template": f"survey/pdf/group_report_static/{name}.html"},
+        )
+        pdf_bytes = HTML(string=html_string, base_url=TEMPLATES_FOLDER).write_pdf()
+
+        # Write and rename, so concurrent workers never read half files
+        os.makedirs(STATIC_PAGES_FOLDER, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(pdf_bytes)
+        os.replace(temp_path, path)
+
+    pages_count = len(PdfReader(BytesIO(pdf_bytes)).pages)
+    _static_pages_cache[name] = {
+        "key": key,
+        "pdf": pdf_bytes,
+        "pages": list(range(1, pages_count + 1)),
+    }
+    return _static_pages_cache[name]
+
+
+def _splice_static_pages(document, pdf_bytes: bytes, static_pages: dict) -> bytes:
+    """Merge the static pages over their placeholder pages
+
+    Placeholders are empty pages rendered with the report header, footer
+    and page number, so the spliced pages keep them consistent.
+
+    Args:
+        document (weasyprint.Document): rendered report (to find placeholders)
+        pdf_bytes (bytes): report pdf
+        static_pages (dict): static pages from get_static_pages by name
+
+    Returns:
+        bytes: report pdf with the static pages content
+    """
+    static_readers = {
+        name: PdfReader(BytesIO(data["pdf"])) for name, data in static_pages.items()
+    }
+
+    placeholders = {}
+    for page_index, page in enumerate(document.pages):
+        for anchor in page.anchors:
+            match = STATIC_PAGE_ANCHOR.fullmatch(anchor)
+            if match and match["name"] in static_readers:
+                placeholders[page_index] = static_readers[match["name"]].pages[
+                    int(match["index"]) - 1
+                ]
+
+    writer = PdfWriter()
+    for page_index, page in enumerate(PdfReader(BytesIO(pdf_bytes)).pages):
+        if page_index in placeholders:
+            page.merge_page(placeholders[page_index])
+        writer.add_page(page)
+
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def _build_heatmap_svg(themes: list[str], rows: list[dict]) -> str:
+    """Render a heatmap chunk as a single inline svg
+
+    Replaces the nested table (one cell per participant and theme) with
+    one vector element per page, so weasyprint only lays out the svg
+    instead of hundreds of table cells.
+
+    Args:
+        themes (list[str]): theme names (columns)
+        rows (list[dict]): heatmap rows with "name" and "dots" (colors)
+
+    Returns:
+        str: svg markup
+    """
+    width = HEATMAP_SVG_WIDTH
+    name_width = HEATMAP_SVG_NAME_WIDTH
+    header_height = HEATMAP_SVG_HEADER_HEIGHT
+    line_height = HEATMAP_SVG_LINE_HEIGHT
+    col_width = (width - name_width) / max(len(themes), 1)
+
+    # Wrap long names (svg text does not wrap) and size rows to fit
+    rows_lines = [
+        textwrap.wrap(row["name"] or "", HEATMAP_SVG_NAME_CHARS) or [""]
+        for row in rows
+    ]
+    rows_heights = [
+        max(HEATMAP_SVG_ROW_HEIGHT, len(lines) * line_height + 14)
+        for lines in rows_lines
+    ]
+    height = header_height + sum(rows_heights)
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" class="heatmap-svg" '
+        f'width="{width}" height="{height}" viewBox="0 0 {width} {height}" '
+        f'font-family="Arial, sans-serif" font-size="10">',
+        # Header
+        f'<rect x="0" y="0" width="{width}" height="{header_height}" '
+        f'fill="{HEATMAP_SVG_HEADER_COLOR}"/>',
+        f'<text x="{name_width / 2}" y="{header_height / 2}" fill="#fff" '
+        f'font-weight="bold" text-anchor="middle" '
+        f'transform="rotate(45 {name_width / 2} {header_height / 2})">'
+        f"Nombre</text>",
+    ]
+    for index, theme_name in enumerate(themes):
+        x = name_width + col_width * index + col_width / 2 + 3.5
+        y = header_height - 10
+        parts.append(
+            f'<text x="{x:.2f}" y="{y}" fill="#fff" font-weight="bold" '
+            f'transform="rotate(-90 {x:.2f} {y})">{escape(theme_name)}</text>'
+        )
+
+    # Rows
+    y = header_height
+    for row, lines, row_height in zip(rows, rows_lines, rows_heights):
+        text_y = y + row_height / 2 - (len(lines) - 1) * line_height / 2 + 3.5
+        parts.append(
+            f'<text x="{name_width / 2}" y="{text_y:.2f}" text-anchor="middle">'
+        )
+        for line_index, line in enumerate(lines):
+            dy = 0 if line_index == 0 else line_height
+            parts.append(
+                f'<tspan x="{name_width / 2}" dy="{dy}">{escape(line)}</tspan>'
+            )
+        parts.append("</text>")
+
+        cy = y + row_height / 2
+        for index, dot_color in enumerate(row["dots"]):
+            cx = name_width + col_width * index + col_width / 2
+            fill = HEATMAP_SVG_DOT_COLORS.get(dot_color, "#ffffff")
+            parts.append(
+                f'<circle cx="{cx:.2f}" cy="{cy}" r="{HEATMAP_SVG_DOT_RADIUS}" '
+                f'fill="{fill}"/>'
+            )
+        y += row_height
+
+    # Grid lines (single path instead of one border per cell)
+    grid = [f"M0 {header_height}H{width}"]
+    y = header_height
+    for row_height in rows_heights:
+        y += row_height
+        grid.append(f"M0 {y}H{width}")
+    grid.append(f"M{name_width} 0V{height}")
+    for index in range(1, len(themes)):
+        x = name_width + col_width * index
+        grid.append(f"M{x:.2f} 0V{height}")
+    parts.append(
+        f'<path d="{"".join(grid)}" stroke="#000" stroke-width="1" fill="none"/>'
+    )
+    parts.append(
+        f'<rect x="0.5" y="0.5" width="{width - 1}" height="{height - 1}" '
+        f'stroke="#000" stroke-width="1" fill="none"/>'
+    )
+    parts.append("</svg>")
+
+    return "".join(parts)
+
+
+def load_group_report_shared_data() -> dict:
+    """Load once the data shared by every group report: survey structure,
+    weasyprint resources (parsed stylesheets, fonts and images cache) and
+    static pages
+
+    Returns:
+        dict: shared data for generate_group_report_pdf
+    """
+    question_groups = {}
+    for question_group in models.QuestionGroup.objects.order_by(
+        "survey_id", "survey_index"
+    ):
+        question_groups.setdefault(question_group.survey_id, []).append(
+            question_group
+        )
+
+    font_config = FontConfiguration()
+    stylesheets = []
+    for stylesheet in STYLESHEETS:
+        if stylesheet.startswith("http"):
+            stylesheets.append(CSS(url=stylesheet, font_config=font_config))
+        else:
+            stylesheets.append(CSS(filename=stylesheet, font_config=font_config))
+
+    # Render (or read) the static pages before workers are started
+    if settings.GROUP_REPORT_STATIC_PAGES_CACHE:
+        for name in STATIC_PAGES:
+            get_static_pages(name)
+
+    return {
+        "question_groups": question_groups,
+        "stylesheets": stylesheets,
+        "font_config": font_config,
+        "images_cache": {},
+    }
+
+
+def get_group_report_fingerprint(
+    reports: QuerySet[models.Report],
+    company: models.Company | None = None,
+) -> str:
+    """Build a stable fingerprint of every input used to render a group report
+
+    Args:
+        reports (QuerySet[models.Report]): reports included in the group report
+        company (models.Company | None): company linked to the group report
+
+    Returns:
+        str: sha256 hex digest of company, report ids, totals, participants
+            and text config
+    """
+    hasher = hashlib.sha256()
+
+    # Company data rendered in the pdf
+    if company:
+        hasher.update(
+            f"company:{company.id}|{company.name}|"
+            f"{company.additional_recommendations or ''}\n".encode()
+        )
+
+    # Report ids and totals (updated_at changes when totals are recalculated),
+    # with the participant data rendered in the rankings and profiles
+    for report_id, total, updated_at, name, position in reports.order_by(
+        "id"
+    ).values_list(
+        "id", "total", "updated_at", "participant__name", "participant__position"
+    ):
+        hasher.update(
+            f"report:{report_id}|{total}|{updated_at.isoformat()}|"
+            f"{name}|{position}\n".encode()
+        )
+
+    # Totals per question group and summary scores
+    for model in (models.ReportQuestionGroupTotal, models.ReportSummaryScore):
+        stats = model.objects.filter(report__in=reports).aggregate(
+            count=Count("id"), last_update=Max("updated_at")
+        )
+        hasher.update(f"{model.__name__}:{stats}\n".encode())
+
+    # Text config (themes and paragraphs)
+    for model in (
+        models.QuestionGroup,
+        models.TextPDFQuestionGroup,
+        models.TextPDFSummary,
+    ):
+        stats = model.objects.aggregate(
+            count=Count("id"), last_update=Max("updated_at")
+        )
+        hasher.update(f"{model.__name__}:{stats}\n".encode())
+
+    return hasher.hexdigest()
+
+
+def get_or_create_group_report(
+    company: models.Company,
+    reports: QuerySet[models.Report],
+    force: bool = False,
+    retry_error: bool = False,
+) -> tuple[models.GroupReport, Job | None]:
+    """Get the group report of the company data (one per fingerprint), queuing
+    its generation when it is new. Failed group reports are only queued again
+    when requested (the group report page shows the error instead of retrying
+    on each refresh)
+
+    Args:
+        company (models.Company): company of the group report
+        reports (QuerySet[models.Report]): reports included in the group report
+        force (bool): generate again a completed or failed group report
+        retry_error (bool): generate again a failed group report
+
+    Returns:
+        tuple[models.GroupReport, Job | None]: group report and the job queued
+            to generate it (None if it is generated or already queued)
+    """
+    fingerprint = get_group_report_fingerprint(reports, company=company)
+    group_report, created = models.GroupReport.objects.get_or_create(
+        company=company, fingerprint=fingerprint
+    )
+    if created:
+        group_report.reports.set(reports)
+        return group_report, group_report.enqueue_job()
+
+    # Conditional update: concurrent requests queue the retry once
+    retry = Q(status="completed", pdf_file="")
+    if force or retry_error:
+        retry |= Q(status="error")
+    if force:
+        retry |= Q(status="completed")
+    if not models.GroupReport.objects.filter(retry, id=group_report.id).update(
+        status="pending"
+    ):
+        return group_report, None
+
+    status_updated.send(sender=models.GroupReport, ids=[group_report.id])
+    group_report.status = "pending"
+    return group_report, group_report.enqueue_job()
+
+
+def build_group_report_context(
     reports: QuerySet[models.Report],
     company_name: str = "Reporte Grupal",
     additional_recommendations: str | None = None,
-) -> bytes:
+    calcs: SurveyCalcsGroupTexts | None = None,
+    progress: ProgressTracker | None = None,
+) -> dict:
+    """Calculate the group stats and build the group report template context
+
+    Args:
+        reports (QuerySet[models.Report]): reports included in the group report
+        company_name (str): company name rendered in the pdf
+        additional_recommendations (str | None): one recommendation per line
+        calcs (SurveyCalcsGroupTexts | None): calcs instance to reuse
+            (with its cached stats), created from reports if missing
+        progress (ProgressTracker | None): progress advanced per participant
+
+    Returns:
+        dict: template context
+    """
     now = datetime.now()
     current_date_es = f"{now.day} de {MONTHS_ES[now.month]} {now.year}"
 
-    calcs = SurveyCalcsGroupTexts(reports=reports)
-
-    nominal_ranking_raw = [
-        {
-            "counter": idx + 1,
-            "name": report.participant.name,
-            "position": report.participant.get_position_display(),
-            "score": report.total,
-            "level": calcs.LEVELS_CONFIG[calcs._get_level_from_score(report.total)][
-                "name_es"
-            ],
-            "dot_color": calcs.LEVELS_CONFIG[calcs._get_level_from_score(report.total)][
-                "dot_color"
-            ],
-        }
-        for idx, report in enumerate(reports.order_by("-total"))
-    ]
+    if calcs is None:
+        calcs = SurveyCalcsGroupTexts(reports=reports)
+
+    nominal_ranking_raw = []
+    for idx, report in enumerate(reports.order_by("-total")):
+        level = calcs.LEVELS_CONFIG[calcs._get_level_from_score(report.total)]
+        nominal_ranking_raw.append(
+            {
+                "counter": idx + 1,
+                "name": report.participant.name,
+                "position": report.participant.get_position_display(),
+                "score": report.total,
+                "level": level["name_es"],
+                "dot_color": level["dot_color"],
+            }
+        )
+        if progress:
+            progress.advance()
 
     nominal_ranking_chunks = _chunk_list(
         nominal_ranking_raw, NOMINAL_RANKING_CHUNK_SIZE
     )
+    heatmap_themes = calcs.get_heatmap_themes()
     heatmap_chunks = _chunk_list(calcs.get_heatmap_data(), HEATMAP_CHUNK_SIZE)
+    heatmap_svg_chunks = []
+    if settings.GROUP_REPORT_HEATMAP_RENDERER == "svg":
+        heatmap_svg_chunks = [
+            _build_heatmap_svg(heatmap_themes, chunk) for chunk in heatmap_chunks
+        ]
     strategic_profiles = calcs.get_strategic_profiles()
 
     context = {
@@ -126,8 +533,9 @@ def generate_group_report_pdf(
         ],
         "nominal_ranking": nominal_ranking_raw,
         "nominal_ranking_chunks": nominal_ranking_chunks,
-        "heatmap_themes": calcs.get_heatmap_themes(),
+        "heatmap_themes": heatmap_themes,
         "heatmap_chunks": heatmap_chunks,
+        "heatmap_svg_chunks": heatmap_svg_chunks,
         "strategic_profiles": strategic_profiles,
         "strategic_ambassadors_chunks": _chunk_list(
             strategic_profiles["ambassadors"], STRATEGIC_CHUNK_SIZE
@@ -151,10 +559,143 @@ def generate_group_report_pdf(
             for line in (additional_recommendations or "").splitlines()
             if line.strip()
         ],
+        "static_pages": {},
     }
 
-    html_string = render_to_string("survey/pdf/group_report_template.html", context)
+    if settings.GROUP_REPORT_STATIC_PAGES_CACHE:
+        context["static_pages"] = {name: get_static_pages(name) for name in STATIC_PAGES}
+
+    return context
+
+
+def render_group_report_html(context: dict) -> str:
+    """Render the group report html from its context
+
+    Args:
+        context (dict): context from build_group_report_context
+
+    Returns:
+        str: html string
+    """
+    return render_to_string("survey/pdf/group_report_template.html", context)
+
+
+def write_group_report_pdf(
+    html_string: str,
+    shared_data: dict | None = None,
+    static_pages: dict | None = None,
+) -> bytes:
+    """Convert the group report html to pdf with weasyprint
+
+    Args:
+        html_string (str): html from render_group_report_html
+        shared_data (dict | None): data from load_group_report_shared_data,
+            its stylesheets replace the ones linked in the html
+        static_pages (dict | None): context static pages, spliced over
+            their placeholder pages
+
+    Returns:
+        bytes: pdf content
+    """
+    html = HTML(string=html_string, base_url=TEMPLATES_FOLDER)
+
+    options = {}
+    if shared_data:
+        options = {
+            "stylesheets": shared_data["stylesheets"],
+            "font_config": shared_data["font_config"],
+            "cache": shared_data["images_cache"],
+        }
+
+    if not static_pages:
+        return html.write_pdf(**options)
+
+    document = html.render(**options)
+    return _splice_static_pages(document, document.write_pdf(), static_pages)
+
+
+class _PagesProgressHandler(logging.Handler):
+    """Advance a progress per page laid out by weasyprint in this thread"""
+
+    def __init__(self, progress: ProgressTracker, pages: int):
+        super().__init__(logging.INFO)
+        self.progress = progress
+        self.pages = pages
+        self.thread = threading.get_ident()
+
+    def emit(self, record):
+        if record.thread != self.thread or not WEASYPRINT_PAGE_MESSAGE.search(
+            record.getMessage()
+        ):
+            return
+        # Layouts repeated for page counters report their pages again
+        if self.pages > 0:
+            self.pages -= 1
+            self.progress.advance()
+
+
+@contextmanager
+def _track_pdf_pages(progress: ProgressTracker | None, pages: int):
+    """Count the pages laid out inside the block (up to pages), then the
+    pages not reported as done"""
+    if not progress:
+        yield
+        return
+
+    logger = logging.getLogger(WEASYPRINT_PROGRESS_LOGGER)
+    level = logger.level
+    handler = _PagesProgressHandler(progress, pages)
+    if not logger.isEnabledFor(logging.INFO):
+        logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    try:
+        yield
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(level)
+    if handler.pages:
+        progress.advance(handler.pages)
+
+
+def generate_group_report_pdf(
+    reports: QuerySet[models.Report],
+    company_name: str = "Reporte Grupal",
+    additional_recommendations: str | None = None,
+    shared_data: dict | None = None,
+    progress: ProgressTracker | None = None,
+) -> bytes:
+    if progress:
+        progress.set_phase("context", total=reports.count())
+
+    calcs = None
+    if shared_data:
+        survey_id = reports.values_list("survey_id", flat=True).first()
+        calcs = SurveyCalcsGroupTexts(
+            reports=reports,
+            question_groups=shared_data["question_groups"].get(survey_id, []),
+        )
+
+    context = build_group_report_context(
+        reports,
+        company_name=company_name,
+        additional_recommendations=additional_recommendations,
+        calcs=calcs,
+        progress=progress,
+    )
+    context["preloaded_stylesheets"] = bool(shared_data)
+    if progress:
+        progress.set_phase("html")
 
-    base_url = os.path.join(settings.BASE_DIR, "survey", "templates", "survey", "pdf")
+    html_string = render_group_report_html(context)
+    # Each template section is a page (fixed layout)
+    pages = html_string.count("<section")
+    if progress:
+        progress.add_total(pages)
+        progress.set_phase("pdf")
 
-    return HTML(string=html_string, base_url=base_url).write_pdf()
+    with _track_pdf_pages(progress, pages):
+        return write_group_report_pdf(
+            html_string,
+            shared_data=shared_data,
+            static_pages=context["static_pages"],
+        )
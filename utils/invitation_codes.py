@@ -0,0 +1,78 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from survey import models
+
+VERSION_KEY = "invitation_codes:version"
+
+# Cached value of the codes without company (cache.get returns None on misses)
+UNKNOWN_CODE = "unknown"
+
+
+def get_version() -> int:
+    """Current version of the lookup table (changed on each company edit)"""
+    return cache.get_or_set(VERSION_KEY, time.time_ns, timeout=None)
+
+
+def bump_version():
+    """Discard the cached lookups of all the codes: a new code, a changed
+    code or status, or a deleted company (bulk updates skip the signals:
+    their changes are seen after the cache timeout)"""
+    # Time based versions: an evicted version key never reuses an old version
+    cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def get_code_key(invitation_code: str, version: int) -> str:
+    code_hash = hashlib.md5(invitation_code.encode()).hexdigest()
+    return f"invitation_codes:{version}:{code_hash}"
+
+
+def is_enabled() -> bool:
+    """Lookups cached only in a cache shared by all the processes: with a per
+    process cache, the company edits would only invalidate the lookups of the
+    process that saved them"""
+    # survey.models imports this module (progress_buffer needs its models)
+    from utils.progress_buffer import is_shared_cache
+
+    return is_shared_cache()
+
+
+def get_company(invitation_code: str) -> dict | None:
+    """Company of an invitation code, from the cache or the database. Unknown
+    codes are also cached (repeated invalid codes don't query the database)
+
+    Args:
+        invitation_code (str): invitation code
+
+    Returns:
+        dict | None: company "id", "name", "details" and "is_active" (None
+            if no company has the code)
+    """
+    companies = models.Company.objects.filter(invitation_code=invitation_code)
+    fields = ("id", "name", "details", "is_active")
+    if not is_enabled():
+        return companies.values(*fields).first()
+
+    key = get_code_key(invitation_code, get_version())
+    company = cache.get(key)
+    if company is not None:
+        return None if company == UNKNOWN_CODE else company
+
+    company = companies.values(*fields).first()
+    if company is None:
+        cache.set(key, UNKNOWN_CODE, settings.INVITATION_CODE_NEGATIVE_CACHE_SECONDS)
+    else:
+        cache.set(key, company, settings.INVITATION_CODE_CACHE_SECONDS)
+    return company
+
+
+def get_active_company_id(invitation_code: str) -> int | None:
+    """Id of the active company of an invitation code (None if the code is
+    unknown or the company is inactive)"""
+    company = get_company(invitation_code)
+    if not company or not company["is_active"]:
+        return None
+    return company["id"]
@@ -1,7 +1,17 @@
 import os
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models.fields.files import FieldFile
+from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name
+
+# S3 files bigger than this are read with parallel ranged gets
+S3_RANGE_SIZE = 8 * 1024 * 1024
+S3_RANGE_WORKERS = 4
 
 
 def get_media_url(object_or_url: object) -> str:
@@ -26,6 +36,101 @@ def get_media_url(object_or_url: object) -> str:
     return url_str
 
 
+def _iter_s3_file(
+    storage: S3Boto3Storage, name: str, range_size: int, workers: int
+) -> Iterator[bytes]:
+    """Yield a s3 file content in order, downloading ranges in parallel
+    (at most `workers` ranges in memory)"""
+    client = storage.connection.meta.client
+    key = storage._normalize_name(clean_name(name))
+    size = client.head_object(Bucket=storage.bucket_name, Key=key)["ContentLength"]
+
+    def get_range(start: int) -> bytes:
+        end = min(start + range_size, size) - 1
+        res = client.get_object(
+            Bucket=storage.bucket_name, Key=key, Range=f"bytes={start}-{end}"
+        )
+        return res["Body"].read()
+
+    if size <= range_size:
+        yield client.get_object(Bucket=storage.bucket_name, Key=key)["Body"].read()
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for start in range(0, size, range_size):
+            pending.append(executor.submit(get_range, start))
+            if len(pending) >= workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_media_file(
+    field_file: FieldFile,
+    range_size: int = S3_RANGE_SIZE,
+    workers: int = S3_RANGE_WORKERS,
+) -> Iterator[bytes]:
+    """Yield the content of a stored file straight from its storage backend
+    (s3 ranged gets or local file read in place), without http requests
+    to the media url
+
+    Args:
+        field_file (FieldFile): stored file (like report.pdf_file)
+        range_size (int): chunk size in bytes
+        workers (int): parallel s3 ranged gets
+
+    Returns:
+        Iterator[bytes]: file content chunks
+    """
+    storage = field_file.storage
+    if isinstance(storage, S3Boto3Storage):
+        yield from _iter_s3_file(storage, field_file.name, range_size, workers)
+        return
+
+    with storage.open(field_file.name, "rb") as file:
+        yield from file.chunks(range_size)
+
+
+def save_media_stream(
+    field_file: FieldFile, filename: str, chunks: Iterable[bytes]
+) -> str:
+    """Write chunks to the field storage as they arrive (s3 multipart upload
+    or chunked local file write) and assign the saved name to the field,
+    without keeping or reading back the whole file
+
+    Args:
+        field_file (FieldFile): file field to save (like download.zip_file)
+        filename (str): file name (the field upload_to is added)
+        chunks (Iterable[bytes]): file content chunks
+
+    Returns:
+        str: saved file name in the storage
+    """
+    storage = field_file.storage
+    name = field_file.field.generate_filename(field_file.instance, filename)
+    name = storage.get_available_name(name, max_length=field_file.field.max_length)
+
+    if isinstance(storage, S3Boto3Storage):
+        # Parts of AWS_S3_FILE_BUFFER_SIZE bytes are uploaded while writing
+        file = storage.open(name, "wb")
+    else:
+        path = storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        file = open(path, "wb")
+
+    try:
+        with file:
+            for chunk in chunks:
+                file.write(chunk)
+    except Exception:
+        storage.delete(name)
+        raise
+
+    field_file.name = name
+    return name
+
+
 def get_test_image(image_name: str = "test.webp") -> SimpleUploadedFile:
     app_path = os.path.dirname(os.path.abspath(__file__))
     project_path = os.path.dirname(app_path)
@@ -0,0 +1,21 @@
+def merge_patch(target, patch):
+    """Apply a JSON merge patch (RFC 7396): objects are merged recursively,
+    null values remove keys and any other value replaces the target
+
+    Args:
+        target: current json value
+        patch: merge patch
+
+    Returns:
+        patched json value (the target is not modified)
+    """
+    if not isinstance(patch, dict):
+        return patch
+
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
@@ -0,0 +1,123 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from jobs.queue import enqueue
+from survey import models
+
+SEQUENCE_KEY = "form_progress:sequence"
+FLUSHED_KEY = "form_progress:flushed"
+GAP_KEY = "form_progress:gap"
+SCHEDULED_KEY = "form_progress:scheduled"
+
+# Buffered saves not flushed by then are lost (the flush job is not running)
+BUFFER_TIMEOUT = 60 * 60 * 24
+
+
+def is_shared_cache() -> bool:
+    """The default cache is seen by all the processes (web workers and the
+    jobs worker flushing the buffer)"""
+    return not isinstance(caches["default"], (LocMemCache, DummyCache))
+
+
+def is_enabled() -> bool:
+    """Form progress saves buffered in the cache and written in bulk by the
+    "form_progress" job. Never enabled with a per process cache: the flush
+    runs in another process and would not see the buffer (see
+    survey.checks)"""
+    return settings.FORM_PROGRESS_WRITE_BEHIND and is_shared_cache()
+
+
+def get_buffer_key(email: str, survey_id: int) -> str:
+    email_hash = hashlib.md5(email.encode()).hexdigest()
+    return f"form_progress:{survey_id}:{email_hash}"
+
+
+def get_dirty_key(sequence: int) -> str:
+    return f"form_progress:dirty:{sequence}"
+
+
+def get_buffered_progress(email: str, survey_id: int) -> models.FormProgress | None:
+    """Last buffered save of a participant (None if not buffered)"""
+    return cache.get(get_buffer_key(email, survey_id))
+
+
+def schedule_flush():
+    """Queue a flush job, at most once per flush interval"""
+    delay_seconds = settings.FORM_PROGRESS_FLUSH_SECONDS
+    if cache.add(SCHEDULED_KEY, True, delay_seconds):
+        enqueue("form_progress", {}, delay_seconds=delay_seconds)
+
+
+def buffer_progress(progress: models.FormProgress):
+    """Keep a progress save in the buffer (replacing the previous save of the
+    participant) and mark it for the next flush
+
+    Args:
+        progress (models.FormProgress): unsaved progress (current_screen None:
+            keep the saved screen)
+    """
+    key = get_buffer_key(progress.email, progress.survey_id)
+    cache.set(key, progress, BUFFER_TIMEOUT)
+
+    # Saves numbered with an atomic counter, flushed in order
+    cache.add(SEQUENCE_KEY, 0, timeout=None)
+    sequence = cache.incr(SEQUENCE_KEY)
+    cache.set(get_dirty_key(sequence), key, BUFFER_TIMEOUT)
+
+    schedule_flush()
+
+
+def discard_progress(email: str, survey_id: int):
+    """Drop the buffered save of a participant (not written anymore)"""
+    cache.delete(get_buffer_key(email, survey_id))
+
+
+def flush_progress() -> int:
+    """Write the buffered saves to the database in bulk (last save of each
+    participant)
+
+    Returns:
+        int: progresses written
+    """
+    flushed = cache.get(FLUSHED_KEY, 0)
+    sequence = cache.get(SEQUENCE_KEY, 0)
+    if sequence <= flushed:
+        return 0
+
+    dirty_keys = [get_dirty_key(number) for number in range(flushed + 1, sequence + 1)]
+    dirty = cache.get_many(dirty_keys)
+
+    # A missing mark is a save in progress: wait for it one flush, then skip it
+    last = sequence
+    for number, dirty_key in enumerate(dirty_keys, flushed + 1):
+        if dirty_key in dirty or cache.get(GAP_KEY) == number:
+            continue
+        cache.set(GAP_KEY, number, timeout=None)
+        last = number - 1
+        break
+    dirty_keys = dirty_keys[: last - flushed]
+
+    keys = {dirty[dirty_key] for dirty_key in dirty_keys if dirty_key in dirty}
+    buffered = cache.get_many(keys)
+    progresses = list(buffered.values())
+    if progresses:
+        models.FormProgress.bulk_upsert(progresses)
+
+        # Saves discarded meanwhile (progress submitted or deleted): remove
+        # the rows written from them (newer saves have other versions)
+        current = cache.get_many(list(buffered))
+        for key, progress in buffered.items():
+            if key not in current:
+                models.FormProgress.objects.filter(
+                    email=progress.email,
+                    survey_id=progress.survey_id,
+                    version=progress.version,
+                ).delete()
+
+    cache.set(FLUSHED_KEY, last, timeout=None)
+    cache.delete_many(dirty_keys)
+    return len(progresses)
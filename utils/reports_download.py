@@ -0,0 +1,64 @@
+import hashlib
+
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from survey import models
+
+
+def get_reports_download_fingerprint(reports: QuerySet[models.Report]) -> str:
+    """Build a stable fingerprint of the pdf files zipped in a reports download
+
+    Args:
+        reports (QuerySet[models.Report]): reports included in the zip file
+
+    Returns:
+        str: sha256 hex digest of report ids, pdf files and participant names
+    """
+    hasher = hashlib.sha256()
+
+    # Regenerated pdfs are saved with a new name and update the report
+    for report_id, pdf_file, updated_at, participant_name in reports.order_by(
+        "id"
+    ).values_list("id", "pdf_file", "updated_at", "participant__name"):
+        hasher.update(
+            f"report:{report_id}|{pdf_file}|{updated_at.isoformat()}|"
+            f"{participant_name}\n".encode()
+        )
+
+    return hasher.hexdigest()
+
+
+def get_or_create_reports_download(
+    reports: QuerySet[models.Report],
+) -> tuple[models.ReportsDownload, bool]:
+    """Reuse the reports download of the same reports and pdf files (completed
+    or in progress), or create a new one and trigger its generation
+
+    Args:
+        reports (QuerySet[models.Report]): reports to include in the zip file
+
+    Returns:
+        tuple[models.ReportsDownload, bool]: reports download and if it was created
+    """
+    fingerprint = get_reports_download_fingerprint(reports)
+
+    reports_download = (
+        models.ReportsDownload.objects.filter(fingerprint=fingerprint)
+        .exclude(status="error")
+        .exclude(Q(status="completed") & (Q(zip_file="") | Q(zip_file__isnull=True)))
+        .order_by("-created_at")
+        .first()
+    )
+    if reports_download:
+        models.ReportsDownload.objects.filter(id=reports_download.id).update(
+            last_used_at=timezone.now()
+        )
+        return reports_download, False
+
+    reports_download = models.ReportsDownload.objects.create(
+        fingerprint=fingerprint, last_used_at=timezone.now()
+    )
+    reports_download.reports.set(reports)
+    reports_download.enqueue_job()
+    return reports_download, True
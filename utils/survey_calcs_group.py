@@ -8,6 +8,75 @@ from survey.models import (
     TextPDFSummary,
 )
 
+# Priority actions for the lowest scored question groups (matched by name)
+PRIORITY_ACTIONS_MAPPING = {
+    "Antecedentes tecnológicos": [
+        "Reforzar conceptos básicos sobre cómo funciona la tecnología y su evolución en el negocio.",
+        "Integrar fundamentos tecnológicos en sesiones de inducción o actualización interna.",
+        "Relacionar conceptos tecnológicos con casos prácticos del entorno organizacional.",
+    ],
+    "Evolución de la tecnología": [
+        "Generar espacios periódicos de actualización sobre tendencias tecnológicas relevantes.",
+        "Analizar cómo los cambios tecnológicos impactan procesos y modelos de negocio.",
+        "Incorporar la evolución tecnológica en ejercicios de planeación estratégica.",
+    ],
+    "Internet y conectividad": [
+        "Fortalecer el entendimiento del funcionamiento de redes y conectividad en el trabajo digital.",
+        "Identificar riesgos y dependencias asociados a la conectividad en la operación.",
+        "Promover buenas prácticas para el uso eficiente de entornos digitales conectados.",
+    ],
+    "Dispositivos digitales": [
+        "Estandarizar el uso adecuado de dispositivos digitales en el entorno laboral.",
+        "Capacitar en configuraciones básicas que mejoren seguridad y desempeño.",
+        "Promover el uso eficiente de dispositivos según el tipo de actividad laboral.",
+    ],
+    "Ciberseguridad": [
+        "Implementar lineamientos básicos de seguridad digital para toda la organización.",
+        "Sensibilizar sobre riesgos comunes como phishing, accesos indebidos y manejo de información.",
+        "Integrar prácticas de seguridad en el uso cotidiano de herramientas digitales.",
+    ],
+    "Huella digital": [
+        "Concientizar sobre el impacto del uso de información en entornos digitales.",
+        "Promover buenas prácticas en el manejo de datos personales y organizacionales.",
+        "Integrar criterios de responsabilidad digital en el trabajo cotidiano.",
+    ],
+    "Uso de la tecnología": [
+        "Promover el uso efectivo de herramientas digitales en procesos clave del trabajo.",
+        "Identificar oportunidades de mejora en la adopción tecnológica actual.",
+        "Vincular el uso de tecnología con indicadores de productividad y eficiencia.",
+    ],
+    "Herramientas de colaboración": [
+        "Estandarizar el uso de plataformas de colaboración dentro de los equipos.",
+        "Definir buenas prácticas para comunicación y trabajo digital compartido.",
+        "Reducir retrabajos mediante mejor uso de herramientas colaborativas.",
+    ],
+    "Tecnologías emergentes": [
+        "Generar espacios de aprendizaje sobre nuevas tecnologías aplicables al negocio.",
+        "Analizar casos de uso relevantes para la organización.",
+        "Promover la exploración de oportunidades a partir de tendencias tecnológicas.",
+    ],
+    "Tecnologías de asistencia": [
+        "Identificar herramientas que faciliten tareas repetitivas o de bajo valor.",
+        "Promover el uso de soluciones que mejoren la productividad individual.",
+        "Integrar herramientas de apoyo en procesos operativos clave.",
+    ],
+    "Rol del líder y la tecnología": [
+        "Clarificar el papel del liderazgo en la adopción tecnológica.",
+        "Incorporar criterios tecnológicos en la toma de decisiones del equipo.",
+        "Promover el uso de tecnología como habilitador del desempeño del equipo.",
+    ],
+    "Tecnología y medio ambiente": [
+        "Sensibilizar sobre el impacto de la tecnología en la sostenibilidad y la inclusión.",
+        "Promover prácticas digitales responsables y equitativas en el uso de recursos.",
+        "Integrar criterios de sostenibilidad e impacto social en decisiones tecnológicas.",
+    ],
+    "Etiqueta digital": [
+        "Establecer lineamientos de comunicación digital en la organización.",
+        "Promover prácticas claras y eficientes en entornos virtuales.",
+        "Reducir malentendidos mediante normas de interacción digital.",
+    ],
+}
+
 
 class SurveyCalcsGroup:
     # Centralized definition of assessment levels, scores, colors, and descriptions
@@ -41,8 +110,17 @@ class SurveyCalcsGroup:
     def __init__(
         self,
         reports: QuerySet[models.Report],
+        question_groups: list[QuestionGroup] | None = None,
     ):
+        """
+        Args:
+            reports: Reports of the group
+            question_groups: Survey question groups ordered by survey_index,
+                preloaded once when generating many group reports
+                (loaded from the reports survey if missing)
+        """
         self.reports = reports
+        self._question_groups = question_groups
         self._employees_number = None
         self._average = None
         self._average_areas_ordered = {}  # {use_summary: result}
@@ -134,10 +212,14 @@ class SurveyCalcsGroup:
                     )
 
                     # Map IDs back to QuestionGroup instances
-                    qg_ids = [item["question_group"] for item in results]
-                    qgs = {
-                        qg.id: qg for qg in QuestionGroup.objects.filter(id__in=qg_ids)
-                    }
+                    if self._question_groups is not None:
+                        qgs = {qg.id: qg for qg in self._question_groups}
+                    else:
+                        qg_ids = [item["question_group"] for item in results]
+                        qgs = {
+                            qg.id: qg
+                            for qg in QuestionGroup.objects.filter(id__in=qg_ids)
+                        }
 
                     final_results = []
                     for item in results:
@@ -295,17 +377,28 @@ class SurveyCalcsGroup:
             return name.split(" - ", 1)[1].strip()
         return name
 
-    def get_heatmap_themes(self) -> list[str]:
+    def get_question_groups(self) -> list[QuestionGroup]:
         """
-        Get the list of cleaned theme names for the survey.
+        Get the question groups of the reports survey ordered by survey_index.
         """
-        if self._heatmap_themes is None:
+        if self._question_groups is None:
             survey = self.reports.first().survey if self.reports.exists() else None
             if survey:
-                question_groups = QuestionGroup.objects.filter(survey=survey).order_by("survey_index")
+                self._question_groups = list(
+                    QuestionGroup.objects.filter(survey=survey).order_by("survey_index")
+                )
             else:
-                question_groups = QuestionGroup.objects.none()
-            self._heatmap_themes = [self.clean_theme_name(qg.name) for qg in question_groups]
+                self._question_groups = []
+        return self._question_groups
+
+    def get_heatmap_themes(self) -> list[str]:
+        """
+        Get the list of cleaned theme names for the survey.
+        """
+        if self._heatmap_themes is None:
+            self._heatmap_themes = [
+                self.clean_theme_name(qg.name) for qg in self.get_question_groups()
+            ]
         return self._heatmap_themes
 
     def get_heatmap_data(self) -> list[dict]:
@@ -313,11 +406,7 @@ class SurveyCalcsGroup:
         Get the heatmap data (dots and names) for the participants.
         """
         if self._heatmap_data is None:
-            survey = self.reports.first().survey if self.reports.exists() else None
-            if survey:
-                question_groups = QuestionGroup.objects.filter(survey=survey).order_by("survey_index")
-            else:
-                question_groups = QuestionGroup.objects.none()
+            question_groups = self.get_question_groups()
 
             self._heatmap_data = []
             for report in self.reports.order_by("-total"):
@@ -378,8 +467,12 @@ class SurveyCalcsGroup:
 
 class SurveyCalcsGroupTexts(SurveyCalcsGroup):
 
-    def __init__(self, reports: QuerySet[models.Report]):
-        super().__init__(reports)
+    def __init__(
+        self,
+        reports: QuerySet[models.Report],
+        question_groups: list[QuestionGroup] | None = None,
+    ):
+        super().__init__(reports, question_groups=question_groups)
         self._average_range = None
         self._general_summary = None
         self._strength_areas = None
@@ -635,74 +728,6 @@ class SurveyCalcsGroupTexts(SurveyCalcsGroup):
         """
         Get priority actions for the lowest scored areas.
         """
-        PRIORITY_ACTIONS_MAPPING = {
-            "Antecedentes tecnológicos": [
-                "Reforzar conceptos básicos sobre cómo funciona la tecnología y su evolución en el negocio.",
-                "Integrar fundamentos tecnológicos en sesiones de inducción o actualización interna.",
-                "Relacionar conceptos tecnológicos con casos prácticos del entorno organizacional.",
-            ],
-            "Evolución de la tecnología": [
-                "Generar espacios periódicos de actualización sobre tendencias tecnológicas relevantes.",
-                "Analizar cómo los cambios tecnológicos impactan procesos y modelos de negocio.",
-                "Incorporar la evolución tecnológica en ejercicios de planeación estratégica.",
-            ],
-            "Internet y conectividad": [
-                "Fortalecer el entendimiento del funcionamiento de redes y conectividad en el trabajo digital.",
-                "Identificar riesgos y dependencias asociados a la conectividad en la operación.",
-                "Promover buenas prácticas para el uso eficiente de entornos digitales conectados.",
-            ],
-            "Dispositivos digitales": [
-                "Estandarizar el uso adecuado de dispositivos digitales en el entorno laboral.",
-                "Capacitar en configuraciones básicas que mejoren seguridad y desempeño.",
-                "Promover el uso eficiente de dispositivos según el tipo de actividad laboral.",
-            ],
-            "Ciberseguridad": [
-                "Implementar lineamientos básicos de seguridad digital para toda la organización.",
-                "Sensibilizar sobre riesgos comunes como phishing, accesos indebidos y manejo de información.",
-                "Integrar prácticas de seguridad en el uso cotidiano de herramientas digitales.",
-            ],
-            "Huella digital": [
-                "Concientizar sobre el impacto del uso de información en entornos digitales.",
-                "Promover buenas prácticas en el manejo de datos personales y organizacionales.",
-                "Integrar criterios de responsabilidad digital en el trabajo cotidiano.",
-            ],
-            "Uso de la tecnología": [
-                "Promover el uso efectivo de herramientas digitales en procesos clave del trabajo.",
-                "Identificar oportunidades de mejora en la adopción tecnológica actual.",
-                "Vincular el uso de tecnología con indicadores de productividad y eficiencia.",
-            ],
-            "Herramientas de colaboración": [
-                "Estandarizar el uso de plataformas de colaboración dentro de los equipos.",
-                "Definir buenas prácticas para comunicación y trabajo digital compartido.",
-                "Reducir retrabajos mediante mejor uso de herramientas colaborativas.",
-            ],
-            "Tecnologías emergentes": [
-                "Generar espacios de aprendizaje sobre nuevas tecnologías aplicables al negocio.",
-                "Analizar casos de uso relevantes para la organización.",
-                "Promover la exploración de oportunidades a partir de tendencias tecnológicas.",
-            ],
-            "Tecnologías de asistencia": [
-                "Identificar herramientas que faciliten tareas repetitivas o de bajo valor.",
-                "Promover el uso de soluciones que mejoren la productividad individual.",
-                "Integrar herramientas de apoyo en procesos operativos clave.",
-            ],
-            "Rol del líder y la tecnología": [
-                "Clarificar el papel del liderazgo en la adopción tecnológica.",
-                "Incorporar criterios tecnológicos en la toma de decisiones del equipo.",
-                "Promover el uso de tecnología como habilitador del desempeño del equipo.",
-            ],
-            "Tecnología y medio ambiente": [
-                "Sensibilizar sobre el impacto de la tecnología en la sostenibilidad y la inclusión.",
-                "Promover prácticas digitales responsables y equitativas en el uso de recursos.",
-                "Integrar criterios de sostenibilidad e impacto social en decisiones tecnológicas.",
-            ],
-            "Etiqueta digital": [
-                "Establecer lineamientos de comunicación digital en la organización.",
-                "Promover prácticas claras y eficientes en entornos virtuales.",
-                "Reducir malentendidos mediante normas de interacción digital.",
-            ],
-        }
-
         ordered_areas_no_summary = self.get_average_areas_ordered(use_summary=False)
         lowest_areas = []
         if len(ordered_areas_no_summary) >= 2:
@@ -0,0 +1,240 @@
+import gzip
+import time
+from collections.abc import Callable
+from functools import partial
+
+import brotli
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models as db_models
+from django.db.models import Count, Prefetch, QuerySet
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from survey import models, serializers
+
+# Cached encodings of the survey detail json, in order of preference
+ENCODINGS = ["br", "gzip", "identity"]
+
+# Lookup from the surveys to each model shown in the survey detail
+SURVEY_LOOKUPS = {
+    models.Survey: "id",
+    models.QuestionGroup: "questiongroup",
+    models.QuestionGroupModifier: "questiongroup__modifiers",
+    models.Question: "questiongroup__question",
+    models.QuestionOption: "questiongroup__question__questionoption",
+}
+
+
+def get_questions_queryset() -> QuerySet[models.Question]:
+    """Sorted questions with their sorted options prefetched"""
+    options = models.QuestionOption.objects.order_by("question_index")
+    return models.Question.objects.order_by("question_group_index").prefetch_related(
+        Prefetch("questionoption_set", queryset=options)
+    )
+
+
+def get_survey_detail_queryset() -> QuerySet[models.Survey]:
+    """Surveys with their sorted groups, modifiers, questions and options
+    prefetched (fixed number of queries for any survey size)"""
+    question_groups = models.QuestionGroup.objects.order_by(
+        "survey_index"
+    ).prefetch_related(
+        "modifiers", Prefetch("question_set", queryset=get_questions_queryset())
+    )
+    return models.Survey.objects.prefetch_related(
+        Prefetch("questiongroup_set", queryset=question_groups)
+    )
+
+
+def get_survey_version(survey_id: int) -> int | None:
+    """Current version of a survey detail, changed on each survey edit (None
+    if the survey does not exist)
+
+    The version is saved in the survey row: edits from any process (web
+    workers, admin, commands) are seen by all of them, even with a per
+    process cache
+    """
+    return (
+        models.Survey.objects.filter(id=survey_id)
+        .values_list("detail_version", flat=True)
+        .first()
+    )
+
+
+def get_survey_ids(instance: db_models.Model) -> list[int]:
+    """Ids of the surveys showing an object, as saved in the database"""
+    if instance.pk is None:
+        return []
+    lookup = SURVEY_LOOKUPS[type(instance)]
+    return list(
+        models.Survey.objects.filter(**{lookup: instance.pk}).values_list(
+            "id", flat=True
+        )
+    )
+
+
+def invalidate_survey_details(survey_ids: list[int]):
+    """Discard the cached details of the surveys (new versions)"""
+    survey_ids = set(survey_ids)
+    if survey_ids:
+        # Time based versions: also ordered for the Last-Modified header
+        models.Survey.objects.filter(id__in=survey_ids).update(
+            detail_version=time.time_ns()
+        )
+
+
+def render_survey_detail(survey_id: int) -> tuple[dict, dict] | None:
+    """Full survey: groups with their questions and options
+
+    Returns:
+        tuple[dict, dict] | None: data and response headers (None if the
+            survey does not exist)
+    """
+    survey = get_survey_detail_queryset().filter(id=survey_id).first()
+    if not survey:
+        return None
+    return serializers.SurveyDetailSerializer(survey).data, {}
+
+
+def render_survey_outline(survey_id: int) -> tuple[dict, dict] | None:
+    """Survey without questions: groups names, positions and questions count
+    (first request of the survey form, screens are loaded one by one)"""
+    question_groups = models.QuestionGroup.objects.order_by("survey_index").annotate(
+        questions_count=Count("question")
+    )
+    survey = (
+        models.Survey.objects.prefetch_related(
+            Prefetch("questiongroup_set", queryset=question_groups)
+        )
+        .filter(id=survey_id)
+        .first()
+    )
+    if not survey:
+        return None
+    return serializers.SurveyOutlineSerializer(survey).data, {}
+
+
+def render_survey_screen(survey_id: int, survey_index: int) -> tuple[dict, dict] | None:
+    """Question group of a survey screen, with the position of the next screen
+    (also sent as a prefetch Link header)"""
+    question_groups = models.QuestionGroup.objects.filter(survey_id=survey_id)
+    question_group = (
+        question_groups.filter(survey_index=survey_index)
+        .prefetch_related(
+            "modifiers", Prefetch("question_set", queryset=get_questions_queryset())
+        )
+        .order_by("id")
+        .first()
+    )
+    if not question_group:
+        return None
+
+    next_survey_index = (
+        question_groups.filter(survey_index__gt=survey_index)
+        .order_by("survey_index")
+        .values_list("survey_index", flat=True)
+        .first()
+    )
+    data = serializers.QuestionGroupSerializer(question_group).data
+    data["next_survey_index"] = next_survey_index
+
+    headers = {}
+    if next_survey_index is not None:
+        next_url = reverse(
+            "surveys-screen",
+            kwargs={"pk": survey_id, "survey_index": next_survey_index},
+        )
+        headers["Link"] = f"<{next_url}>; rel=prefetch"
+    return data, headers
+
+
+def get_cached_content(
+    survey_id: int,
+    version: int | None,
+    name: str,
+    render: Callable[[], tuple[dict, dict] | None],
+) -> dict | None:
+    """Json content and its gzip and brotli versions, from the cache or
+    rendered and cached for a survey version
+
+    Args:
+        survey_id (int): survey id
+        version (int | None): current survey version (None: not found)
+        name (str): content name in the survey cache (e.g. "detail")
+        render (Callable[[], tuple[dict, dict] | None]): content data and
+            response headers (None if not found)
+
+    Returns:
+        dict | None: "content" by encoding and response "headers" (None if
+            not found)
+    """
+    if version is None:
+        return None
+
+    key = f"survey_detail:{survey_id}:{version}:{name}"
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    rendered = render()
+    if rendered is None:
+        return None
+
+    data, headers = rendered
+    content_json = JSONRenderer().render(data)
+    cached = {
+        "content": {
+            "br": brotli.compress(content_json),
+            "gzip": gzip.compress(content_json),
+            "identity": content_json,
+        },
+        "headers": headers,
+    }
+    cache.set(key, cached, settings.SURVEY_DETAIL_CACHE_SECONDS)
+    return cached
+
+
+def get_survey_detail(survey_id: int, version: int | None) -> dict | None:
+    return get_cached_content(
+        survey_id, version, "detail", partial(render_survey_detail, survey_id)
+    )
+
+
+def get_survey_outline(survey_id: int, version: int | None) -> dict | None:
+    return get_cached_content(
+        survey_id, version, "outline", partial(render_survey_outline, survey_id)
+    )
+
+
+def get_survey_screen(
+    survey_id: int, version: int | None, survey_index: int
+) -> dict | None:
+    return get_cached_content(
+        survey_id,
+        version,
+        f"screen:{survey_index}",
+        partial(render_survey_screen, survey_id, survey_index),
+    )
+
+
+def get_accepted_encoding(accept_encoding: str) -> str:
+    """Preferred cached encoding accepted by the client
+
+    Args:
+        accept_encoding (str): Accept-Encoding header value
+
+    Returns:
+        str: "br", "gzip" or "identity"
+    """
+    accepted = set()
+    for part in accept_encoding.split(","):
+        encoding, *params = [value.strip() for value in part.split(";")]
+        if "q=0" in params or "q=0.0" in params:
+            continue
+        accepted.add(encoding.lower())
+
+    for encoding in ENCODINGS:
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return "identity"
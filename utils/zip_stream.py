@@ -0,0 +1,117 @@
+import time
+import zipfile
+from itertools import chain
+from collections.abc import Iterable, Iterator
+
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+
+from utils.media import iter_media_file
+
+
+class ZipStreamBuffer:
+    """Unseekable file-like object keeping the zip bytes written since the
+    last pop (zipfile writes data descriptors instead of seeking back)"""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_zip_stream(entries: Iterable[tuple[str, Iterable[bytes]]]) -> Iterator[bytes]:
+    """Build a zip file on the fly, yielding its bytes as entries are written.
+    Entries are stored without compression (pdf files are already compressed),
+    so memory is bounded by the size of the entries chunks
+
+    Args:
+        entries (Iterable[tuple[str, Iterable[bytes]]]): file name in the zip
+            and content chunks of each entry
+
+    Returns:
+        Iterator[bytes]: zip file chunks
+    """
+    buffer = ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as zipf:
+        for arcname, chunks in entries:
+            zip_info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+            zip_info.compress_type = zipfile.ZIP_STORED
+            with zipf.open(zip_info, "w") as entry:
+                for chunk in chunks:
+                    entry.write(chunk)
+                    data = buffer.pop()
+                    if data:
+                        yield data
+            # Entry data descriptor
+            yield buffer.pop()
+
+    # Central directory
+    yield buffer.pop()
+
+
+def get_report_zip_name(report) -> str:
+    """File name of a report pdf inside the reports zip file"""
+    return f"{str(report.participant)}_{report.id}.pdf"
+
+
+def iter_reports_zip_entries(
+    reports: QuerySet,
+) -> Iterator[tuple[str, Iterator[bytes]]]:
+    """Yield the zip entries of the reports pdf files, read in chunks from
+    the storage backend. Reports without a readable pdf file are skipped
+    before their entry is started
+
+    Args:
+        reports (QuerySet): reports to add to the zip file
+
+    Returns:
+        Iterator[tuple[str, Iterator[bytes]]]: file name and content chunks
+    """
+    reports = reports.select_related("participant").order_by("id")
+    for report in reports.iterator():
+        if not report.pdf_file:
+            print(f"Report {report.id} has no pdf file")
+            continue
+
+        # Read the first chunk to skip missing files
+        chunks = iter_media_file(report.pdf_file)
+        try:
+            first_chunk = next(chunks, b"")
+        except Exception as e:
+            print(f"Failed to read pdf file {report.pdf_file.name}: {str(e)}")
+            continue
+
+        yield get_report_zip_name(report), chain([first_chunk], chunks)
+
+
+def get_reports_zip_response(
+    reports: QuerySet, filename: str = "reportes.zip"
+) -> StreamingHttpResponse:
+    """Zip file response of the reports pdf files, built while it is sent
+    (constant server memory)
+
+    Args:
+        reports (QuerySet): reports to add to the zip file
+        filename (str): zip file name to download
+
+    Returns:
+        StreamingHttpResponse: zip file response
+    """
+    response = StreamingHttpResponse(
+        iter_zip_stream(iter_reports_zip_entries(reports)),
+        content_type="application/zip",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response